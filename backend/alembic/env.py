@@ -1,4 +1,5 @@
 from logging.config import fileConfig
+import re
 import sys
 import os
 from pathlib import Path
@@ -13,6 +14,7 @@ sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
 from app.database import Base
 from app.models import RoomType, Room, Guest, Booking, Payment, User
+from app.partitions import PARTITIONED_TABLES
 
 load_dotenv()
 
@@ -26,6 +28,17 @@ config.set_main_option("sqlalchemy.url", database_url)
 
 target_metadata = Base.metadata
 
+# Секции и копии внешнего ключа payments на каждую секцию bookings создаёт PostgreSQL, в моделях их нет
+PARTITION_NAME = re.compile(rf"^({'|'.join(PARTITIONED_TABLES)})_(y\d{{4}}m\d{{2}}|default)$")
+PARTITION_FOREIGN_KEY_NAME = re.compile(r"^payments_booking_id_booking_check_in_date_fkey\d*$")
+
+def include_name(name, type_, parent_names):
+    if type_ == "table":
+        return not PARTITION_NAME.match(name)
+    if type_ == "foreign_key_constraint":
+        return not PARTITION_FOREIGN_KEY_NAME.match(name or "")
+    return True
+
 def run_migrations_offline():
     url = config.get_main_option("sqlalchemy.url")
     context.configure(
@@ -33,6 +46,7 @@ def run_migrations_offline():
         target_metadata=target_metadata,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
+        include_name=include_name,
     )
 
     with context.begin_transaction():
@@ -48,7 +62,7 @@ def run_migrations_online():
 
     with connectable.connect() as connection:
         context.configure(
-            connection=connection, target_metadata=target_metadata
+            connection=connection, target_metadata=target_metadata, include_name=include_name
         )
 
         with context.begin_transaction():
@@ -0,0 +1,246 @@
+"""Partition bookings and payments by month
+
+Revision ID: 10d688e34acb
+Revises: cdad7afd3fc6
+Create Date: 2026-10-18 15:13:03.666933
+
+"""
+from datetime import date
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+from app.models import (
+    BOOKING_OVERLAP_FUNCTION, BOOKING_OVERLAP_TRIGGER,
+    PAYMENT_DELETE_FUNCTION, PAYMENT_DELETE_TRIGGER,
+    PAYMENT_WRITE_FUNCTION, PAYMENT_WRITE_TRIGGER,
+)
+
+
+# revision identifiers, used by Alembic.
+revision: str = '10d688e34acb'
+down_revision: Union[str, None] = 'cdad7afd3fc6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+ACTIVE_STATUSES = "('подтверждено', 'заселен')"
+MAX_STAY_DAYS = 365
+# Сколько месяцев вперёд создаются секции; дальше их создаёт app.partitions при старте и scripts/maintain_partitions.py
+MONTHS_AHEAD = 12
+
+TABLE_GRANTS_SQL = sa.text("""
+    SELECT CASE WHEN acl.grantee = 0 THEN 'PUBLIC' ELSE quote_ident(pg_get_userbyid(acl.grantee)) END,
+           string_agg(acl.privilege_type, ', ')
+    FROM pg_class, aclexplode(pg_class.relacl) AS acl
+    WHERE pg_class.oid = CAST(:table AS regclass) AND acl.grantee <> pg_class.relowner
+    GROUP BY acl.grantee
+""")
+
+
+def table_grants(table: str) -> list:
+    if context.is_offline_mode():
+        return []
+    return op.get_bind().execute(TABLE_GRANTS_SQL, {"table": table}).all()
+
+def restore_grants(table: str, grants: list) -> None:
+    for grantee, privileges in grants:
+        op.execute(f"GRANT {privileges} ON {table} TO {grantee}")
+
+def add_months(month: date, count: int) -> date:
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+def first_month(table: str, column: str) -> date:
+    today = date.today().replace(day=1)
+    if context.is_offline_mode():
+        return today
+    first = op.get_bind().execute(sa.text(f"SELECT min({column}) FROM {table}")).scalar()
+    return min(date(first.year, first.month, 1), today) if first is not None else today
+
+def create_monthly_partitions(table: str, first: date) -> None:
+    last = add_months(date.today().replace(day=1), MONTHS_AHEAD)
+    month = first
+    while month <= last:
+        op.execute(
+            f"CREATE TABLE {table}_y{month.year}m{month.month:02d} PARTITION OF {table} "
+            f"FOR VALUES FROM ('{month}') TO ('{add_months(month, 1)}')"
+        )
+        month = add_months(month, 1)
+    op.execute(f"CREATE TABLE {table}_default PARTITION OF {table} DEFAULT")
+
+def move_sequence(old_table: str, new_table: str) -> None:
+    # Последовательность принадлежит старой таблице и удалилась бы вместе с ней
+    op.execute(f"""
+        DO $$
+        BEGIN
+            EXECUTE format('ALTER SEQUENCE %s OWNED BY {new_table}.id', pg_get_serial_sequence('{old_table}', 'id'));
+        END
+        $$
+    """)
+
+
+def upgrade() -> None:
+    if not context.is_offline_mode():
+        too_long = op.get_bind().execute(sa.text(
+            f"SELECT id FROM bookings WHERE check_out_date - check_in_date > {MAX_STAY_DAYS} LIMIT 20"
+        )).scalars().all()
+        if too_long:
+            raise RuntimeError(f"Bookings longer than {MAX_STAY_DAYS} days must be split first: {too_long}")
+        # Платёж без даты не попадает ни в одну секцию, а без бронирования — под внешний ключ. Такие
+        # платежи миграция не дописывает датой и не отбрасывает: их нужно исправить или удалить вручную
+        undated, orphaned = op.get_bind().execute(sa.text("""
+            SELECT count(*) FILTER (WHERE payment_date IS NULL),
+                   count(*) FILTER (WHERE NOT EXISTS (SELECT 1 FROM bookings WHERE bookings.id = payments.booking_id))
+            FROM payments
+        """)).one()
+        if undated or orphaned:
+            raise RuntimeError(f"Payments must be fixed first: {undated} without payment_date, {orphaned} without a booking")
+
+    booking_grants = table_grants('bookings')
+    payment_grants = table_grants('payments')
+    first_booking_month = first_month('bookings', 'check_in_date')
+    first_payment_month = first_month('payments', 'payment_date')
+
+    op.drop_constraint('payments_booking_id_fkey', 'payments', type_='foreignkey')
+    op.rename_table('bookings', 'bookings_unpartitioned')
+    op.rename_table('payments', 'payments_unpartitioned')
+
+    op.execute(
+        "CREATE TABLE bookings (LIKE bookings_unpartitioned INCLUDING DEFAULTS INCLUDING CONSTRAINTS) "
+        "PARTITION BY RANGE (check_in_date)"
+    )
+    op.execute(
+        "CREATE TABLE payments (LIKE payments_unpartitioned INCLUDING DEFAULTS INCLUDING CONSTRAINTS) "
+        "PARTITION BY RANGE (payment_date)"
+    )
+    op.alter_column('payments', 'payment_date', nullable=False)
+    op.add_column('payments', sa.Column('booking_check_in_date', sa.Date(), nullable=True))
+    create_monthly_partitions('bookings', first_booking_month)
+    create_monthly_partitions('payments', first_payment_month)
+
+    op.execute("INSERT INTO bookings SELECT * FROM bookings_unpartitioned")
+    # LEFT JOIN: в offline-режиме проверки выше нет, и платёж без даты или бронирования остановит миграцию на NOT NULL
+    op.execute("""
+        INSERT INTO payments
+        SELECT payments_unpartitioned.*, bookings_unpartitioned.check_in_date
+        FROM payments_unpartitioned
+        LEFT JOIN bookings_unpartitioned ON bookings_unpartitioned.id = payments_unpartitioned.booking_id
+    """)
+    op.alter_column('payments', 'booking_check_in_date', nullable=False)
+    move_sequence('bookings_unpartitioned', 'bookings')
+    move_sequence('payments_unpartitioned', 'payments')
+    op.drop_table('payments_unpartitioned')
+    op.drop_table('bookings_unpartitioned')
+
+    # Ключ секционирования входит в первичный ключ; ORM по-прежнему адресует строки по id
+    op.create_primary_key('bookings_pkey', 'bookings', ['id', 'check_in_date'])
+    op.create_check_constraint('check_stay_length', 'bookings', f'check_out_date - check_in_date <= {MAX_STAY_DAYS}')
+    op.create_index('ix_bookings_guest_id', 'bookings', ['guest_id'])
+    op.create_index('ix_bookings_room_id', 'bookings', ['room_id'])
+    op.create_index('ix_bookings_status', 'bookings', ['status'])
+    op.create_index('idx_bookings_dates', 'bookings', ['check_in_date', 'check_out_date'])
+    op.create_index('idx_bookings_created_at_id', 'bookings', ['created_at', 'id'])
+    op.create_index(
+        'idx_bookings_active_period', 'bookings', [sa.text('daterange(check_in_date, check_out_date)')],
+        postgresql_using='gist', postgresql_where=sa.text(f'status IN {ACTIVE_STATUSES}'),
+    )
+    op.create_index(
+        'idx_bookings_active_room', 'bookings', ['room_id', 'check_in_date'],
+        postgresql_where=sa.text(f'status IN {ACTIVE_STATUSES}'),
+    )
+    op.create_foreign_key('bookings_guest_id_fkey', 'bookings', 'guests', ['guest_id'], ['id'], ondelete='CASCADE')
+    op.create_foreign_key('bookings_room_id_fkey', 'bookings', 'rooms', ['room_id'], ['id'], ondelete='RESTRICT')
+
+    op.create_primary_key('payments_pkey', 'payments', ['id', 'payment_date'])
+    op.create_index('ix_payments_booking_id', 'payments', ['booking_id'])
+    op.create_index('ix_payments_payment_date', 'payments', ['payment_date'])
+    op.create_index('ix_payments_payment_status', 'payments', ['payment_status'])
+    op.create_foreign_key(
+        'payments_booking_id_fkey', 'payments', 'bookings',
+        ['booking_id', 'booking_check_in_date'], ['id', 'check_in_date'],
+        ondelete='CASCADE', onupdate='CASCADE',
+    )
+
+    op.create_table(
+        'payment_transaction_ids',
+        sa.Column('transaction_id', sa.String(length=100), nullable=False),
+        sa.PrimaryKeyConstraint('transaction_id'),
+    )
+    op.execute("INSERT INTO payment_transaction_ids SELECT transaction_id FROM payments WHERE transaction_id IS NOT NULL")
+    for statement in (
+        BOOKING_OVERLAP_FUNCTION, BOOKING_OVERLAP_TRIGGER,
+        PAYMENT_WRITE_FUNCTION, PAYMENT_WRITE_TRIGGER,
+        PAYMENT_DELETE_FUNCTION, PAYMENT_DELETE_TRIGGER,
+    ):
+        op.execute(statement)
+
+    restore_grants('bookings', booking_grants)
+    restore_grants('payments', payment_grants)
+    op.execute("ANALYZE bookings")
+    op.execute("ANALYZE payments")
+
+
+def downgrade() -> None:
+    # Отсоединённые scripts/maintain_partitions.py секции остаются отдельными таблицами и не возвращаются
+    booking_grants = table_grants('bookings')
+    payment_grants = table_grants('payments')
+
+    op.execute("DROP TRIGGER payments_after_delete ON payments")
+    op.execute("DROP TRIGGER payments_before_write ON payments")
+    op.execute("DROP TRIGGER bookings_check_overlap ON bookings")
+    op.execute("DROP FUNCTION payments_after_delete()")
+    op.execute("DROP FUNCTION payments_before_write()")
+    op.execute("DROP FUNCTION bookings_check_overlap()")
+    op.drop_table('payment_transaction_ids')
+    op.drop_constraint('payments_booking_id_fkey', 'payments', type_='foreignkey')
+    op.rename_table('bookings', 'bookings_partitioned')
+    op.rename_table('payments', 'payments_partitioned')
+
+    op.execute("CREATE TABLE bookings (LIKE bookings_partitioned INCLUDING DEFAULTS INCLUDING CONSTRAINTS)")
+    op.drop_constraint('check_stay_length', 'bookings', type_='check')
+    op.execute("CREATE TABLE payments (LIKE payments_partitioned INCLUDING DEFAULTS INCLUDING CONSTRAINTS)")
+    op.drop_column('payments', 'booking_check_in_date')
+    op.alter_column('payments', 'payment_date', nullable=True)
+    op.execute("INSERT INTO bookings SELECT * FROM bookings_partitioned")
+    op.execute("""
+        INSERT INTO payments (id, booking_id, amount, payment_method, payment_status, transaction_id, payment_date)
+        SELECT id, booking_id, amount, payment_method, payment_status, transaction_id, payment_date
+        FROM payments_partitioned
+    """)
+    move_sequence('bookings_partitioned', 'bookings')
+    move_sequence('payments_partitioned', 'payments')
+    op.drop_table('payments_partitioned')
+    op.drop_table('bookings_partitioned')
+
+    op.create_primary_key('bookings_pkey', 'bookings', ['id'])
+    op.create_index('ix_bookings_guest_id', 'bookings', ['guest_id'])
+    op.create_index('ix_bookings_room_id', 'bookings', ['room_id'])
+    op.create_index('ix_bookings_status', 'bookings', ['status'])
+    op.create_index('idx_bookings_dates', 'bookings', ['check_in_date', 'check_out_date'])
+    op.create_index('idx_bookings_created_at_id', 'bookings', ['created_at', 'id'])
+    op.create_index(
+        'idx_bookings_active_period', 'bookings', [sa.text('daterange(check_in_date, check_out_date)')],
+        postgresql_using='gist', postgresql_where=sa.text(f'status IN {ACTIVE_STATUSES}'),
+    )
+    op.create_index(
+        'idx_bookings_active_room', 'bookings', ['room_id', 'check_in_date'],
+        postgresql_where=sa.text(f'status IN {ACTIVE_STATUSES}'),
+    )
+    op.create_foreign_key('bookings_guest_id_fkey', 'bookings', 'guests', ['guest_id'], ['id'], ondelete='CASCADE')
+    op.create_foreign_key('bookings_room_id_fkey', 'bookings', 'rooms', ['room_id'], ['id'], ondelete='RESTRICT')
+    op.execute(f"""
+        ALTER TABLE bookings ADD CONSTRAINT excl_bookings_room_period
+        EXCLUDE USING gist (room_id WITH =, daterange(check_in_date, check_out_date) WITH &&)
+        WHERE (status IN {ACTIVE_STATUSES})
+    """)
+
+    op.create_primary_key('payments_pkey', 'payments', ['id'])
+    op.create_index('ix_payments_booking_id', 'payments', ['booking_id'])
+    op.create_index('ix_payments_payment_date', 'payments', ['payment_date'])
+    op.create_index('ix_payments_payment_status', 'payments', ['payment_status'])
+    op.create_index('ix_payments_transaction_id', 'payments', ['transaction_id'], unique=True)
+    op.create_foreign_key('payments_booking_id_fkey', 'payments', 'bookings', ['booking_id'], ['id'], ondelete='CASCADE')
+
+    restore_grants('bookings', booking_grants)
+    restore_grants('payments', payment_grants)
@@ -0,0 +1,45 @@
+"""Add booking overlap indexes for availability search
+
+Revision ID: 13d17be650f2
+Revises: 3b3cbdcaf708
+Create Date: 2026-10-18 10:12:31.402519
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '13d17be650f2'
+down_revision: Union[str, None] = '3b3cbdcaf708'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+ACTIVE_STATUSES = sa.text("status IN ('подтверждено', 'заселен')")
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'idx_bookings_active_period',
+            'bookings',
+            [sa.text('daterange(check_in_date, check_out_date)')],
+            postgresql_using='gist',
+            postgresql_where=ACTIVE_STATUSES,
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            'idx_bookings_active_room',
+            'bookings',
+            ['room_id', 'check_in_date'],
+            postgresql_where=ACTIVE_STATUSES,
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('idx_bookings_active_room', table_name='bookings', postgresql_concurrently=True)
+        op.drop_index('idx_bookings_active_period', table_name='bookings', postgresql_concurrently=True)
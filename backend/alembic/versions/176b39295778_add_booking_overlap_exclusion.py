@@ -0,0 +1,47 @@
+"""Forbid overlapping active bookings of the same room
+
+Revision ID: 176b39295778
+Revises: 460a241f5094
+Create Date: 2026-10-18 15:31:08.553017
+
+"""
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '176b39295778'
+down_revision: Union[str, None] = '460a241f5094'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+ACTIVE_STATUSES = "('подтверждено', 'заселен')"
+
+
+def upgrade() -> None:
+    if not context.is_offline_mode():
+        # Ограничение не создастся, если в базе уже есть пересечения — показываем их заранее
+        conflicts = op.get_bind().execute(sa.text(f"""
+            SELECT a.id, b.id
+            FROM bookings a
+            JOIN bookings b ON b.room_id = a.room_id AND b.id > a.id
+             AND daterange(a.check_in_date, a.check_out_date) && daterange(b.check_in_date, b.check_out_date)
+            WHERE a.status IN {ACTIVE_STATUSES} AND b.status IN {ACTIVE_STATUSES}
+            LIMIT 20
+        """)).fetchall()
+        if conflicts:
+            pairs = ", ".join(f"{first}/{second}" for first, second in conflicts)
+            raise RuntimeError(f"Overlapping active bookings must be resolved first: {pairs}")
+
+    op.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+    op.execute(f"""
+        ALTER TABLE bookings ADD CONSTRAINT excl_bookings_room_period
+        EXCLUDE USING gist (room_id WITH =, daterange(check_in_date, check_out_date) WITH &&)
+        WHERE (status IN {ACTIVE_STATUSES})
+    """)
+
+
+def downgrade() -> None:
+    op.drop_constraint('excl_bookings_room_period', 'bookings')
@@ -0,0 +1,40 @@
+"""Add trigram indexes for guest search
+
+Revision ID: 232cd06e65aa
+Revises: 10d688e34acb
+Create Date: 2026-10-18 19:42:11.503218
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '232cd06e65aa'
+down_revision: Union[str, None] = '10d688e34acb'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Выражения совпадают с app/models.py (GUEST_PHONE_DIGITS, GUEST_PASSPORT_COMPACT)
+INDEXES = (
+    ('idx_guests_first_name_trgm', 'first_name'),
+    ('idx_guests_last_name_trgm', 'last_name'),
+    ('idx_guests_phone_trgm', "regexp_replace(phone, '[^0-9]', '', 'g')"),
+    ('idx_guests_passport_number_trgm', "replace(passport_number, ' ', '')"),
+)
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    with op.get_context().autocommit_block():
+        for name, expression in INDEXES:
+            op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON guests USING gin ({expression} gin_trgm_ops)")
+
+
+def downgrade() -> None:
+    # Расширение pg_trgm не удаляется: его могут использовать другие объекты базы
+    with op.get_context().autocommit_block():
+        for name, _ in INDEXES:
+            op.drop_index(name, table_name='guests', postgresql_concurrently=True)
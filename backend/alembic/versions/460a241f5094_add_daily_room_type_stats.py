@@ -0,0 +1,74 @@
+"""Add daily room type stats rollup for analytics
+
+Revision ID: 460a241f5094
+Revises: 966b7455f454
+Create Date: 2026-10-18 15:02:44.270913
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '460a241f5094'
+down_revision: Union[str, None] = '966b7455f454'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'daily_room_type_stats',
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('room_type_id', sa.Integer(), nullable=False),
+        sa.Column('rooms_sold', sa.Integer(), nullable=False),
+        sa.Column('room_revenue', sa.DECIMAL(precision=12, scale=2), nullable=False),
+        sa.Column('payments_total', sa.DECIMAL(precision=12, scale=2), nullable=False),
+        sa.Column('refreshed_at', sa.TIMESTAMP(), server_default=sa.text('now()'), nullable=True),
+        sa.ForeignKeyConstraint(['room_type_id'], ['room_types.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('day', 'room_type_id'),
+    )
+    # Начальное заполнение за весь период бронирований и платежей
+    op.execute("""
+        WITH bounds AS (
+            SELECT least(min(check_in_date), (SELECT min(payment_date)::date FROM payments)) AS first_day,
+                   greatest(max(check_out_date) - 1, (SELECT max(payment_date)::date FROM payments)) AS last_day
+            FROM bookings
+        ),
+        days AS (
+            SELECT CAST(d AS date) AS day
+            FROM bounds, generate_series(bounds.first_day, bounds.last_day, interval '1 day') AS d
+        ),
+        sold AS (
+            SELECT days.day, rooms.room_type_id,
+                   count(*) AS rooms_sold,
+                   sum(bookings.total_price / NULLIF(bookings.check_out_date - bookings.check_in_date, 0)) AS room_revenue
+            FROM days
+            JOIN bookings ON bookings.check_in_date <= days.day AND bookings.check_out_date > days.day
+            JOIN rooms ON rooms.id = bookings.room_id
+            WHERE bookings.status IN ('подтверждено', 'заселен', 'выселен')
+            GROUP BY days.day, rooms.room_type_id
+        ),
+        paid AS (
+            SELECT CAST(payments.payment_date AS date) AS day, rooms.room_type_id,
+                   sum(CASE WHEN payments.payment_status = 'возврат' THEN -payments.amount ELSE payments.amount END) AS payments_total
+            FROM payments
+            JOIN bookings ON bookings.id = payments.booking_id
+            JOIN rooms ON rooms.id = bookings.room_id
+            WHERE payments.payment_status IN ('завершен', 'возврат')
+            GROUP BY 1, 2
+        )
+        INSERT INTO daily_room_type_stats (day, room_type_id, rooms_sold, room_revenue, payments_total)
+        SELECT days.day, room_types.id,
+               COALESCE(sold.rooms_sold, 0), COALESCE(sold.room_revenue, 0), COALESCE(paid.payments_total, 0)
+        FROM days
+        CROSS JOIN room_types
+        LEFT JOIN sold ON sold.day = days.day AND sold.room_type_id = room_types.id
+        LEFT JOIN paid ON paid.day = days.day AND paid.room_type_id = room_types.id
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('daily_room_type_stats')
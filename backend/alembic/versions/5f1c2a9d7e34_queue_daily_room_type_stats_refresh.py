@@ -0,0 +1,42 @@
+"""Queue daily room type stats refresh from booking and payment triggers
+
+Revision ID: 5f1c2a9d7e34
+Revises: 232cd06e65aa
+Create Date: 2026-10-18 20:31:07.118402
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.models import STATS_QUEUE_FUNCTIONS, stats_queue_ddl
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5f1c2a9d7e34'
+down_revision: Union[str, None] = '232cd06e65aa'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'daily_room_type_stats_queue',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('date_from', sa.Date(), nullable=False),
+        sa.Column('date_to', sa.Date(), nullable=False),
+        sa.Column('queued_at', sa.TIMESTAMP(), server_default=sa.text('now()'), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    for table in STATS_QUEUE_FUNCTIONS:
+        for statement in stats_queue_ddl(table):
+            op.execute(statement)
+
+
+def downgrade() -> None:
+    for table in STATS_QUEUE_FUNCTIONS:
+        for event in ('insert', 'update', 'delete'):
+            op.execute(f"DROP TRIGGER IF EXISTS {table}_queue_stats_{event} ON {table}")
+        op.execute(f"DROP FUNCTION IF EXISTS {table}_queue_stats_refresh()")
+    op.drop_table('daily_room_type_stats_queue')
@@ -0,0 +1,60 @@
+"""Fuzzy guest search by a dictionary of name words
+
+Revision ID: 8b4e7d2c1a96
+Revises: 5f1c2a9d7e34
+Create Date: 2026-10-18 21:12:40.562817
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.models import GUEST_NAME_WORDS_FUNCTION, GUEST_NAME_WORDS_TRIGGERS
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b4e7d2c1a96'
+down_revision: Union[str, None] = '5f1c2a9d7e34'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+NAME_INDEXES = (
+    ('idx_guests_last_name_first_name', 'last_name, first_name, id'),
+    ('idx_guests_first_name_last_name', 'first_name, last_name, id'),
+)
+TRIGRAM_INDEXES = (
+    ('idx_guests_first_name_trgm', 'first_name'),
+    ('idx_guests_last_name_trgm', 'last_name'),
+)
+
+
+def upgrade() -> None:
+    op.create_table(
+        'guest_name_words',
+        sa.Column('word', sa.String(length=100), nullable=False),
+        sa.PrimaryKeyConstraint('word'),
+    )
+    op.execute(GUEST_NAME_WORDS_FUNCTION)
+    for statement in GUEST_NAME_WORDS_TRIGGERS:
+        op.execute(statement)
+    # Триггеры уже пополняют словарь, поэтому слова, записанные во время заполнения, не теряются
+    op.execute("INSERT INTO guest_name_words (word) SELECT first_name FROM guests UNION SELECT last_name FROM guests ON CONFLICT DO NOTHING")
+    op.execute("CREATE INDEX idx_guest_name_words_trgm ON guest_name_words USING gist (word gist_trgm_ops)")
+    with op.get_context().autocommit_block():
+        for name, columns in NAME_INDEXES:
+            op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON guests ({columns})")
+        for name, _ in TRIGRAM_INDEXES:
+            op.drop_index(name, table_name='guests', postgresql_concurrently=True, if_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, column in TRIGRAM_INDEXES:
+            op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON guests USING gin ({column} gin_trgm_ops)")
+        for name, _ in NAME_INDEXES:
+            op.drop_index(name, table_name='guests', postgresql_concurrently=True, if_exists=True)
+    for statement in GUEST_NAME_WORDS_TRIGGERS:
+        op.execute(f"DROP TRIGGER IF EXISTS {statement.split()[2]} ON guests")
+    op.execute("DROP FUNCTION IF EXISTS guests_collect_name_words()")
+    op.drop_table('guest_name_words')
@@ -0,0 +1,30 @@
+"""Add keyset pagination indexes on created_at
+
+Revision ID: 966b7455f454
+Revises: 13d17be650f2
+Create Date: 2026-10-18 11:40:05.118230
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '966b7455f454'
+down_revision: Union[str, None] = '13d17be650f2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index('idx_bookings_created_at_id', 'bookings', ['created_at', 'id'], postgresql_concurrently=True)
+        op.create_index('idx_guests_created_at_id', 'guests', ['created_at', 'id'], postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('idx_guests_created_at_id', table_name='guests', postgresql_concurrently=True)
+        op.drop_index('idx_bookings_created_at_id', table_name='bookings', postgresql_concurrently=True)
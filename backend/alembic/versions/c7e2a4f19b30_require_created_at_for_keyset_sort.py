@@ -0,0 +1,55 @@
+"""Require created_at on tables sorted by keyset pagination
+
+Revision ID: c7e2a4f19b30
+Revises: 8b4e7d2c1a96
+Create Date: 2026-10-18 23:05:12.418305
+
+"""
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7e2a4f19b30'
+down_revision: Union[str, None] = '8b4e7d2c1a96'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Колонки, по которым сортирует курсорная пагинация (app/pagination.py); payment_date и check_in_date
+# уже NOT NULL как ключи секционирования
+SORT_COLUMNS = (
+    ('room_types', 'created_at'),
+    ('rooms', 'created_at'),
+    ('guests', 'created_at'),
+    ('bookings', 'created_at'),
+)
+
+
+def upgrade() -> None:
+    if not context.is_offline_mode():
+        # Курсор не может указать на строку с NULL в колонке сортировки, поэтому такие строки миграция
+        # не заполняет выдуманной датой, а останавливается: их нужно исправить вручную
+        missing = {}
+        for table, column in SORT_COLUMNS:
+            count = op.get_bind().execute(sa.text(f"SELECT count(*) FROM {table} WHERE {column} IS NULL")).scalar()
+            if count:
+                missing[table] = count
+        if missing:
+            raise RuntimeError(f"Rows without created_at must be fixed first: {missing}")
+
+    # Проверочное ограничение проверяется без блокировки записи, и SET NOT NULL по нему не читает таблицу
+    # заново под ACCESS EXCLUSIVE. Каждый шаг фиксируется сразу, чтобы короткие блокировки не копились
+    with op.get_context().autocommit_block():
+        for table, column in SORT_COLUMNS:
+            constraint = f'{table}_{column}_not_null'
+            op.execute(f"ALTER TABLE {table} ADD CONSTRAINT {constraint} CHECK ({column} IS NOT NULL) NOT VALID")
+            op.execute(f"ALTER TABLE {table} VALIDATE CONSTRAINT {constraint}")
+            op.alter_column(table, column, nullable=False)
+            op.drop_constraint(constraint, table, type_='check')
+
+
+def downgrade() -> None:
+    for table, column in SORT_COLUMNS:
+        op.alter_column(table, column, nullable=True)
@@ -0,0 +1,38 @@
+"""Define ON DELETE rules on foreign keys
+
+Revision ID: cbc088a380da
+Revises: 176b39295778
+Create Date: 2026-10-18 16:12:40.318205
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'cbc088a380da'
+down_revision: Union[str, None] = '176b39295778'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (имя ограничения, таблица, ссылочная таблица, колонка, правило удаления)
+FOREIGN_KEYS = (
+    ('payments_booking_id_fkey', 'payments', 'bookings', 'booking_id', 'CASCADE'),
+    ('bookings_guest_id_fkey', 'bookings', 'guests', 'guest_id', 'CASCADE'),
+    ('bookings_room_id_fkey', 'bookings', 'rooms', 'room_id', 'RESTRICT'),
+    ('rooms_room_type_id_fkey', 'rooms', 'room_types', 'room_type_id', 'RESTRICT'),
+)
+
+
+def upgrade() -> None:
+    for name, table, referred, column, ondelete in FOREIGN_KEYS:
+        op.drop_constraint(name, table, type_='foreignkey')
+        op.create_foreign_key(name, table, referred, [column], ['id'], ondelete=ondelete)
+
+
+def downgrade() -> None:
+    for name, table, referred, column, _ in FOREIGN_KEYS:
+        op.drop_constraint(name, table, type_='foreignkey')
+        op.create_foreign_key(name, table, referred, [column], ['id'])
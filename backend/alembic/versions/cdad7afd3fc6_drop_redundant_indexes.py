@@ -0,0 +1,42 @@
+"""Drop redundant indexes
+
+Revision ID: cdad7afd3fc6
+Revises: cbc088a380da
+Create Date: 2026-10-18 15:03:27.293709
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'cdad7afd3fc6'
+down_revision: Union[str, None] = 'cbc088a380da'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Сгенерировано scripts/index_advisor.py
+# (индекс, таблица, определение для отката)
+INDEXES = (
+    ('ix_bookings_check_in_date', 'bookings', 'CREATE INDEX CONCURRENTLY ix_bookings_check_in_date ON public.bookings USING btree (check_in_date)'),
+    ('ix_bookings_id', 'bookings', 'CREATE INDEX CONCURRENTLY ix_bookings_id ON public.bookings USING btree (id)'),
+    ('ix_guests_id', 'guests', 'CREATE INDEX CONCURRENTLY ix_guests_id ON public.guests USING btree (id)'),
+    ('ix_payments_id', 'payments', 'CREATE INDEX CONCURRENTLY ix_payments_id ON public.payments USING btree (id)'),
+    ('ix_room_types_id', 'room_types', 'CREATE INDEX CONCURRENTLY ix_room_types_id ON public.room_types USING btree (id)'),
+    ('ix_rooms_id', 'rooms', 'CREATE INDEX CONCURRENTLY ix_rooms_id ON public.rooms USING btree (id)'),
+    ('ix_users_id', 'users', 'CREATE INDEX CONCURRENTLY ix_users_id ON public.users USING btree (id)'),
+)
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, definition in INDEXES:
+            op.drop_index(name, table_name=table, postgresql_concurrently=" CONCURRENTLY " in definition)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for _, _, definition in INDEXES:
+            op.execute(definition)
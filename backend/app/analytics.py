@@ -0,0 +1,198 @@
+import logging
+import os
+import threading
+from datetime import date, timedelta
+from decimal import Decimal
+
+from sqlalchemy import Date, bindparam, cast, delete, func, select, text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from . import models
+
+logger = logging.getLogger(__name__)
+
+SOLD_BOOKING_STATUSES = models.ACTIVE_BOOKING_STATUSES + ('выселен',)
+GRANULARITIES = ("day", "month")
+
+ANALYTICS_REFRESH_INTERVAL = float(os.getenv("ANALYTICS_REFRESH_INTERVAL", "10"))
+
+# Пересчёты идут по очереди: следующий ждёт фиксации предыдущего и берёт снимок после неё,
+# поэтому старые итоги не перезаписывают более новые
+REFRESH_LOCK_SQL = text("SELECT pg_advisory_xact_lock(hashtext('daily_room_type_stats'))")
+REFRESH_TRY_LOCK_SQL = text("SELECT pg_try_advisory_xact_lock(hashtext('daily_room_type_stats'))")
+
+REFRESH_SQL = text(f"""
+    WITH days AS (
+        SELECT CAST(d AS date) AS day
+        FROM generate_series(CAST(:date_from AS date), CAST(:date_to AS date), interval '1 day') AS d
+    ),
+    sold AS (
+        SELECT days.day, rooms.room_type_id,
+               count(*) AS rooms_sold,
+               sum(bookings.total_price / NULLIF(bookings.check_out_date - bookings.check_in_date, 0)) AS room_revenue
+        FROM days
+        JOIN bookings ON bookings.check_in_date <= days.day AND bookings.check_out_date > days.day
+        JOIN rooms ON rooms.id = bookings.room_id
+        WHERE bookings.status IN :statuses
+          AND bookings.check_in_date > CAST(:date_from AS date) - {models.MAX_STAY_DAYS}
+          AND bookings.check_in_date <= CAST(:date_to AS date)
+        GROUP BY days.day, rooms.room_type_id
+    ),
+    paid AS (
+        SELECT CAST(payments.payment_date AS date) AS day, rooms.room_type_id,
+               sum(CASE WHEN payments.payment_status = 'возврат' THEN -payments.amount ELSE payments.amount END) AS payments_total
+        FROM payments
+        JOIN bookings ON bookings.id = payments.booking_id AND bookings.check_in_date = payments.booking_check_in_date
+        JOIN rooms ON rooms.id = bookings.room_id
+        WHERE payments.payment_status IN ('завершен', 'возврат')
+          AND payments.payment_date >= CAST(:date_from AS date)
+          AND payments.payment_date < CAST(:date_to AS date) + 1
+        GROUP BY 1, 2
+    )
+    INSERT INTO daily_room_type_stats (day, room_type_id, rooms_sold, room_revenue, payments_total, refreshed_at)
+    SELECT days.day, room_types.id,
+           COALESCE(sold.rooms_sold, 0), COALESCE(sold.room_revenue, 0), COALESCE(paid.payments_total, 0), now()
+    FROM days
+    CROSS JOIN room_types
+    LEFT JOIN sold ON sold.day = days.day AND sold.room_type_id = room_types.id
+    LEFT JOIN paid ON paid.day = days.day AND paid.room_type_id = room_types.id
+    ON CONFLICT (day, room_type_id) DO UPDATE SET
+        rooms_sold = EXCLUDED.rooms_sold,
+        room_revenue = EXCLUDED.room_revenue,
+        payments_total = EXCLUDED.payments_total,
+        refreshed_at = EXCLUDED.refreshed_at
+""").bindparams(bindparam("statuses", expanding=True))
+
+
+class QueueWorker:
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def start(self, session_factory):
+        if self.interval <= 0 or self.thread is not None:
+            return
+        self.stopped.clear()
+        self.thread = threading.Thread(target=self._run, args=(session_factory,), name="analytics-queue", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        if self.thread is None:
+            return
+        self.stopped.set()
+        self.thread.join()
+        self.thread = None
+
+    def _run(self, session_factory):
+        while not self.stopped.wait(self.interval):
+            try:
+                with session_factory() as db:
+                    refresh_queued(db)
+            except SQLAlchemyError:
+                logger.exception("Failed to refresh queued daily_room_type_stats days, will retry")
+
+
+def merge_ranges(ranges) -> list:
+    merged = []
+    for first, last in sorted(ranges):
+        if merged and first <= merged[-1][1] + timedelta(days=1):
+            merged[-1] = (merged[-1][0], max(merged[-1][1], last))
+        else:
+            merged.append((first, last))
+    return merged
+
+def _refresh_range(db: Session, date_from: date, date_to: date):
+    db.execute(REFRESH_SQL, {"date_from": date_from, "date_to": date_to, "statuses": list(SOLD_BOOKING_STATUSES)})
+
+def refresh(db: Session, date_from: date, date_to: date) -> int:
+    db.execute(REFRESH_LOCK_SQL)
+    _refresh_range(db, date_from, date_to)
+    db.commit()
+    return (date_to - date_from).days + 1
+
+# Дни удаляются из очереди и пересчитываются в одной транзакции: при ошибке они остаются в очереди.
+# Если пересчёт уже идёт в другом процессе, возвращает None
+def refresh_queued(db: Session):
+    if not db.execute(REFRESH_TRY_LOCK_SQL).scalar():
+        db.rollback()
+        return None
+    queue = models.DailyRoomTypeStatsQueue
+    ranges = merge_ranges(db.execute(delete(queue).returning(queue.date_from, queue.date_to)).tuples().all())
+    for first, last in ranges:
+        _refresh_range(db, first, last)
+    db.commit()
+    return ranges
+
+def queue_status(db: Session) -> dict:
+    queue = models.DailyRoomTypeStatsQueue
+    pending, oldest = db.execute(select(func.count(), func.min(queue.queued_at))).one()
+    return {"pending": pending, "oldest_queued_at": oldest}
+
+worker = QueueWorker(ANALYTICS_REFRESH_INTERVAL)
+
+def _period(granularity: str):
+    return cast(func.date_trunc(granularity, models.DailyRoomTypeStats.day), Date).label("period")
+
+def _rollup(db: Session, date_from: date, date_to: date, room_type_id, granularity: str, *columns):
+    stats = models.DailyRoomTypeStats
+    period = _period(granularity)
+    query = (
+        select(period, stats.room_type_id, func.count().label("days"), *columns)
+        .where(stats.day >= date_from, stats.day <= date_to)
+        .group_by(period, stats.room_type_id)
+        .order_by(period, stats.room_type_id)
+    )
+    if room_type_id is not None:
+        query = query.where(stats.room_type_id == room_type_id)
+    return db.execute(query).all()
+
+def _ratio(numerator, denominator, digits: int = 4):
+    if not denominator:
+        return None
+    return round(Decimal(numerator) / Decimal(denominator), digits)
+
+def rooms_by_type(db: Session) -> dict:
+    return dict(db.execute(select(models.Room.room_type_id, func.count()).group_by(models.Room.room_type_id)).all())
+
+def occupancy(db: Session, date_from: date, date_to: date, room_type_id=None, granularity: str = "day") -> list:
+    stats = models.DailyRoomTypeStats
+    rows = _rollup(
+        db, date_from, date_to, room_type_id, granularity,
+        func.sum(stats.rooms_sold).label("rooms_sold"),
+        func.sum(stats.room_revenue).label("room_revenue"),
+    )
+    rooms = rooms_by_type(db)
+    result = []
+    for row in rows:
+        available = rooms.get(row.room_type_id, 0) * row.days
+        result.append({
+            "period": row.period,
+            "room_type_id": row.room_type_id,
+            "rooms_total": rooms.get(row.room_type_id, 0),
+            "room_nights_available": available,
+            "room_nights_sold": row.rooms_sold,
+            "occupancy_rate": _ratio(row.rooms_sold, available),
+            "adr": _ratio(row.room_revenue, row.rooms_sold, 2),
+        })
+    return result
+
+def revenue(db: Session, date_from: date, date_to: date, room_type_id=None, granularity: str = "day") -> list:
+    stats = models.DailyRoomTypeStats
+    rows = _rollup(
+        db, date_from, date_to, room_type_id, granularity,
+        func.sum(stats.room_revenue).label("room_revenue"),
+        func.sum(stats.payments_total).label("payments_total"),
+    )
+    rooms = rooms_by_type(db)
+    return [
+        {
+            "period": row.period,
+            "room_type_id": row.room_type_id,
+            "room_revenue": row.room_revenue,
+            "payments_total": row.payments_total,
+            "revpar": _ratio(row.room_revenue, rooms.get(row.room_type_id, 0) * row.days, 2),
+        }
+        for row in rows
+    ]
@@ -0,0 +1,187 @@
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from datetime import date
+
+from . import models, schemas, cache, responses, crud_async as crud
+from .database import get_async_db, get_async_read_db
+from .loaders import BOOKING_RELATIONS, ROOM_RELATIONS, expand_query
+from .pagination import Keyset, cursor_headers, keyset_query
+
+router = APIRouter()
+
+# Каталог кэшируется и читается с PRIMARY, остальные GET-эндпоинты идут на реплику через get_async_read_db
+@router.get("/room-types/", response_model=List[schemas.RoomType])
+async def read_room_types(request: Request, skip: int = 0, limit: int = 100, keyset: Optional[Keyset] = Depends(keyset_query(models.RoomType)), db: AsyncSession = Depends(get_async_db)):
+    async def load():
+        room_types = await crud.get_room_types(db, skip=skip, limit=limit, keyset=keyset)
+        return room_types, cursor_headers(keyset, room_types, limit)
+    return await cache.catalog.respond_async(request, cache.ROOM_TYPE_TAGS, List[schemas.RoomType], load)
+
+@router.get("/room-types/{room_type_id}", response_model=schemas.RoomType)
+async def read_room_type(request: Request, room_type_id: int, db: AsyncSession = Depends(get_async_db)):
+    async def load():
+        db_room_type = await crud.get_room_type(db, room_type_id=room_type_id)
+        if db_room_type is None:
+            raise HTTPException(status_code=404, detail="Тип номера не найден")
+        return db_room_type, {}
+    return await cache.catalog.respond_async(request, cache.ROOM_TYPE_TAGS, schemas.RoomType, load)
+
+@router.post("/room-types/", response_model=schemas.RoomType, status_code=status.HTTP_201_CREATED)
+async def create_room_type(room_type: schemas.RoomTypeCreate, db: AsyncSession = Depends(get_async_db)):
+    return await crud.create_room_type(db=db, room_type=room_type)
+
+@router.put("/room-types/{room_type_id}", response_model=schemas.RoomType)
+async def update_room_type(room_type_id: int, room_type: schemas.RoomTypeUpdate, db: AsyncSession = Depends(get_async_db)):
+    db_room_type = await crud.update_room_type(db, room_type_id=room_type_id, room_type=room_type)
+    if db_room_type is None:
+        raise HTTPException(status_code=404, detail="Тип номера не найден")
+    return db_room_type
+
+@router.delete("/room-types/{room_type_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_room_type(room_type_id: int, db: AsyncSession = Depends(get_async_db)):
+    success = await crud.delete_room_type(db, room_type_id=room_type_id)
+    if not success:
+        raise HTTPException(status_code=404, detail="Тип номера не найден")
+    return None
+
+@router.get("/rooms/", response_model=List[schemas.Room])
+async def read_rooms(request: Request, skip: int = 0, limit: int = 100, status: Optional[str] = None, keyset: Optional[Keyset] = Depends(keyset_query(models.Room)), expand: frozenset = Depends(expand_query(ROOM_RELATIONS)), db: AsyncSession = Depends(get_async_db)):
+    async def load():
+        rooms = await crud.get_rooms(db, skip=skip, limit=limit, status=status, keyset=keyset, expand=expand)
+        return rooms, cursor_headers(keyset, rooms, limit)
+    return await cache.catalog.respond_async(request, cache.ROOM_TAGS, List[schemas.Room], load)
+
+@router.get("/rooms/{room_id}", response_model=schemas.Room)
+async def read_room(request: Request, room_id: int, expand: frozenset = Depends(expand_query(ROOM_RELATIONS)), db: AsyncSession = Depends(get_async_db)):
+    async def load():
+        db_room = await crud.get_room(db, room_id=room_id, expand=expand)
+        if db_room is None:
+            raise HTTPException(status_code=404, detail="Номер не найден")
+        return db_room, {}
+    return await cache.catalog.respond_async(request, cache.ROOM_TAGS, schemas.Room, load)
+
+@router.post("/rooms/", response_model=schemas.Room, status_code=status.HTTP_201_CREATED)
+async def create_room(room: schemas.RoomCreate, db: AsyncSession = Depends(get_async_db)):
+    return await crud.create_room(db=db, room=room)
+
+@router.put("/rooms/{room_id}", response_model=schemas.Room)
+async def update_room(room_id: int, room: schemas.RoomUpdate, db: AsyncSession = Depends(get_async_db)):
+    db_room = await crud.update_room(db, room_id=room_id, room=room)
+    if db_room is None:
+        raise HTTPException(status_code=404, detail="Номер не найден")
+    return db_room
+
+@router.delete("/rooms/{room_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_room(room_id: int, db: AsyncSession = Depends(get_async_db)):
+    success = await crud.delete_room(db, room_id=room_id)
+    if not success:
+        raise HTTPException(status_code=404, detail="Номер не найден")
+    return None
+
+@router.get("/rooms/available/", response_model=List[schemas.Room])
+async def read_available_rooms(response: Response, check_in: date, check_out: date, expand: frozenset = Depends(expand_query(ROOM_RELATIONS)), db: AsyncSession = Depends(get_async_read_db)):
+    if check_in >= check_out:
+        raise HTTPException(status_code=400, detail="Дата выезда должна быть позже даты заезда")
+    rooms = await crud.get_available_rooms(db, check_in=check_in, check_out=check_out, expand=expand)
+    return responses.respond(response, List[schemas.Room], rooms, {})
+
+@router.get("/guests/", response_model=List[schemas.Guest])
+async def read_guests(response: Response, skip: int = 0, limit: int = 100, keyset: Optional[Keyset] = Depends(keyset_query(models.Guest)), db: AsyncSession = Depends(get_async_read_db)):
+    guests = await crud.get_guests(db, skip=skip, limit=limit, keyset=keyset)
+    return responses.respond(response, List[schemas.Guest], guests, cursor_headers(keyset, guests, limit))
+
+@router.get("/guests/{guest_id}", response_model=schemas.Guest)
+async def read_guest(guest_id: int, db: AsyncSession = Depends(get_async_read_db)):
+    db_guest = await crud.get_guest(db, guest_id=guest_id)
+    if db_guest is None:
+        raise HTTPException(status_code=404, detail="Гость не найден")
+    return db_guest
+
+@router.post("/guests/", response_model=schemas.Guest, status_code=status.HTTP_201_CREATED)
+async def create_guest(guest: schemas.GuestCreate, db: AsyncSession = Depends(get_async_db)):
+    db_guest = await crud.create_guest(db=db, guest=guest)
+    if db_guest is None:
+        raise HTTPException(status_code=400, detail="Email уже зарегистрирован")
+    return db_guest
+
+@router.put("/guests/{guest_id}", response_model=schemas.Guest)
+async def update_guest(guest_id: int, guest: schemas.GuestUpdate, db: AsyncSession = Depends(get_async_db)):
+    db_guest = await crud.update_guest(db, guest_id=guest_id, guest=guest)
+    if db_guest is None:
+        raise HTTPException(status_code=404, detail="Гость не найден")
+    return db_guest
+
+@router.delete("/guests/{guest_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_guest(guest_id: int, db: AsyncSession = Depends(get_async_db)):
+    success = await crud.delete_guest(db, guest_id=guest_id)
+    if not success:
+        raise HTTPException(status_code=404, detail="Гость не найден")
+    return None
+
+@router.get("/bookings/", response_model=List[schemas.Booking])
+async def read_bookings(response: Response, skip: int = 0, limit: int = 100, status: Optional[str] = None, date_from: Optional[date] = None, date_to: Optional[date] = None, keyset: Optional[Keyset] = Depends(keyset_query(models.Booking)), expand: frozenset = Depends(expand_query(BOOKING_RELATIONS)), db: AsyncSession = Depends(get_async_read_db)):
+    bookings = await crud.get_bookings(db, skip=skip, limit=limit, status=status, keyset=keyset, expand=expand, date_from=date_from, date_to=date_to)
+    return responses.respond(response, List[schemas.Booking], bookings, cursor_headers(keyset, bookings, limit))
+
+@router.get("/bookings/{booking_id}", response_model=schemas.Booking)
+async def read_booking(booking_id: int, expand: frozenset = Depends(expand_query(BOOKING_RELATIONS)), db: AsyncSession = Depends(get_async_read_db)):
+    db_booking = await crud.get_booking(db, booking_id=booking_id, expand=expand)
+    if db_booking is None:
+        raise HTTPException(status_code=404, detail="Бронирование не найдено")
+    return db_booking
+
+@router.post("/bookings/", response_model=schemas.Booking, status_code=status.HTTP_201_CREATED)
+async def create_booking(booking: schemas.BookingCreate, db: AsyncSession = Depends(get_async_db)):
+    if booking.check_in_date >= booking.check_out_date:
+        raise HTTPException(status_code=400, detail="Дата выезда должна быть позже даты заезда")
+    if (booking.check_out_date - booking.check_in_date).days > models.MAX_STAY_DAYS:
+        raise HTTPException(status_code=400, detail=f"Бронирование не может быть длиннее {models.MAX_STAY_DAYS} дней")
+    return await crud.create_booking(db=db, booking=booking)
+
+@router.put("/bookings/{booking_id}", response_model=schemas.Booking)
+async def update_booking(booking_id: int, booking: schemas.BookingUpdate, db: AsyncSession = Depends(get_async_db)):
+    db_booking = await crud.update_booking(db, booking_id=booking_id, booking=booking)
+    if db_booking is None:
+        raise HTTPException(status_code=404, detail="Бронирование не найдено")
+    return db_booking
+
+@router.delete("/bookings/{booking_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_booking(booking_id: int, db: AsyncSession = Depends(get_async_db)):
+    success = await crud.delete_booking(db, booking_id=booking_id)
+    if not success:
+        raise HTTPException(status_code=404, detail="Бронирование не найдено")
+    return None
+
+@router.get("/payments/", response_model=List[schemas.Payment])
+async def read_payments(response: Response, skip: int = 0, limit: int = 100, date_from: Optional[date] = None, date_to: Optional[date] = None, keyset: Optional[Keyset] = Depends(keyset_query(models.Payment)), db: AsyncSession = Depends(get_async_read_db)):
+    payments = await crud.get_payments(db, skip=skip, limit=limit, keyset=keyset, date_from=date_from, date_to=date_to)
+    return responses.respond(response, List[schemas.Payment], payments, cursor_headers(keyset, payments, limit))
+
+@router.get("/payments/{payment_id}", response_model=schemas.Payment)
+async def read_payment(payment_id: int, db: AsyncSession = Depends(get_async_read_db)):
+    db_payment = await crud.get_payment(db, payment_id=payment_id)
+    if db_payment is None:
+        raise HTTPException(status_code=404, detail="Платеж не найден")
+    return db_payment
+
+@router.post("/payments/", response_model=schemas.Payment, status_code=status.HTTP_201_CREATED)
+async def create_payment(payment: schemas.PaymentCreate, db: AsyncSession = Depends(get_async_db)):
+    db_booking = await crud.get_booking(db, booking_id=payment.booking_id, expand=())
+    if db_booking is None:
+        raise HTTPException(status_code=404, detail="Бронирование не найдено")
+    return await crud.create_payment(db=db, payment=payment)
+
+@router.put("/payments/{payment_id}", response_model=schemas.Payment)
+async def update_payment(payment_id: int, payment: schemas.PaymentUpdate, db: AsyncSession = Depends(get_async_db)):
+    db_payment = await crud.update_payment(db, payment_id=payment_id, payment=payment)
+    if db_payment is None:
+        raise HTTPException(status_code=404, detail="Платеж не найден")
+    return db_payment
+
+@router.delete("/payments/{payment_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_payment(payment_id: int, db: AsyncSession = Depends(get_async_db)):
+    success = await crud.delete_payment(db, payment_id=payment_id)
+    if not success:
+        raise HTTPException(status_code=404, detail="Платеж не найден")
+    return None
@@ -0,0 +1,105 @@
+import os
+import threading
+from bisect import bisect_left, insort
+from datetime import date
+
+from sqlalchemy.orm import Session
+
+from . import models
+
+AVAILABILITY_INDEX_ENABLED = os.getenv("AVAILABILITY_INDEX_ENABLED", "false").lower() in ("1", "true", "yes")
+
+
+class RoomIntervals:
+    def __init__(self, intervals=()):
+        # Начальный набор сортируется и обходится один раз, add — для единичных записей
+        self.intervals = sorted(intervals)
+        self._rebuild()
+
+    def add(self, check_in: date, check_out: date, booking_id: int):
+        insort(self.intervals, (check_in, check_out, booking_id))
+        self._rebuild()
+
+    def remove(self, check_in: date, check_out: date, booking_id: int):
+        position = bisect_left(self.intervals, (check_in, check_out, booking_id))
+        if position < len(self.intervals) and self.intervals[position][2] == booking_id:
+            del self.intervals[position]
+            self._rebuild()
+
+    def overlaps(self, check_in: date, check_out: date) -> bool:
+        position = bisect_left(self.intervals, (check_out,))
+        return position > 0 and self.max_ends[position - 1] > check_in
+
+    def _rebuild(self):
+        max_ends = []
+        current = None
+        for _, check_out, _ in self.intervals:
+            if current is None or check_out > current:
+                current = check_out
+            max_ends.append(current)
+        self.max_ends = max_ends
+
+
+class AvailabilityIndex:
+    def __init__(self):
+        self.rooms = {}
+        self.bookings = {}
+        self.ready = False
+        self.lock = threading.Lock()
+
+    def warm(self, db: Session):
+        rows = db.query(
+            models.Booking.id,
+            models.Booking.room_id,
+            models.Booking.check_in_date,
+            models.Booking.check_out_date,
+        ).filter(models.Booking.status.in_(models.ACTIVE_BOOKING_STATUSES)).all()
+        by_room = {}
+        bookings = {}
+        for booking_id, room_id, check_in, check_out in rows:
+            by_room.setdefault(room_id, []).append((check_in, check_out, booking_id))
+            bookings[booking_id] = (room_id, check_in, check_out)
+        rooms = {room_id: RoomIntervals(intervals) for room_id, intervals in by_room.items()}
+        with self.lock:
+            self.rooms = rooms
+            self.bookings = bookings
+            self.ready = True
+
+    def upsert(self, booking: models.Booking):
+        with self.lock:
+            if not self.ready:
+                return
+            self._discard(booking.id)
+            if booking.status in models.ACTIVE_BOOKING_STATUSES:
+                self._add(booking.id, booking.room_id, booking.check_in_date, booking.check_out_date)
+
+    def discard(self, booking_id: int):
+        with self.lock:
+            if not self.ready:
+                return
+            self._discard(booking_id)
+
+    def booked_room_ids(self, check_in: date, check_out: date) -> set:
+        with self.lock:
+            return {
+                room_id for room_id, intervals in self.rooms.items()
+                if intervals.overlaps(check_in, check_out)
+            }
+
+    def _add(self, booking_id, room_id, check_in, check_out):
+        self.rooms.setdefault(room_id, RoomIntervals()).add(check_in, check_out, booking_id)
+        self.bookings[booking_id] = (room_id, check_in, check_out)
+
+    def _discard(self, booking_id):
+        entry = self.bookings.pop(booking_id, None)
+        if entry is None:
+            return
+        room_id, check_in, check_out = entry
+        intervals = self.rooms.get(room_id)
+        if intervals is not None:
+            intervals.remove(check_in, check_out, booking_id)
+            if not intervals.intervals:
+                del self.rooms[room_id]
+
+
+index = AvailabilityIndex()
@@ -0,0 +1,76 @@
+import json
+import os
+
+from fastapi import HTTPException, Request
+from pydantic import ValidationError
+
+BULK_BATCH_SIZE = int(os.getenv("BULK_BATCH_SIZE", "500"))
+BULK_MAX_BATCH_SIZE = 10000
+NDJSON_MEDIA_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+
+
+async def parse_body(request: Request):
+    body = await request.body()
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+    try:
+        if content_type in NDJSON_MEDIA_TYPES:
+            return [json.loads(line) for line in body.decode().splitlines() if line.strip()]
+        return json.loads(body)
+    except (UnicodeDecodeError, ValueError):
+        raise HTTPException(status_code=400, detail="Некорректный JSON в теле запроса")
+
+async def read_rows(request: Request) -> list:
+    rows = await parse_body(request)
+    if not isinstance(rows, list):
+        raise HTTPException(status_code=400, detail="Ожидается JSON-массив или NDJSON")
+    return rows
+
+async def read_row_or_rows(request: Request) -> list:
+    rows = await parse_body(request)
+    if isinstance(rows, dict):
+        return [rows]
+    if not isinstance(rows, list):
+        raise HTTPException(status_code=400, detail="Ожидается JSON-объект, JSON-массив или NDJSON")
+    return rows
+
+def validate_rows(schema, rows: list, check=None, exclude_unset: bool = False):
+    valid = []
+    errors = []
+    for index, row in enumerate(rows):
+        try:
+            item = schema.model_validate(row)
+        except ValidationError as exc:
+            errors.append({"index": index, "detail": exc.errors(include_url=False, include_context=False)})
+            continue
+        if check is not None:
+            problem = check(item)
+            if problem:
+                errors.append({"index": index, "detail": problem})
+                continue
+        valid.append((index, item.model_dump(exclude_unset=exclude_unset)))
+    return valid, errors
+
+def bulk_result(inserted: list, errors: list) -> dict:
+    return {
+        "inserted": len(inserted),
+        "ids": [row_id for row_id, _ in inserted],
+        "errors": sorted(errors, key=lambda error: error["index"]),
+    }
+
+def upsert_result(upserted: list, errors: list) -> dict:
+    return {
+        "inserted": sum(1 for _, inserted in upserted if inserted),
+        "updated": sum(1 for _, inserted in upserted if not inserted),
+        "ids": [row_id for row_id, _ in upserted],
+        "errors": sorted(errors, key=lambda error: error["index"]),
+    }
+
+def request_body_schema(schema_name: str, single: bool = False) -> dict:
+    items = {"type": "array", "items": {"$ref": f"#/components/schemas/{schema_name}"}}
+    if single:
+        items = {"oneOf": [{"$ref": f"#/components/schemas/{schema_name}"}, items]}
+    content = {
+        "application/json": {"schema": items},
+        "application/x-ndjson": {"schema": {"$ref": f"#/components/schemas/{schema_name}"}},
+    }
+    return {"requestBody": {"required": True, "content": content}}
@@ -0,0 +1,124 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple
+
+from fastapi import Request, Response
+
+from .etag import ETAG_HEADER, compute_etag, etag_matches, not_modified
+from .responses import serialize
+
+CATALOG_CACHE_TTL = float(os.getenv("CATALOG_CACHE_TTL", "30"))
+CATALOG_CACHE_MAX_ENTRIES = int(os.getenv("CATALOG_CACHE_MAX_ENTRIES", "512"))
+
+ROOM_TYPE_TAGS = ("room_types",)
+ROOM_TAGS = ("rooms", "room_types")
+
+
+class CachedResponse(NamedTuple):
+    body: bytes
+    etag: str
+    headers: dict
+    tags: tuple
+    expires_at: float
+
+
+def request_key(request: Request) -> tuple:
+    return request.url.path, tuple(sorted(request.query_params.multi_items()))
+
+
+class ResponseCache:
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.versions = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_entries > 0
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry.expires_at <= time.monotonic():
+                del self.entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def version(self, tags: tuple) -> tuple:
+        with self.lock:
+            return tuple(self.versions.get(tag, 0) for tag in tags)
+
+    def put(self, key, tags: tuple, version: tuple, body: bytes, headers: dict) -> CachedResponse:
+        entry = CachedResponse(body, compute_etag(body), headers, tags, time.monotonic() + self.ttl)
+        with self.lock:
+            if not self.enabled or version != tuple(self.versions.get(tag, 0) for tag in tags):
+                return entry
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+        return entry
+
+    def invalidate(self, *tags: str):
+        with self.lock:
+            for tag in tags:
+                self.versions[tag] = self.versions.get(tag, 0) + 1
+            stale = [key for key, entry in self.entries.items() if set(entry.tags) & set(tags)]
+            for key in stale:
+                del self.entries[key]
+            self.invalidations += 1
+
+    def stats(self) -> dict:
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "ttl_seconds": self.ttl,
+                "max_entries": self.max_entries,
+                "entries": len(self.entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+    def respond(self, request: Request, tags: tuple, schema, load) -> Response:
+        key = request_key(request)
+        entry = self.get(key) if self.enabled else None
+        if entry is None:
+            version = self.version(tags)
+            value, headers = load()
+            entry = self.put(key, tags, version, serialize(schema, value), headers)
+        return render(request, entry)
+
+    async def respond_async(self, request: Request, tags: tuple, schema, load) -> Response:
+        key = request_key(request)
+        entry = self.get(key) if self.enabled else None
+        if entry is None:
+            version = self.version(tags)
+            value, headers = await load()
+            entry = self.put(key, tags, version, serialize(schema, value), headers)
+        return render(request, entry)
+
+
+def render(request: Request, entry: CachedResponse) -> Response:
+    if etag_matches(request.headers.get("if-none-match"), entry.etag):
+        return not_modified(entry.etag)
+    return Response(content=entry.body, media_type="application/json", headers={**entry.headers, ETAG_HEADER: entry.etag})
+
+catalog = ResponseCache(CATALOG_CACHE_TTL, CATALOG_CACHE_MAX_ENTRIES)
@@ -1,10 +1,107 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import and_
-from . import models, schemas
-from datetime import date
+from contextlib import contextmanager
 
-def get_room_types(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.RoomType).offset(skip).limit(limit).all()
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy import Boolean, and_, delete, exists, func, insert, literal_column, or_, select, text, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import IntegrityError
+from . import models, schemas, availability, cache, security
+from .loaders import BOOKING_RELATIONS, ROOM_RELATIONS, booking_options, room_options
+from .pagination import Keyset, paginate
+from datetime import date, datetime, time, timedelta
+import re
+
+EXCLUSION_VIOLATION = "23P01"
+FOREIGN_KEY_VIOLATION = "23503"
+# Триграммный индекс помогает только для подстрок от трёх символов
+SEARCH_TERM_MIN_LENGTH = 3
+
+class BookingConflictError(Exception):
+    pass
+
+class RecordInUseError(Exception):
+    pass
+
+def is_booking_conflict(exc: IntegrityError) -> bool:
+    return getattr(exc.orig, "pgcode", None) == EXCLUSION_VIOLATION
+
+@contextmanager
+def booking_conflicts(db: Session):
+    try:
+        yield
+    except IntegrityError as exc:
+        db.rollback()
+        if is_booking_conflict(exc):
+            raise BookingConflictError() from exc
+        raise
+
+def commit_booking(db: Session):
+    with booking_conflicts(db):
+        db.commit()
+
+def update_returning(db: Session, model, object_id: int, values: dict, loader_options=None):
+    if values:
+        updated = update(model).where(model.id == object_id).values(values).returning(*model.__table__.columns).cte("updated")
+        entity = aliased(model, updated)
+        statement = select(entity)
+    else:
+        entity = model
+        statement = select(model).where(model.id == object_id)
+    if loader_options is not None:
+        statement = statement.options(*loader_options(entity=entity))
+    return db.scalars(statement.execution_options(populate_existing=True)).first()
+
+def delete_returning(db: Session, model, object_id: int, *columns):
+    statement = delete(model).where(model.id == object_id).returning(model.id, *columns)
+    try:
+        row = db.execute(statement.execution_options(synchronize_session=False)).first()
+        db.commit()
+    except IntegrityError as exc:
+        db.rollback()
+        if getattr(exc.orig, "pgcode", None) == FOREIGN_KEY_VIOLATION:
+            raise RecordInUseError() from exc
+        raise
+    return row
+
+def forget_deleted_bookings(db: Session, rows):
+    for row in rows:
+        availability.index.discard(row.id)
+
+def update_booking_returning(db: Session, booking_id: int, values: dict):
+    with booking_conflicts(db):
+        db_booking = update_returning(db, models.Booking, booking_id, values, booking_options)
+        db.commit()
+    return db_booking
+
+def _insert_returning_ids(db: Session, model, values: list):
+    statement = insert(model).returning(model.id, sort_by_parameter_order=True)
+    return list(db.scalars(statement, values))
+
+def write_in_batches(db: Session, rows: list, batch_size: int, write):
+    written = []
+    errors = []
+    for start in range(0, len(rows), batch_size):
+        batch = rows[start:start + batch_size]
+        try:
+            with db.begin_nested():
+                written.extend(write(db, batch))
+        except IntegrityError:
+            for index, values in batch:
+                try:
+                    with db.begin_nested():
+                        written.extend(write(db, [(index, values)]))
+                except IntegrityError as exc:
+                    errors.append({"index": index, "detail": str(exc.orig).splitlines()[0]})
+        db.commit()
+    return written, errors
+
+def bulk_insert(db: Session, model, rows: list, batch_size: int):
+    def write(db, batch):
+        ids = _insert_returning_ids(db, model, [values for _, values in batch])
+        return zip(ids, (values for _, values in batch))
+    return write_in_batches(db, rows, batch_size, write)
+
+def get_room_types(db: Session, skip: int = 0, limit: int = 100, keyset: Keyset = None):
+    return paginate(db.query(models.RoomType), models.RoomType, skip, limit, keyset).all()
 
 def get_room_type(db: Session, room_type_id: int):
     return db.query(models.RoomType).filter(models.RoomType.id == room_type_id).first()
@@ -13,36 +110,36 @@ def create_room_type(db: Session, room_type: schemas.RoomTypeCreate):
     db_room_type = models.RoomType(**room_type.model_dump())
     db.add(db_room_type)
     db.commit()
+    cache.catalog.invalidate(*cache.ROOM_TYPE_TAGS)
     db.refresh(db_room_type)
     return db_room_type
 
-def get_rooms(db: Session, skip: int = 0, limit: int = 100, status: str = None):
-    query = db.query(models.Room)
+def get_rooms(db: Session, skip: int = 0, limit: int = 100, status: str = None, keyset: Keyset = None, expand=ROOM_RELATIONS):
+    query = db.query(models.Room).options(*room_options(expand))
     if status:
         query = query.filter(models.Room.status == status)
-    return query.offset(skip).limit(limit).all()
+    return paginate(query, models.Room, skip, limit, keyset).all()
 
-def get_room(db: Session, room_id: int):
-    return db.query(models.Room).filter(models.Room.id == room_id).first()
+def get_room(db: Session, room_id: int, expand=ROOM_RELATIONS):
+    return db.query(models.Room).options(*room_options(expand)).filter(models.Room.id == room_id).first()
 
 def create_room(db: Session, room: schemas.RoomCreate):
     db_room = models.Room(**room.model_dump())
     db.add(db_room)
     db.commit()
+    cache.catalog.invalidate(*cache.ROOM_TAGS)
     db.refresh(db_room)
     return db_room
 
 def update_room(db: Session, room_id: int, room: schemas.RoomUpdate):
-    db_room = get_room(db, room_id)
+    db_room = update_returning(db, models.Room, room_id, room.model_dump(exclude_unset=True), room_options)
+    db.commit()
     if db_room:
-        for key, value in room.model_dump(exclude_unset=True).items():
-            setattr(db_room, key, value)
-        db.commit()
-        db.refresh(db_room)
+        cache.catalog.invalidate(*cache.ROOM_TAGS)
     return db_room
 
-def get_guests(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.Guest).offset(skip).limit(limit).all()
+def get_guests(db: Session, skip: int = 0, limit: int = 100, keyset: Keyset = None):
+    return paginate(db.query(models.Guest), models.Guest, skip, limit, keyset).all()
 
 def get_guest(db: Session, guest_id: int):
     return db.query(models.Guest).filter(models.Guest.id == guest_id).first()
@@ -51,78 +148,324 @@ def get_guest_by_email(db: Session, email: str):
     return db.query(models.Guest).filter(models.Guest.email == email).first()
 
 def create_guest(db: Session, guest: schemas.GuestCreate):
-    db_guest = models.Guest(**guest.model_dump())
-    db.add(db_guest)
+    statement = (
+        pg_insert(models.Guest)
+        .values(**guest.model_dump())
+        .on_conflict_do_nothing(index_elements=[models.Guest.email])
+        .returning(models.Guest)
+    )
+    db_guest = db.scalars(statement).first()
     db.commit()
-    db.refresh(db_guest)
     return db_guest
 
+def bulk_create_guests(db: Session, rows: list, batch_size: int):
+    return bulk_insert(db, models.Guest, rows, batch_size)
+
+def last_row_per_key(rows: list, key: str):
+    latest = {}
+    errors = []
+    for index, values in rows:
+        previous = latest.get(values[key])
+        if previous is not None:
+            errors.append({"index": previous[0], "detail": f"Строка заменена строкой {index} с тем же значением {key}"})
+        latest[values[key]] = (index, values)
+    return sorted(latest.values(), key=lambda row: row[0]), errors
+
+def _upsert_guest_rows(db: Session, key: str, batch: list):
+    # Обновляются только переданные поля; строки с разным набором полей идут отдельными операторами
+    table = models.Guest.__table__
+    groups = {}
+    for _, values in batch:
+        groups.setdefault(tuple(values), []).append(values)
+    results = {}
+    for columns, rows in groups.items():
+        statement = pg_insert(table).values(rows)
+        updated_columns = {name: statement.excluded[name] for name in columns if name != key}
+        statement = statement.on_conflict_do_update(index_elements=[key], set_=updated_columns).returning(
+            table.c.id, table.c[key], literal_column("xmax = 0", Boolean).label("inserted"),
+        )
+        results.update({row[1]: (row.id, row.inserted) for row in db.execute(statement)})
+    return [results[values[key]] for _, values in batch]
+
+def upsert_guests(db: Session, rows: list, key: str, batch_size: int):
+    rows, errors = last_row_per_key(rows, key)
+    upserted, db_errors = write_in_batches(db, rows, batch_size, lambda db, batch: _upsert_guest_rows(db, key, batch))
+    return upserted, errors + db_errors
+
+def guest_search_terms(q: str) -> list:
+    return [term for term in q.split() if len(term) >= SEARCH_TERM_MIN_LENGTH]
+
+# Сколько похожих слов словаря guest_name_words подбирается к каждому слову запроса
+GUEST_NAME_CANDIDATES = 5
+
+# GiST-индекс отдаёт слова словаря в порядке word_similarity, поэтому читается не больше :candidates слов
+# на слово запроса. Из них остаются похожие: % — сходство целых слов (опечатки), <% — сходство с частью
+# слова (начало фамилии)
+GUEST_NAME_WORDS_SQL = text("""
+    SELECT t.position, w.word, w.score
+    FROM unnest(CAST(:terms AS text[])) WITH ORDINALITY AS t(term, position)
+    CROSS JOIN LATERAL (
+        SELECT word, greatest(word_similarity(t.term, word), similarity(t.term, word)) AS score
+        FROM guest_name_words
+        ORDER BY word <->> t.term
+        LIMIT :candidates
+    ) AS w
+    WHERE t.term % w.word OR t.term <% w.word
+""")
+
+# Каждая пара (имя, фамилия) и каждое одиночное слово дают не больше :limit гостей прямо из B-tree
+# индексов в порядке итоговой сортировки, поэтому сортируются только эти строки, а не все совпадения
+GUEST_NAME_SEARCH_SQL = text("""
+    SELECT guests.*
+    FROM (
+        SELECT DISTINCT ON (id) id, score, fields
+        FROM (
+            SELECT g.id, c.score, 2 AS fields
+            FROM unnest(CAST(:pair_first AS text[]), CAST(:pair_last AS text[]), CAST(:pair_score AS float8[]))
+                AS c(first_name, last_name, score)
+            CROSS JOIN LATERAL (
+                SELECT id FROM guests
+                WHERE first_name = c.first_name AND last_name = c.last_name
+                ORDER BY id
+                LIMIT :limit
+            ) AS g
+            UNION ALL
+            SELECT g.id, c.score, 1
+            FROM unnest(CAST(:single_word AS text[]), CAST(:single_score AS float8[])) AS c(word, score)
+            CROSS JOIN LATERAL (
+                (SELECT id FROM guests WHERE first_name = c.word ORDER BY last_name, id LIMIT :limit)
+                UNION ALL
+                (SELECT id FROM guests WHERE last_name = c.word ORDER BY first_name, id LIMIT :limit)
+            ) AS g
+        ) AS found
+        ORDER BY id, score DESC, fields DESC
+    ) AS ranked
+    JOIN guests ON guests.id = ranked.id
+    ORDER BY ranked.score DESC, ranked.fields DESC, guests.last_name, guests.first_name, guests.id
+    LIMIT :limit
+""")
+
+def guest_name_words(db: Session, terms: list) -> list:
+    words = [{} for _ in terms]
+    params = {"terms": terms, "candidates": GUEST_NAME_CANDIDATES}
+    for position, word, score in db.execute(GUEST_NAME_WORDS_SQL, params):
+        words[position - 1][word] = score
+    return words
+
+def guest_name_candidates(words: list) -> tuple:
+    # Пара подходит, если каждое слово запроса похоже на имя или фамилию и хотя бы два разных слова
+    # разошлись по разным полям. Одиночное слово подходит, если оно похоже на все слова запроса сразу
+    vocabulary = sorted(set().union(*words))
+    singles = [
+        (word, sum(matches[word] for matches in words))
+        for word in vocabulary
+        if all(word in matches for matches in words)
+    ]
+    pairs = []
+    for first in vocabulary:
+        for last in vocabulary:
+            if not all(first in matches or last in matches for matches in words):
+                continue
+            if not any(first in a and last in b for i, a in enumerate(words) for j, b in enumerate(words) if i != j):
+                continue
+            pairs.append((first, last, sum(max(matches.get(first, 0), matches.get(last, 0)) for matches in words)))
+    return singles, pairs
+
+def guest_number_condition(term: str):
+    phone = literal_column(models.GUEST_PHONE_DIGITS)
+    passport = literal_column(models.GUEST_PASSPORT_COMPACT)
+    conditions = [passport.icontains(term, autoescape=True)]
+    digits = re.sub(r"\D", "", term)
+    if len(digits) >= SEARCH_TERM_MIN_LENGTH:
+        conditions.append(phone.contains(digits))
+    return or_(*conditions)
+
+def guest_number_score(term: str):
+    phone = literal_column(models.GUEST_PHONE_DIGITS)
+    passport = literal_column(models.GUEST_PASSPORT_COMPACT)
+    digits = re.sub(r"\D", "", term) or term
+    return func.greatest(func.word_similarity(digits, phone), func.word_similarity(term, passport))
+
+def guest_name_score(term: str):
+    columns = (models.Guest.first_name, models.Guest.last_name)
+    return func.greatest(*(score(term, column) for column in columns for score in (func.word_similarity, func.similarity)))
+
+def search_guests(db: Session, q: str, limit: int):
+    # Слова с цифрами ищутся подстрокой в телефоне и паспорте, остальные — нечётко в имени и фамилии
+    terms = guest_search_terms(q)
+    number_terms = [term for term in terms if re.search(r"\d", term)]
+    name_terms = [term for term in terms if term not in number_terms]
+    words = guest_name_words(db, name_terms) if name_terms else []
+    if not all(words):
+        return []
+    if number_terms:
+        # Номер отбирает немного строк по GIN-индексам телефона и паспорта, их и ранжируем
+        conditions = [guest_number_condition(term) for term in number_terms]
+        conditions += [
+            or_(models.Guest.first_name.in_(list(matches)), models.Guest.last_name.in_(list(matches)))
+            for matches in words
+        ]
+        scores = [guest_number_score(term) for term in number_terms] + [guest_name_score(term) for term in name_terms]
+        statement = (
+            select(models.Guest)
+            .where(*conditions)
+            .order_by(sum(scores[1:], scores[0]).desc(), models.Guest.last_name, models.Guest.first_name, models.Guest.id)
+            .limit(limit)
+        )
+        return db.scalars(statement).all()
+    singles, pairs = guest_name_candidates(words)
+    params = {
+        "pair_first": [first for first, _, _ in pairs],
+        "pair_last": [last for _, last, _ in pairs],
+        "pair_score": [score for _, _, score in pairs],
+        "single_word": [word for word, _ in singles],
+        "single_score": [score for _, score in singles],
+        "limit": limit,
+    }
+    return db.scalars(select(models.Guest).from_statement(GUEST_NAME_SEARCH_SQL), params).all()
+
 def update_guest(db: Session, guest_id: int, guest: schemas.GuestUpdate):
-    db_guest = get_guest(db, guest_id)
-    if db_guest:
-        for key, value in guest.model_dump(exclude_unset=True).items():
-            setattr(db_guest, key, value)
-        db.commit()
-        db.refresh(db_guest)
+    db_guest = update_returning(db, models.Guest, guest_id, guest.model_dump(exclude_unset=True))
+    db.commit()
     return db_guest
 
 def delete_guest(db: Session, guest_id: int):
-    db_guest = get_guest(db, guest_id)
-    if db_guest:
-        db.delete(db_guest)
-        db.commit()
-        return True
-    return False
+    bookings = db.execute(
+        delete(models.Booking).where(models.Booking.guest_id == guest_id)
+        .returning(models.Booking.id)
+        .execution_options(synchronize_session=False)
+    ).all()
+    if delete_returning(db, models.Guest, guest_id) is None:
+        return False
+    forget_deleted_bookings(db, bookings)
+    return True
+
+def filter_check_in(statement, date_from: date = None, date_to: date = None):
+    if date_from:
+        statement = statement.where(models.Booking.check_in_date >= date_from)
+    if date_to:
+        statement = statement.where(models.Booking.check_in_date <= date_to)
+    return statement
+
+def filter_payment_date(statement, date_from: date = None, date_to: date = None):
+    if date_from:
+        statement = statement.where(models.Payment.payment_date >= datetime.combine(date_from, time.min))
+    if date_to:
+        statement = statement.where(models.Payment.payment_date < datetime.combine(date_to + timedelta(days=1), time.min))
+    return statement
 
-def get_bookings(db: Session, skip: int = 0, limit: int = 100, status: str = None):
-    query = db.query(models.Booking)
+def get_bookings(db: Session, skip: int = 0, limit: int = 100, status: str = None, keyset: Keyset = None, expand=BOOKING_RELATIONS, date_from: date = None, date_to: date = None):
+    query = filter_check_in(db.query(models.Booking).options(*booking_options(expand)), date_from, date_to)
     if status:
         query = query.filter(models.Booking.status == status)
-    return query.offset(skip).limit(limit).all()
+    return paginate(query, models.Booking, skip, limit, keyset).all()
 
-def get_booking(db: Session, booking_id: int):
-    return db.query(models.Booking).filter(models.Booking.id == booking_id).first()
+def get_booking(db: Session, booking_id: int, expand=BOOKING_RELATIONS):
+    return db.query(models.Booking).options(*booking_options(expand)).filter(models.Booking.id == booking_id).first()
 
 def create_booking(db: Session, booking: schemas.BookingCreate):
     db_booking = models.Booking(**booking.model_dump())
     db.add(db_booking)
-    db.commit()
+    commit_booking(db)
     db.refresh(db_booking)
+    availability.index.upsert(db_booking)
     return db_booking
 
+def bulk_create_bookings(db: Session, rows: list, batch_size: int):
+    inserted, errors = bulk_insert(db, models.Booking, rows, batch_size)
+    for booking_id, values in inserted:
+        availability.index.upsert(models.Booking(id=booking_id, **values))
+    return inserted, errors
+
 def update_booking(db: Session, booking_id: int, booking: schemas.BookingUpdate):
-    db_booking = get_booking(db, booking_id)
+    db_booking = update_booking_returning(db, booking_id, booking.model_dump(exclude_unset=True))
     if db_booking:
-        for key, value in booking.model_dump(exclude_unset=True).items():
-            setattr(db_booking, key, value)
-        db.commit()
-        db.refresh(db_booking)
+        availability.index.upsert(db_booking)
     return db_booking
 
 def delete_booking(db: Session, booking_id: int):
-    db_booking = get_booking(db, booking_id)
-    if db_booking:
-        db.delete(db_booking)
+    row = delete_returning(db, models.Booking, booking_id)
+    if row is None:
+        return False
+    forget_deleted_bookings(db, [row])
+    return True
+
+def purge_cancelled_bookings(db: Session, cutoff: date, batch_size: int):
+    batch = (
+        select(models.Booking.id)
+        .where(models.Booking.status == models.CANCELLED_BOOKING_STATUS, models.Booking.check_out_date < cutoff)
+        .order_by(models.Booking.id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    statement = (
+        delete(models.Booking).where(models.Booking.id.in_(batch))
+        .returning(models.Booking.id)
+        .execution_options(synchronize_session=False)
+    )
+    deleted = []
+    batches = 0
+    while True:
+        rows = db.execute(statement).all()
         db.commit()
-        return True
-    return False
-
-def get_available_rooms(db: Session, check_in: date, check_out: date):
-    booked_rooms = db.query(models.Booking.room_id).filter(
-        and_(
-            models.Booking.check_in_date < check_out,
-            models.Booking.check_out_date > check_in,
-            models.Booking.status.in_(['подтверждено', 'заселен'])
-        )
-    ).all()
-    booked_room_ids = [room_id for (room_id,) in booked_rooms]
-    return db.query(models.Room).filter(
+        if not rows:
+            break
+        deleted.extend(rows)
+        batches += 1
+        if len(rows) < batch_size:
+            break
+    forget_deleted_bookings(db, deleted)
+    return len(deleted), batches
+
+def check_in_window(date_from: date, date_to: date):
+    return (
+        models.Booking.check_in_date < date_to,
+        models.Booking.check_in_date > date_from - timedelta(days=models.MAX_STAY_DAYS),
+    )
+
+def room_has_overlapping_booking(check_in: date, check_out: date):
+    return exists().where(
+        models.Booking.room_id == models.Room.id,
+        models.Booking.status.in_(models.ACTIVE_BOOKING_STATUSES),
+        *check_in_window(check_in, check_out),
+        func.daterange(models.Booking.check_in_date, models.Booking.check_out_date)
+        .op('&&')(func.daterange(check_in, check_out)),
+    )
+
+def get_available_rooms(db: Session, check_in: date, check_out: date, expand=ROOM_RELATIONS):
+    query = db.query(models.Room).options(*room_options(expand))
+    if availability.index.ready:
+        booked_room_ids = availability.index.booked_room_ids(check_in, check_out)
+        free_rooms = query.filter(models.Room.status == 'свободно').all()
+        return [room for room in free_rooms if room.id not in booked_room_ids]
+    return query.filter(
         models.Room.status == 'свободно',
-        models.Room.id.notin_(booked_room_ids)
+        ~room_has_overlapping_booking(check_in, check_out)
     ).all()
 
-def get_payments(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.Payment).offset(skip).limit(limit).all()
+def get_room_calendar_rows(db: Session, date_from: date, date_to: date, room_type_id: int = None, floor: int = None):
+    query = db.query(
+        models.Room.id,
+        models.Room.room_number,
+        models.Room.room_type_id,
+        models.Room.floor,
+        models.Room.status,
+        models.Booking.check_in_date,
+        models.Booking.check_out_date,
+    ).outerjoin(models.Booking, and_(
+        models.Booking.room_id == models.Room.id,
+        models.Booking.status.in_(models.ACTIVE_BOOKING_STATUSES),
+        *check_in_window(date_from, date_to),
+        models.Booking.check_out_date > date_from,
+    ))
+    if room_type_id is not None:
+        query = query.filter(models.Room.room_type_id == room_type_id)
+    if floor is not None:
+        query = query.filter(models.Room.floor == floor)
+    return query.order_by(models.Room.room_number).all()
+
+def get_payments(db: Session, skip: int = 0, limit: int = 100, keyset: Keyset = None, date_from: date = None, date_to: date = None):
+    return paginate(filter_payment_date(db.query(models.Payment), date_from, date_to), models.Payment, skip, limit, keyset).all()
 
 def get_payment(db: Session, payment_id: int):
     return db.query(models.Payment).filter(models.Payment.id == payment_id).first()
@@ -134,13 +477,14 @@ def create_payment(db: Session, payment: schemas.PaymentCreate):
     db.refresh(db_payment)
     return db_payment
 
+def bulk_create_payments(db: Session, rows: list, batch_size: int):
+    return bulk_insert(db, models.Payment, rows, batch_size)
+
 def get_user_by_username(db: Session, username: str):
     return db.query(models.User).filter(models.User.username == username).first()
 
 def create_user(db: Session, user: schemas.UserCreate):
-    from passlib.context import CryptContext
-    pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-    hashed_password = pwd_context.hash(user.password)
+    hashed_password = security.hash_password(user.password)
     db_user = models.User(
         username=user.username,
         email=user.email,
@@ -153,44 +497,37 @@ def create_user(db: Session, user: schemas.UserCreate):
     db.refresh(db_user)
     return db_user
 
+def bulk_create_users(db: Session, rows: list, batch_size: int):
+    hashes = security.hash_passwords([values["password"] for _, values in rows])
+    users = []
+    for (index, values), password_hash in zip(rows, hashes):
+        user_values = {key: value for key, value in values.items() if key != "password"}
+        users.append((index, {**user_values, "password_hash": password_hash}))
+    return bulk_insert(db, models.User, users, batch_size)
+
 def update_room_type(db: Session, room_type_id: int, room_type: schemas.RoomTypeUpdate):
-    db_room_type = get_room_type(db, room_type_id)
+    db_room_type = update_returning(db, models.RoomType, room_type_id, room_type.model_dump(exclude_unset=True))
+    db.commit()
     if db_room_type:
-        for key, value in room_type.model_dump(exclude_unset=True).items():
-            setattr(db_room_type, key, value)
-        db.commit()
-        db.refresh(db_room_type)
+        cache.catalog.invalidate(*cache.ROOM_TYPE_TAGS)
     return db_room_type
 
 def delete_room_type(db: Session, room_type_id: int):
-    db_room_type = get_room_type(db, room_type_id)
-    if db_room_type:
-        db.delete(db_room_type)
-        db.commit()
-        return True
-    return False
+    if delete_returning(db, models.RoomType, room_type_id) is None:
+        return False
+    cache.catalog.invalidate(*cache.ROOM_TYPE_TAGS)
+    return True
 
 def update_payment(db: Session, payment_id: int, payment: schemas.PaymentUpdate):
-    db_payment = get_payment(db, payment_id)
-    if db_payment:
-        for key, value in payment.model_dump(exclude_unset=True).items():
-            setattr(db_payment, key, value)
-        db.commit()
-        db.refresh(db_payment)
+    db_payment = update_returning(db, models.Payment, payment_id, payment.model_dump(exclude_unset=True))
+    db.commit()
     return db_payment
 
 def delete_payment(db: Session, payment_id: int):
-    db_payment = get_payment(db, payment_id)
-    if db_payment:
-        db.delete(db_payment)
-        db.commit()
-        return True
-    return False
+    return delete_returning(db, models.Payment, payment_id) is not None
 
 def delete_room(db: Session, room_id: int):
-    db_room = get_room(db, room_id)
-    if db_room:
-        db.delete(db_room)
-        db.commit()
-        return True
-    return False
+    if delete_returning(db, models.Room, room_id) is None:
+        return False
+    cache.catalog.invalidate(*cache.ROOM_TAGS)
+    return True
@@ -0,0 +1,152 @@
+from datetime import date
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import models, schemas, availability, cache, security
+from . import crud as sync_crud
+from .crud import commit_booking, filter_check_in, filter_payment_date, room_has_overlapping_booking, update_booking_returning, update_returning
+from .loaders import BOOKING_RELATIONS, ROOM_RELATIONS, booking_options, room_options
+from .pagination import Keyset, paginate
+
+
+async def _first(db: AsyncSession, statement):
+    result = await db.execute(statement.execution_options(populate_existing=True))
+    return result.scalars().first()
+
+async def _all(db: AsyncSession, statement):
+    result = await db.execute(statement)
+    return result.scalars().all()
+
+async def _create(db: AsyncSession, db_obj):
+    db.add(db_obj)
+    await db.commit()
+    await db.refresh(db_obj)
+    return db_obj
+
+async def _update(db: AsyncSession, model, object_id: int, values: dict, loader_options=None):
+    db_obj = await db.run_sync(update_returning, model, object_id, values, loader_options)
+    await db.commit()
+    return db_obj
+
+async def get_room_types(db: AsyncSession, skip: int = 0, limit: int = 100, keyset: Keyset = None):
+    return await _all(db, paginate(select(models.RoomType), models.RoomType, skip, limit, keyset))
+
+async def get_room_type(db: AsyncSession, room_type_id: int):
+    return await _first(db, select(models.RoomType).where(models.RoomType.id == room_type_id))
+
+async def create_room_type(db: AsyncSession, room_type: schemas.RoomTypeCreate):
+    db_room_type = await _create(db, models.RoomType(**room_type.model_dump()))
+    cache.catalog.invalidate(*cache.ROOM_TYPE_TAGS)
+    return db_room_type
+
+async def update_room_type(db: AsyncSession, room_type_id: int, room_type: schemas.RoomTypeUpdate):
+    db_room_type = await _update(db, models.RoomType, room_type_id, room_type.model_dump(exclude_unset=True))
+    if db_room_type:
+        cache.catalog.invalidate(*cache.ROOM_TYPE_TAGS)
+    return db_room_type
+
+async def delete_room_type(db: AsyncSession, room_type_id: int):
+    return await db.run_sync(sync_crud.delete_room_type, room_type_id)
+
+async def get_rooms(db: AsyncSession, skip: int = 0, limit: int = 100, status: str = None, keyset: Keyset = None, expand=ROOM_RELATIONS):
+    statement = select(models.Room).options(*room_options(expand))
+    if status:
+        statement = statement.where(models.Room.status == status)
+    return await _all(db, paginate(statement, models.Room, skip, limit, keyset))
+
+async def get_room(db: AsyncSession, room_id: int, expand=ROOM_RELATIONS):
+    return await _first(db, select(models.Room).options(*room_options(expand)).where(models.Room.id == room_id))
+
+async def create_room(db: AsyncSession, room: schemas.RoomCreate):
+    db_room = await _create(db, models.Room(**room.model_dump()))
+    cache.catalog.invalidate(*cache.ROOM_TAGS)
+    return await get_room(db, db_room.id)
+
+async def update_room(db: AsyncSession, room_id: int, room: schemas.RoomUpdate):
+    db_room = await _update(db, models.Room, room_id, room.model_dump(exclude_unset=True), room_options)
+    if db_room:
+        cache.catalog.invalidate(*cache.ROOM_TAGS)
+    return db_room
+
+async def delete_room(db: AsyncSession, room_id: int):
+    return await db.run_sync(sync_crud.delete_room, room_id)
+
+async def get_available_rooms(db: AsyncSession, check_in: date, check_out: date, expand=ROOM_RELATIONS):
+    statement = select(models.Room).options(*room_options(expand)).where(models.Room.status == 'свободно')
+    if availability.index.ready:
+        booked_room_ids = availability.index.booked_room_ids(check_in, check_out)
+        return [room for room in await _all(db, statement) if room.id not in booked_room_ids]
+    return await _all(db, statement.where(~room_has_overlapping_booking(check_in, check_out)))
+
+async def get_guests(db: AsyncSession, skip: int = 0, limit: int = 100, keyset: Keyset = None):
+    return await _all(db, paginate(select(models.Guest), models.Guest, skip, limit, keyset))
+
+async def get_guest(db: AsyncSession, guest_id: int):
+    return await _first(db, select(models.Guest).where(models.Guest.id == guest_id))
+
+async def get_guest_by_email(db: AsyncSession, email: str):
+    return await _first(db, select(models.Guest).where(models.Guest.email == email))
+
+async def create_guest(db: AsyncSession, guest: schemas.GuestCreate):
+    return await db.run_sync(sync_crud.create_guest, guest)
+
+async def update_guest(db: AsyncSession, guest_id: int, guest: schemas.GuestUpdate):
+    return await _update(db, models.Guest, guest_id, guest.model_dump(exclude_unset=True))
+
+async def delete_guest(db: AsyncSession, guest_id: int):
+    return await db.run_sync(sync_crud.delete_guest, guest_id)
+
+async def get_bookings(db: AsyncSession, skip: int = 0, limit: int = 100, status: str = None, keyset: Keyset = None, expand=BOOKING_RELATIONS, date_from: date = None, date_to: date = None):
+    statement = filter_check_in(select(models.Booking).options(*booking_options(expand)), date_from, date_to)
+    if status:
+        statement = statement.where(models.Booking.status == status)
+    return await _all(db, paginate(statement, models.Booking, skip, limit, keyset))
+
+async def get_booking(db: AsyncSession, booking_id: int, expand=BOOKING_RELATIONS):
+    return await _first(db, select(models.Booking).options(*booking_options(expand)).where(models.Booking.id == booking_id))
+
+async def create_booking(db: AsyncSession, booking: schemas.BookingCreate):
+    db_booking = models.Booking(**booking.model_dump())
+    db.add(db_booking)
+    await db.run_sync(commit_booking)
+    availability.index.upsert(db_booking)
+    return await get_booking(db, db_booking.id)
+
+async def update_booking(db: AsyncSession, booking_id: int, booking: schemas.BookingUpdate):
+    db_booking = await db.run_sync(update_booking_returning, booking_id, booking.model_dump(exclude_unset=True))
+    if db_booking:
+        availability.index.upsert(db_booking)
+    return db_booking
+
+async def delete_booking(db: AsyncSession, booking_id: int):
+    return await db.run_sync(sync_crud.delete_booking, booking_id)
+
+async def get_payments(db: AsyncSession, skip: int = 0, limit: int = 100, keyset: Keyset = None, date_from: date = None, date_to: date = None):
+    return await _all(db, paginate(filter_payment_date(select(models.Payment), date_from, date_to), models.Payment, skip, limit, keyset))
+
+async def get_payment(db: AsyncSession, payment_id: int):
+    return await _first(db, select(models.Payment).where(models.Payment.id == payment_id))
+
+async def create_payment(db: AsyncSession, payment: schemas.PaymentCreate):
+    return await _create(db, models.Payment(**payment.model_dump()))
+
+async def update_payment(db: AsyncSession, payment_id: int, payment: schemas.PaymentUpdate):
+    return await _update(db, models.Payment, payment_id, payment.model_dump(exclude_unset=True))
+
+async def delete_payment(db: AsyncSession, payment_id: int):
+    return await db.run_sync(sync_crud.delete_payment, payment_id)
+
+async def get_user_by_username(db: AsyncSession, username: str):
+    return await _first(db, select(models.User).where(models.User.username == username))
+
+async def create_user(db: AsyncSession, user: schemas.UserCreate):
+    hashed_password = await security.hash_password_async(user.password)
+    db_user = models.User(
+        username=user.username,
+        email=user.email,
+        password_hash=hashed_password,
+        full_name=user.full_name,
+        role=user.role
+    )
+    return await _create(db, db_user)
@@ -0,0 +1,66 @@
+import hashlib
+from typing import Optional
+
+from fastapi import Response
+
+ETAG_HEADER = "ETag"
+
+
+def compute_etag(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip().removeprefix("W/") for candidate in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={ETAG_HEADER: etag})
+
+
+class ETagMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "GET":
+            await self.app(scope, receive, send)
+            return
+
+        if_none_match = None
+        for name, value in scope["headers"]:
+            if name == b"if-none-match":
+                if_none_match = value.decode("latin-1")
+
+        start = None
+        chunks = []
+
+        async def send_with_etag(message):
+            nonlocal start
+            if message["type"] == "http.response.start":
+                headers = dict(message.get("headers", []))
+                content_type = headers.get(b"content-type", b"")
+                if message["status"] == 200 and b"etag" not in headers and content_type.startswith(b"application/json"):
+                    start = message
+                    return
+                await send(message)
+                return
+            if start is None or message["type"] != "http.response.body":
+                await send(message)
+                return
+            chunks.append(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+            body = b"".join(chunks)
+            etag = compute_etag(body)
+            headers = list(start.get("headers", []))
+            if etag_matches(if_none_match, etag):
+                headers = [(name, value) for name, value in headers if name not in (b"content-length", b"content-type")]
+                await send({**start, "status": 304, "headers": headers + [(b"etag", etag.encode())]})
+                await send({"type": "http.response.body", "body": b""})
+                return
+            await send({**start, "headers": headers + [(b"etag", etag.encode())]})
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_with_etag)
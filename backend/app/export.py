@@ -0,0 +1,84 @@
+import csv
+import io
+import json
+import os
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Optional
+
+from fastapi import APIRouter, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+
+from . import crud, models
+from .database import read_session
+
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+router = APIRouter()
+
+
+def _plain(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+def _ndjson_chunks(columns: list, partitions):
+    for rows in partitions:
+        yield "".join(
+            json.dumps(dict(zip(columns, map(_plain, row))), ensure_ascii=False) + "\n"
+            for row in rows
+        ).encode()
+
+def _csv_chunks(columns: list, partitions):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for rows in partitions:
+        writer.writerows([_plain(value) for value in row] for row in rows)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+def stream_rows(statement, export_format: str):
+    db = read_session()
+    try:
+        result = db.execute(statement.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        columns = list(result.keys())
+        chunks = _csv_chunks if export_format == "csv" else _ndjson_chunks
+        yield from chunks(columns, result.partitions())
+    finally:
+        db.close()
+
+def export_response(statement, export_format: str, name: str) -> StreamingResponse:
+    return StreamingResponse(
+        stream_rows(statement, export_format),
+        media_type=EXPORT_FORMATS[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{name}.{export_format}"'},
+    )
+
+def bookings_statement(date_from: Optional[date], date_to: Optional[date]):
+    statement = select(*models.Booking.__table__.columns).order_by(models.Booking.id)
+    return crud.filter_check_in(statement, date_from, date_to)
+
+def payments_statement(date_from: Optional[date], date_to: Optional[date]):
+    columns = [column for column in models.Payment.__table__.columns if column is not models.Payment.__table__.c.booking_check_in_date]
+    statement = select(*columns).order_by(models.Payment.id)
+    return crud.filter_payment_date(statement, date_from, date_to)
+
+
+@router.get("/bookings/export")
+def export_bookings(format: str = Query("ndjson", pattern="^(ndjson|csv)$"), date_from: Optional[date] = None, date_to: Optional[date] = None):
+    return export_response(bookings_statement(date_from, date_to), format, "bookings")
+
+@router.get("/payments/export")
+def export_payments(format: str = Query("ndjson", pattern="^(ndjson|csv)$"), date_from: Optional[date] = None, date_to: Optional[date] = None):
+    return export_response(payments_statement(date_from, date_to), format, "payments")
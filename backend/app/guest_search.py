@@ -0,0 +1,19 @@
+import os
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+
+from . import crud, schemas
+from .database import get_read_db
+
+GUEST_SEARCH_MAX_RESULTS = int(os.getenv("GUEST_SEARCH_MAX_RESULTS", "50"))
+
+router = APIRouter()
+
+
+@router.get("/guests/search", response_model=List[schemas.Guest])
+def search_guests(q: str = Query(..., min_length=crud.SEARCH_TERM_MIN_LENGTH, max_length=200), limit: int = Query(20, ge=1, le=GUEST_SEARCH_MAX_RESULTS), db: Session = Depends(get_read_db)):
+    if not crud.guest_search_terms(q):
+        raise HTTPException(status_code=400, detail=f"Запрос должен содержать слово не короче {crud.SEARCH_TERM_MIN_LENGTH} символов")
+    return crud.search_guests(db, q, limit)
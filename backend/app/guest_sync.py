@@ -0,0 +1,22 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+
+from . import bulk, crud, schemas
+from .database import get_db
+
+GUEST_UPSERT_KEYS = ("email", "passport_number")
+
+router = APIRouter()
+
+
+def require_key(key: str):
+    def check(guest: schemas.GuestCreate):
+        if getattr(guest, key) is None:
+            return f"Не указано поле {key}, по которому выполняется upsert"
+    return check
+
+@router.put("/guests/upsert", response_model=schemas.GuestUpsertResult, openapi_extra=bulk.request_body_schema("GuestCreate", single=True))
+def upsert_guests(rows: list = Depends(bulk.read_row_or_rows), key: str = Query("email", pattern=f"^({'|'.join(GUEST_UPSERT_KEYS)})$"), batch_size: int = Query(bulk.BULK_BATCH_SIZE, gt=0, le=bulk.BULK_MAX_BATCH_SIZE), db: Session = Depends(get_db)):
+    valid, errors = bulk.validate_rows(schemas.GuestCreate, rows, check=require_key(key), exclude_unset=True)
+    upserted, db_errors = crud.upsert_guests(db, valid, key, batch_size)
+    return bulk.upsert_result(upserted, errors + db_errors)
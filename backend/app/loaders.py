@@ -0,0 +1,44 @@
+from typing import Optional
+
+from fastapi import HTTPException
+from sqlalchemy.orm import joinedload, noload
+
+from . import models
+
+ROOM_RELATIONS = ("room_type",)
+BOOKING_RELATIONS = ("guest", "room")
+
+
+def parse_expand(value: Optional[str], allowed: tuple) -> frozenset:
+    if value is None:
+        return frozenset(allowed)
+    requested = frozenset(name.strip() for name in value.split(",") if name.strip())
+    unknown = requested - frozenset(allowed)
+    if unknown:
+        raise ValueError(f"unknown relations: {sorted(unknown)}")
+    return requested
+
+def expand_query(allowed: tuple):
+    def dependency(expand: Optional[str] = None) -> frozenset:
+        try:
+            return parse_expand(expand, allowed)
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Параметр expand допускает: {', '.join(allowed)}")
+    return dependency
+
+def room_options(expand=ROOM_RELATIONS, entity=models.Room):
+    if "room_type" in expand:
+        return (joinedload(entity.room_type),)
+    return (noload(entity.room_type),)
+
+def booking_options(expand=BOOKING_RELATIONS, entity=models.Booking):
+    options = []
+    if "guest" in expand:
+        options.append(joinedload(entity.guest))
+    else:
+        options.append(noload(entity.guest))
+    if "room" in expand:
+        options.append(joinedload(entity.room).joinedload(models.Room.room_type))
+    else:
+        options.append(noload(entity.room))
+    return tuple(options)
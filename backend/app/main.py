@@ -1,13 +1,21 @@
-from fastapi import FastAPI, Depends, HTTPException, status
+import logging
+
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, Response, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
+from sqlalchemy.exc import OperationalError, ProgrammingError
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from datetime import date
+from datetime import date, timedelta
 
-from . import models, schemas, crud
-from .database import engine, get_db
+from . import models, schemas, crud, analytics, availability, bulk, cache, database, export, guest_search, guest_sync, partitions, responses, room_calendar, security, startup
+from .database import engine, get_db, get_read_db, SessionLocal, DATABASE_ASYNC
+from .pool_metrics import engine_pool_metrics
+from .loaders import BOOKING_RELATIONS, ROOM_RELATIONS, expand_query
+from .etag import ETAG_HEADER, ETagMiddleware
+from .pagination import Keyset, NEXT_CURSOR_HEADER, cursor_headers, keyset_query
 
-models.Base.metadata.create_all(bind=engine)
+logger = logging.getLogger(__name__)
 
 app = FastAPI(
     title="Hotel Booking API",
@@ -15,45 +23,142 @@ app = FastAPI(
     version="1.0.0"
 )
 
+app.add_middleware(ETagMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, ETAG_HEADER],
 )
 
+@app.exception_handler(crud.BookingConflictError)
+async def booking_conflict_handler(request: Request, exc: crud.BookingConflictError):
+    return JSONResponse(status_code=status.HTTP_409_CONFLICT, content={"detail": "Номер уже забронирован на эти даты"})
+
+@app.exception_handler(crud.RecordInUseError)
+async def record_in_use_handler(request: Request, exc: crud.RecordInUseError):
+    return JSONResponse(status_code=status.HTTP_409_CONFLICT, content={"detail": "Запись нельзя удалить: на неё ссылаются другие записи"})
+
+@app.on_event("startup")
+def prepare_schema():
+    startup.prepare_schema(engine)
+
+@app.on_event("startup")
+def create_partitions():
+    # В режимах verify и skip секции создают миграция и scripts/maintain_partitions.py
+    if startup.SCHEMA_STARTUP != "create":
+        return
+    try:
+        with engine.begin() as connection:
+            created = partitions.ensure_partitions(connection)
+    except (OperationalError, ProgrammingError):
+        logger.warning("Monthly partitions not created, run scripts/maintain_partitions.py", exc_info=True)
+        return
+    if created:
+        logger.info("Created partitions: %s", ", ".join(created))
+
+@app.on_event("startup")
+def warm_availability_index():
+    if not availability.AVAILABILITY_INDEX_ENABLED:
+        return
+    db = SessionLocal()
+    try:
+        availability.index.warm(db)
+    except OperationalError:
+        logger.warning("Availability index not warmed, falling back to SQL until restart", exc_info=True)
+    finally:
+        db.close()
+
+@app.on_event("startup")
+def start_analytics_worker():
+    analytics.worker.start(SessionLocal)
+
+@app.on_event("shutdown")
+def stop_analytics_worker():
+    analytics.worker.stop()
+
+@app.on_event("shutdown")
+async def dispose_async_engine():
+    for async_engine in (database.async_engine, database.async_replica_engine):
+        if async_engine is not None:
+            await async_engine.dispose()
+
+@app.on_event("shutdown")
+def shutdown_password_hashing():
+    security.shutdown()
+
+app.include_router(export.router)
+app.include_router(room_calendar.router)
+app.include_router(guest_sync.router)
+app.include_router(guest_search.router)
+
+if DATABASE_ASYNC:
+    from . import async_routes
+
+    app.include_router(async_routes.router)
+
 @app.get("/")
 def read_root():
     return {"message": "Hotel Booking API", "version": "1.0.0"}
 
+@app.get("/internal/pool-metrics", include_in_schema=False)
+def read_pool_metrics():
+    pools = {"primary": engine_pool_metrics(database.engine)}
+    if database.replica_engine is not None:
+        pools["replica"] = engine_pool_metrics(database.replica_engine)
+    if database.async_engine is not None:
+        pools["async"] = engine_pool_metrics(database.async_engine.sync_engine)
+    if database.async_replica_engine is not None:
+        pools["async_replica"] = engine_pool_metrics(database.async_replica_engine.sync_engine)
+    return {"pools": pools, "replica": database.replica_router.status()}
+
+@app.get("/internal/cache-stats", include_in_schema=False)
+def read_cache_stats():
+    return {"catalog": cache.catalog.stats()}
+
+@app.get("/internal/analytics-status", include_in_schema=False)
+def read_analytics_status(db: Session = Depends(get_db)):
+    return {"queue": analytics.queue_status(db), "refresh_interval": analytics.worker.interval}
+
+# Ответы каталога кэшируются до следующей инвалидации, поэтому читаются с PRIMARY: отстающая реплика
+# сразу после изменения вернула бы старые данные, и они остались бы в кэше на весь CATALOG_CACHE_TTL
 @app.get("/room-types/", response_model=List[schemas.RoomType])
-def read_room_types(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    room_types = crud.get_room_types(db, skip=skip, limit=limit)
-    return room_types
+def read_room_types(request: Request, skip: int = 0, limit: int = 100, keyset: Optional[Keyset] = Depends(keyset_query(models.RoomType)), db: Session = Depends(get_db)):
+    def load():
+        room_types = crud.get_room_types(db, skip=skip, limit=limit, keyset=keyset)
+        return room_types, cursor_headers(keyset, room_types, limit)
+    return cache.catalog.respond(request, cache.ROOM_TYPE_TAGS, List[schemas.RoomType], load)
 
 @app.get("/room-types/{room_type_id}", response_model=schemas.RoomType)
-def read_room_type(room_type_id: int, db: Session = Depends(get_db)):
-    db_room_type = crud.get_room_type(db, room_type_id=room_type_id)
-    if db_room_type is None:
-        raise HTTPException(status_code=404, detail="Тип номера не найден")
-    return db_room_type
+def read_room_type(request: Request, room_type_id: int, db: Session = Depends(get_db)):
+    def load():
+        db_room_type = crud.get_room_type(db, room_type_id=room_type_id)
+        if db_room_type is None:
+            raise HTTPException(status_code=404, detail="Тип номера не найден")
+        return db_room_type, {}
+    return cache.catalog.respond(request, cache.ROOM_TYPE_TAGS, schemas.RoomType, load)
 
 @app.post("/room-types/", response_model=schemas.RoomType, status_code=status.HTTP_201_CREATED)
 def create_room_type(room_type: schemas.RoomTypeCreate, db: Session = Depends(get_db)):
     return crud.create_room_type(db=db, room_type=room_type)
 
 @app.get("/rooms/", response_model=List[schemas.Room])
-def read_rooms(skip: int = 0, limit: int = 100, status: Optional[str] = None, db: Session = Depends(get_db)):
-    rooms = crud.get_rooms(db, skip=skip, limit=limit, status=status)
-    return rooms
+def read_rooms(request: Request, skip: int = 0, limit: int = 100, status: Optional[str] = None, keyset: Optional[Keyset] = Depends(keyset_query(models.Room)), expand: frozenset = Depends(expand_query(ROOM_RELATIONS)), db: Session = Depends(get_db)):
+    def load():
+        rooms = crud.get_rooms(db, skip=skip, limit=limit, status=status, keyset=keyset, expand=expand)
+        return rooms, cursor_headers(keyset, rooms, limit)
+    return cache.catalog.respond(request, cache.ROOM_TAGS, List[schemas.Room], load)
 
 @app.get("/rooms/{room_id}", response_model=schemas.Room)
-def read_room(room_id: int, db: Session = Depends(get_db)):
-    db_room = crud.get_room(db, room_id=room_id)
-    if db_room is None:
-        raise HTTPException(status_code=404, detail="Номер не найден")
-    return db_room
+def read_room(request: Request, room_id: int, expand: frozenset = Depends(expand_query(ROOM_RELATIONS)), db: Session = Depends(get_db)):
+    def load():
+        db_room = crud.get_room(db, room_id=room_id, expand=expand)
+        if db_room is None:
+            raise HTTPException(status_code=404, detail="Номер не найден")
+        return db_room, {}
+    return cache.catalog.respond(request, cache.ROOM_TAGS, schemas.Room, load)
 
 @app.post("/rooms/", response_model=schemas.Room, status_code=status.HTTP_201_CREATED)
 def create_room(room: schemas.RoomCreate, db: Session = Depends(get_db)):
@@ -75,19 +180,19 @@ def delete_room(room_id: int, db: Session = Depends(get_db)):
 
 
 @app.get("/rooms/available/", response_model=List[schemas.Room])
-def read_available_rooms(check_in: date, check_out: date, db: Session = Depends(get_db)):
+def read_available_rooms(response: Response, check_in: date, check_out: date, expand: frozenset = Depends(expand_query(ROOM_RELATIONS)), db: Session = Depends(get_read_db)):
     if check_in >= check_out:
         raise HTTPException(status_code=400, detail="Дата выезда должна быть позже даты заезда")
-    rooms = crud.get_available_rooms(db, check_in=check_in, check_out=check_out)
-    return rooms
+    rooms = crud.get_available_rooms(db, check_in=check_in, check_out=check_out, expand=expand)
+    return responses.respond(response, List[schemas.Room], rooms, {})
 
 @app.get("/guests/", response_model=List[schemas.Guest])
-def read_guests(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    guests = crud.get_guests(db, skip=skip, limit=limit)
-    return guests
+def read_guests(response: Response, skip: int = 0, limit: int = 100, keyset: Optional[Keyset] = Depends(keyset_query(models.Guest)), db: Session = Depends(get_read_db)):
+    guests = crud.get_guests(db, skip=skip, limit=limit, keyset=keyset)
+    return responses.respond(response, List[schemas.Guest], guests, cursor_headers(keyset, guests, limit))
 
 @app.get("/guests/{guest_id}", response_model=schemas.Guest)
-def read_guest(guest_id: int, db: Session = Depends(get_db)):
+def read_guest(guest_id: int, db: Session = Depends(get_read_db)):
     db_guest = crud.get_guest(db, guest_id=guest_id)
     if db_guest is None:
         raise HTTPException(status_code=404, detail="Гость не найден")
@@ -95,10 +200,16 @@ def read_guest(guest_id: int, db: Session = Depends(get_db)):
 
 @app.post("/guests/", response_model=schemas.Guest, status_code=status.HTTP_201_CREATED)
 def create_guest(guest: schemas.GuestCreate, db: Session = Depends(get_db)):
-    db_guest = crud.get_guest_by_email(db, email=guest.email)
-    if db_guest:
+    db_guest = crud.create_guest(db=db, guest=guest)
+    if db_guest is None:
         raise HTTPException(status_code=400, detail="Email уже зарегистрирован")
-    return crud.create_guest(db=db, guest=guest)
+    return db_guest
+
+@app.post("/guests/bulk", response_model=schemas.BulkResult, openapi_extra=bulk.request_body_schema("GuestCreate"))
+def create_guests_bulk(rows: list = Depends(bulk.read_rows), batch_size: int = Query(bulk.BULK_BATCH_SIZE, gt=0, le=bulk.BULK_MAX_BATCH_SIZE), db: Session = Depends(get_db)):
+    valid, errors = bulk.validate_rows(schemas.GuestCreate, rows)
+    inserted, db_errors = crud.bulk_create_guests(db, valid, batch_size)
+    return bulk.bulk_result(inserted, errors + db_errors)
 
 @app.put("/guests/{guest_id}", response_model=schemas.Guest)
 def update_guest(guest_id: int, guest: schemas.GuestUpdate, db: Session = Depends(get_db)):
@@ -115,13 +226,13 @@ def delete_guest(guest_id: int, db: Session = Depends(get_db)):
     return None
 
 @app.get("/bookings/", response_model=List[schemas.Booking])
-def read_bookings(skip: int = 0, limit: int = 100, status: Optional[str] = None, db: Session = Depends(get_db)):
-    bookings = crud.get_bookings(db, skip=skip, limit=limit, status=status)
-    return bookings
+def read_bookings(response: Response, skip: int = 0, limit: int = 100, status: Optional[str] = None, date_from: Optional[date] = None, date_to: Optional[date] = None, keyset: Optional[Keyset] = Depends(keyset_query(models.Booking)), expand: frozenset = Depends(expand_query(BOOKING_RELATIONS)), db: Session = Depends(get_read_db)):
+    bookings = crud.get_bookings(db, skip=skip, limit=limit, status=status, keyset=keyset, expand=expand, date_from=date_from, date_to=date_to)
+    return responses.respond(response, List[schemas.Booking], bookings, cursor_headers(keyset, bookings, limit))
 
 @app.get("/bookings/{booking_id}", response_model=schemas.Booking)
-def read_booking(booking_id: int, db: Session = Depends(get_db)):
-    db_booking = crud.get_booking(db, booking_id=booking_id)
+def read_booking(booking_id: int, expand: frozenset = Depends(expand_query(BOOKING_RELATIONS)), db: Session = Depends(get_read_db)):
+    db_booking = crud.get_booking(db, booking_id=booking_id, expand=expand)
     if db_booking is None:
         raise HTTPException(status_code=404, detail="Бронирование не найдено")
     return db_booking
@@ -130,8 +241,28 @@ def read_booking(booking_id: int, db: Session = Depends(get_db)):
 def create_booking(booking: schemas.BookingCreate, db: Session = Depends(get_db)):
     if booking.check_in_date >= booking.check_out_date:
         raise HTTPException(status_code=400, detail="Дата выезда должна быть позже даты заезда")
+    if (booking.check_out_date - booking.check_in_date).days > models.MAX_STAY_DAYS:
+        raise HTTPException(status_code=400, detail=f"Бронирование не может быть длиннее {models.MAX_STAY_DAYS} дней")
     return crud.create_booking(db=db, booking=booking)
 
+def check_booking_dates(booking: schemas.BookingCreate):
+    if booking.check_in_date >= booking.check_out_date:
+        return "Дата выезда должна быть позже даты заезда"
+    if (booking.check_out_date - booking.check_in_date).days > models.MAX_STAY_DAYS:
+        return f"Бронирование не может быть длиннее {models.MAX_STAY_DAYS} дней"
+
+@app.post("/bookings/bulk", response_model=schemas.BulkResult, openapi_extra=bulk.request_body_schema("BookingCreate"))
+def create_bookings_bulk(rows: list = Depends(bulk.read_rows), batch_size: int = Query(bulk.BULK_BATCH_SIZE, gt=0, le=bulk.BULK_MAX_BATCH_SIZE), db: Session = Depends(get_db)):
+    valid, errors = bulk.validate_rows(schemas.BookingCreate, rows, check=check_booking_dates)
+    inserted, db_errors = crud.bulk_create_bookings(db, valid, batch_size)
+    return bulk.bulk_result(inserted, errors + db_errors)
+
+@app.post("/bookings/purge", response_model=schemas.BookingPurge)
+def purge_cancelled_bookings(older_than_days: int = Query(..., ge=1), batch_size: int = Query(bulk.BULK_BATCH_SIZE, gt=0, le=bulk.BULK_MAX_BATCH_SIZE), db: Session = Depends(get_db)):
+    cutoff = date.today() - timedelta(days=older_than_days)
+    deleted, batches = crud.purge_cancelled_bookings(db, cutoff, batch_size)
+    return {"deleted": deleted, "batches": batches, "cutoff": cutoff}
+
 @app.put("/bookings/{booking_id}", response_model=schemas.Booking)
 def update_booking(booking_id: int, booking: schemas.BookingUpdate, db: Session = Depends(get_db)):
     db_booking = crud.update_booking(db, booking_id=booking_id, booking=booking)
@@ -147,12 +278,12 @@ def delete_booking(booking_id: int, db: Session = Depends(get_db)):
     return None
 
 @app.get("/payments/", response_model=List[schemas.Payment])
-def read_payments(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    payments = crud.get_payments(db, skip=skip, limit=limit)
-    return payments
+def read_payments(response: Response, skip: int = 0, limit: int = 100, date_from: Optional[date] = None, date_to: Optional[date] = None, keyset: Optional[Keyset] = Depends(keyset_query(models.Payment)), db: Session = Depends(get_read_db)):
+    payments = crud.get_payments(db, skip=skip, limit=limit, keyset=keyset, date_from=date_from, date_to=date_to)
+    return responses.respond(response, List[schemas.Payment], payments, cursor_headers(keyset, payments, limit))
 
 @app.get("/payments/{payment_id}", response_model=schemas.Payment)
-def read_payment(payment_id: int, db: Session = Depends(get_db)):
+def read_payment(payment_id: int, db: Session = Depends(get_read_db)):
     db_payment = crud.get_payment(db, payment_id=payment_id)
     if db_payment is None:
         raise HTTPException(status_code=404, detail="Платеж не найден")
@@ -160,11 +291,17 @@ def read_payment(payment_id: int, db: Session = Depends(get_db)):
 
 @app.post("/payments/", response_model=schemas.Payment, status_code=status.HTTP_201_CREATED)
 def create_payment(payment: schemas.PaymentCreate, db: Session = Depends(get_db)):
-    db_booking = crud.get_booking(db, booking_id=payment.booking_id)
+    db_booking = crud.get_booking(db, booking_id=payment.booking_id, expand=())
     if db_booking is None:
         raise HTTPException(status_code=404, detail="Бронирование не найдено")
     return crud.create_payment(db=db, payment=payment)
 
+@app.post("/payments/bulk", response_model=schemas.BulkResult, openapi_extra=bulk.request_body_schema("PaymentCreate"))
+def create_payments_bulk(rows: list = Depends(bulk.read_rows), batch_size: int = Query(bulk.BULK_BATCH_SIZE, gt=0, le=bulk.BULK_MAX_BATCH_SIZE), db: Session = Depends(get_db)):
+    valid, errors = bulk.validate_rows(schemas.PaymentCreate, rows)
+    inserted, db_errors = crud.bulk_create_payments(db, valid, batch_size)
+    return bulk.bulk_result(inserted, errors + db_errors)
+
 @app.put("/room-types/{room_type_id}", response_model=schemas.RoomType)
 def update_room_type(room_type_id: int, room_type: schemas.RoomTypeUpdate, db: Session = Depends(get_db)):
     db_room_type = crud.update_room_type(db, room_type_id=room_type_id, room_type=room_type)
@@ -192,3 +329,23 @@ def delete_payment(payment_id: int, db: Session = Depends(get_db)):
     if not success:
         raise HTTPException(status_code=404, detail="Платеж не найден")
     return None
+
+def check_analytics_period(date_from: date, date_to: date):
+    if date_from > date_to:
+        raise HTTPException(status_code=400, detail="Начало периода должно быть не позже его конца")
+
+@app.get("/analytics/occupancy", response_model=List[schemas.OccupancyStat])
+def read_occupancy(date_from: date, date_to: date, room_type_id: Optional[int] = None, granularity: str = Query("day", pattern="^(day|month)$"), db: Session = Depends(get_read_db)):
+    check_analytics_period(date_from, date_to)
+    return analytics.occupancy(db, date_from, date_to, room_type_id=room_type_id, granularity=granularity)
+
+@app.get("/analytics/revenue", response_model=List[schemas.RevenueStat])
+def read_revenue(date_from: date, date_to: date, room_type_id: Optional[int] = None, granularity: str = Query("day", pattern="^(day|month)$"), db: Session = Depends(get_read_db)):
+    check_analytics_period(date_from, date_to)
+    return analytics.revenue(db, date_from, date_to, room_type_id=room_type_id, granularity=granularity)
+
+@app.post("/analytics/refresh", response_model=schemas.AnalyticsRefresh)
+def refresh_analytics(date_from: date, date_to: date, db: Session = Depends(get_db)):
+    check_analytics_period(date_from, date_to)
+    days = analytics.refresh(db, date_from, date_to)
+    return {"date_from": date_from, "date_to": date_to, "days": days}
@@ -1,85 +1,325 @@
-from sqlalchemy import Column, Integer, String, Text, DECIMAL, Date, TIMESTAMP, Boolean, ForeignKey, CheckConstraint, Index
+from sqlalchemy import Column, Integer, String, Text, DECIMAL, Date, TIMESTAMP, Boolean, ForeignKey, ForeignKeyConstraint, CheckConstraint, Index, DDL, FetchedValue, event, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from .database import Base
 
+ACTIVE_BOOKING_STATUSES = ('подтверждено', 'заселен')
+CANCELLED_BOOKING_STATUS = 'отменено'
+MAX_STAY_DAYS = 365
+
+# Телефон и паспорт ищутся без форматирования: запрос и индекс используют одни и те же выражения
+GUEST_PHONE_DIGITS = "regexp_replace(phone, '[^0-9]', '', 'g')"
+GUEST_PASSPORT_COMPACT = "replace(passport_number, ' ', '')"
+
+# bookings и payments секционированы по месяцам, поэтому пересечение бронирований одного номера
+# и уникальность transaction_id проверяются триггерами, а не ограничениями. Пересечения ищутся под
+# блокировкой строки номера, transaction_id регистрируются в несекционированной payment_transaction_ids.
+# Функции выполняются с правами владельца схемы, поэтому писать в bookings и payments можно без прав
+# на UPDATE rooms и на payment_transaction_ids. Поиск пересечений планируется заново при каждом вызове:
+# общий план, построенный пока секция пуста, читал бы её целиком на каждой строке пакетной загрузки.
+# Дату заезда для платежа триггер ищет сам, если её не передали (пакетная загрузка может передать).
+# Эти же определения выполняет миграция 10d688e34acb
+BOOKING_OVERLAP_FUNCTION = f"""
+CREATE OR REPLACE FUNCTION bookings_check_overlap() RETURNS trigger AS $$
+BEGIN
+    PERFORM 1 FROM rooms WHERE id = NEW.room_id FOR NO KEY UPDATE;
+    -- Активные бронирования номера не пересекаются, поэтому достаточно проверить последнее с заездом до NEW.check_out_date
+    IF (
+        SELECT check_out_date FROM bookings
+        WHERE room_id = NEW.room_id
+          AND id <> NEW.id
+          AND status IN ('подтверждено', 'заселен')
+          AND check_in_date < NEW.check_out_date
+          AND check_in_date > NEW.check_in_date - {MAX_STAY_DAYS}
+        ORDER BY check_in_date DESC
+        LIMIT 1
+    ) > NEW.check_in_date THEN
+        RAISE EXCEPTION 'Номер % уже забронирован на пересекающиеся даты', NEW.room_id
+            USING ERRCODE = 'exclusion_violation', CONSTRAINT = 'excl_bookings_room_period';
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path FROM CURRENT SET plan_cache_mode = force_custom_plan
+"""
+
+BOOKING_OVERLAP_TRIGGER = """
+CREATE TRIGGER bookings_check_overlap
+BEFORE INSERT OR UPDATE OF room_id, check_in_date, check_out_date, status ON bookings
+FOR EACH ROW WHEN (NEW.status IN ('подтверждено', 'заселен'))
+EXECUTE FUNCTION bookings_check_overlap()
+"""
+
+PAYMENT_WRITE_FUNCTION = """
+CREATE OR REPLACE FUNCTION payments_before_write() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' AND NEW.booking_check_in_date IS NULL
+       OR TG_OP = 'UPDATE' AND NEW.booking_id IS DISTINCT FROM OLD.booking_id THEN
+        SELECT check_in_date INTO NEW.booking_check_in_date FROM bookings WHERE id = NEW.booking_id;
+        IF NOT FOUND THEN
+            RAISE EXCEPTION 'Бронирование % не найдено', NEW.booking_id
+                USING ERRCODE = 'foreign_key_violation', CONSTRAINT = 'payments_booking_id_fkey';
+        END IF;
+    END IF;
+    IF TG_OP = 'UPDATE' AND NEW.transaction_id IS DISTINCT FROM OLD.transaction_id THEN
+        DELETE FROM payment_transaction_ids WHERE transaction_id = OLD.transaction_id;
+    END IF;
+    IF NEW.transaction_id IS NOT NULL AND (TG_OP = 'INSERT' OR NEW.transaction_id IS DISTINCT FROM OLD.transaction_id) THEN
+        INSERT INTO payment_transaction_ids (transaction_id) VALUES (NEW.transaction_id) ON CONFLICT DO NOTHING;
+        IF NOT FOUND THEN
+            RAISE EXCEPTION 'Платёж с transaction_id % уже существует', NEW.transaction_id
+                USING ERRCODE = 'unique_violation', CONSTRAINT = 'payment_transaction_ids_pkey';
+        END IF;
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path FROM CURRENT
+"""
+
+PAYMENT_WRITE_TRIGGER = """
+CREATE TRIGGER payments_before_write
+BEFORE INSERT OR UPDATE OF booking_id, transaction_id ON payments
+FOR EACH ROW EXECUTE FUNCTION payments_before_write()
+"""
+
+PAYMENT_DELETE_FUNCTION = """
+CREATE OR REPLACE FUNCTION payments_after_delete() RETURNS trigger AS $$
+BEGIN
+    DELETE FROM payment_transaction_ids WHERE transaction_id = OLD.transaction_id;
+    RETURN OLD;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path FROM CURRENT
+"""
+
+PAYMENT_DELETE_TRIGGER = """
+CREATE TRIGGER payments_after_delete
+AFTER DELETE ON payments
+FOR EACH ROW WHEN (OLD.transaction_id IS NOT NULL)
+EXECUTE FUNCTION payments_after_delete()
+"""
+
 class RoomType(Base):
     __tablename__ = "room_types"
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     name = Column(String(50), unique=True, nullable=False)
     description = Column(Text)
     base_price = Column(DECIMAL(10, 2), nullable=False)
     capacity = Column(Integer, nullable=False)
-    created_at = Column(TIMESTAMP, server_default=func.now())
+    created_at = Column(TIMESTAMP, nullable=False, server_default=func.now())
 
-    rooms = relationship("Room", back_populates="room_type")
+    rooms = relationship("Room", back_populates="room_type", passive_deletes="all")
 
 class Room(Base):
     __tablename__ = "rooms"
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     room_number = Column(String(10), unique=True, nullable=False)
-    room_type_id = Column(Integer, ForeignKey("room_types.id"), nullable=False, index=True)
+    room_type_id = Column(Integer, ForeignKey("room_types.id", ondelete="RESTRICT"), nullable=False, index=True)
     floor = Column(Integer, nullable=False, index=True)
     status = Column(String(30), nullable=False, default="свободно", index=True)
-    created_at = Column(TIMESTAMP, server_default=func.now())
+    created_at = Column(TIMESTAMP, nullable=False, server_default=func.now())
 
     room_type = relationship("RoomType", back_populates="rooms")
-    bookings = relationship("Booking", back_populates="room")
+    bookings = relationship("Booking", back_populates="room", passive_deletes="all")
 
 class Guest(Base):
     __tablename__ = "guests"
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     first_name = Column(String(100), nullable=False)
     last_name = Column(String(100), nullable=False)
     email = Column(String(255), unique=True, nullable=False, index=True)
     phone = Column(String(20), nullable=False, index=True)
     passport_number = Column(String(50), unique=True, index=True)
     date_of_birth = Column(Date)
-    created_at = Column(TIMESTAMP, server_default=func.now())
+    created_at = Column(TIMESTAMP, nullable=False, server_default=func.now())
+
+    bookings = relationship("Booking", back_populates="guest", passive_deletes=True)
+
+    __table_args__ = (
+        Index('idx_guests_created_at_id', 'created_at', 'id'),
+        Index('idx_guests_last_name_first_name', 'last_name', 'first_name', 'id'),
+        Index('idx_guests_first_name_last_name', 'first_name', 'last_name', 'id'),
+        Index('idx_guests_phone_trgm', text(f"{GUEST_PHONE_DIGITS} gin_trgm_ops"), postgresql_using='gin'),
+        Index('idx_guests_passport_number_trgm', text(f"{GUEST_PASSPORT_COMPACT} gin_trgm_ops"), postgresql_using='gin'),
+    )
 
-    bookings = relationship("Booking", back_populates="guest")
+event.listen(
+    Guest.__table__,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"),
+)
+
+# Словарь различных имён и фамилий гостей для нечёткого поиска: похожие слова отдаёт GiST-индекс словаря
+# в порядке сходства, а гостей затем выбираем по найденным словам точным сравнением по B-tree индексам.
+# Словарь пополняется триггером на оператор; слова удалённых гостей остаются и просто ничего не находят
+class GuestNameWord(Base):
+    __tablename__ = "guest_name_words"
+
+    word = Column(String(100), primary_key=True)
+
+    __table_args__ = (
+        Index('idx_guest_name_words_trgm', 'word', postgresql_using='gist', postgresql_ops={'word': 'gist_trgm_ops'}),
+    )
+
+GUEST_NAME_WORDS_FUNCTION = """
+CREATE OR REPLACE FUNCTION guests_collect_name_words() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO guest_name_words (word)
+    SELECT first_name FROM new_rows UNION SELECT last_name FROM new_rows
+    ON CONFLICT DO NOTHING;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path FROM CURRENT
+"""
+
+# Для UPDATE нельзя указать список столбцов: триггеры с переходными таблицами его не допускают
+GUEST_NAME_WORDS_TRIGGERS = tuple(
+    f"CREATE TRIGGER guests_collect_name_words_{event_name.lower()} AFTER {event_name} ON guests "
+    f"REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION guests_collect_name_words()"
+    for event_name in ("INSERT", "UPDATE")
+)
+
+for statement in (GUEST_NAME_WORDS_FUNCTION, *GUEST_NAME_WORDS_TRIGGERS):
+    event.listen(Base.metadata, "after_create", DDL(statement.replace("%", "%%")).execute_if(dialect="postgresql"))
 
 class Booking(Base):
     __tablename__ = "bookings"
 
-    id = Column(Integer, primary_key=True, index=True)
-    guest_id = Column(Integer, ForeignKey("guests.id"), nullable=False, index=True)
-    room_id = Column(Integer, ForeignKey("rooms.id"), nullable=False, index=True)
-    check_in_date = Column(Date, nullable=False, index=True)
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    guest_id = Column(Integer, ForeignKey("guests.id", ondelete="CASCADE"), nullable=False, index=True)
+    room_id = Column(Integer, ForeignKey("rooms.id", ondelete="RESTRICT"), nullable=False, index=True)
+    check_in_date = Column(Date, primary_key=True)
     check_out_date = Column(Date, nullable=False)
     total_price = Column(DECIMAL(10, 2), nullable=False)
     status = Column(String(20), nullable=False, default="ожидает", index=True)
     special_requests = Column(Text)
-    created_at = Column(TIMESTAMP, server_default=func.now())
+    created_at = Column(TIMESTAMP, nullable=False, server_default=func.now())
 
     guest = relationship("Guest", back_populates="bookings")
     room = relationship("Room", back_populates="bookings")
-    payments = relationship("Payment", back_populates="booking")
+    payments = relationship("Payment", back_populates="booking", passive_deletes=True)
+
+    __mapper_args__ = {"primary_key": [id]}
 
     __table_args__ = (
+        CheckConstraint(f"check_out_date - check_in_date <= {MAX_STAY_DAYS}", name="check_stay_length"),
         Index('idx_bookings_dates', 'check_in_date', 'check_out_date'),
+        Index('idx_bookings_created_at_id', 'created_at', 'id'),
+        Index(
+            'idx_bookings_active_period',
+            func.daterange(check_in_date, check_out_date),
+            postgresql_using='gist',
+            postgresql_where=status.in_(ACTIVE_BOOKING_STATUSES),
+        ),
+        Index(
+            'idx_bookings_active_room',
+            'room_id', 'check_in_date',
+            postgresql_where=status.in_(ACTIVE_BOOKING_STATUSES),
+        ),
+        {"postgresql_partition_by": "RANGE (check_in_date)"},
     )
 
 class Payment(Base):
     __tablename__ = "payments"
 
-    id = Column(Integer, primary_key=True, index=True)
-    booking_id = Column(Integer, ForeignKey("bookings.id"), nullable=False, index=True)
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    booking_id = Column(Integer, nullable=False, index=True)
+    booking_check_in_date = Column(Date, nullable=False, server_default=FetchedValue())
     amount = Column(DECIMAL(10, 2), nullable=False)
     payment_method = Column(String(50), nullable=False)
     payment_status = Column(String(20), nullable=False, default="ожидает", index=True)
-    transaction_id = Column(String(100), unique=True, index=True)
-    payment_date = Column(TIMESTAMP, server_default=func.now(), index=True)
+    transaction_id = Column(String(100))
+    payment_date = Column(TIMESTAMP, primary_key=True, server_default=func.now(), index=True)
 
     booking = relationship("Booking", back_populates="payments")
 
+    __mapper_args__ = {"primary_key": [id]}
+
+    __table_args__ = (
+        ForeignKeyConstraint(
+            ['booking_id', 'booking_check_in_date'], ['bookings.id', 'bookings.check_in_date'],
+            name='payments_booking_id_fkey', ondelete='CASCADE', onupdate='CASCADE',
+        ),
+        {"postgresql_partition_by": "RANGE (payment_date)"},
+    )
+
+# Уникальность transaction_id для всех секций payments
+class PaymentTransactionId(Base):
+    __tablename__ = "payment_transaction_ids"
+
+    transaction_id = Column(String(100), primary_key=True)
+
+for table, statements in (
+    (Booking.__table__, (BOOKING_OVERLAP_FUNCTION, BOOKING_OVERLAP_TRIGGER)),
+    (Payment.__table__, (PAYMENT_WRITE_FUNCTION, PAYMENT_WRITE_TRIGGER, PAYMENT_DELETE_FUNCTION, PAYMENT_DELETE_TRIGGER)),
+):
+    event.listen(table, "after_create", DDL(f"CREATE TABLE {table.name}_default PARTITION OF {table.name} DEFAULT").execute_if(dialect="postgresql"))
+    for statement in statements:
+        event.listen(table, "after_create", DDL(statement.replace("%", "%%")).execute_if(dialect="postgresql"))
+
+class DailyRoomTypeStats(Base):
+    __tablename__ = "daily_room_type_stats"
+
+    day = Column(Date, primary_key=True)
+    room_type_id = Column(Integer, ForeignKey("room_types.id", ondelete="CASCADE"), primary_key=True)
+    rooms_sold = Column(Integer, nullable=False, default=0)
+    room_revenue = Column(DECIMAL(12, 2), nullable=False, default=0)
+    payments_total = Column(DECIMAL(12, 2), nullable=False, default=0)
+    refreshed_at = Column(TIMESTAMP, server_default=func.now())
+
+# Дни, затронутые записью в bookings и payments, ставятся в очередь пересчёта daily_room_type_stats
+# в той же транзакции, что и сама запись. Триггеры срабатывают на оператор, а не на строку:
+# пакетная запись добавляет в очередь один период. Очередь разбирает фоновый пересчёт (app/analytics.py)
+class DailyRoomTypeStatsQueue(Base):
+    __tablename__ = "daily_room_type_stats_queue"
+
+    id = Column(Integer, primary_key=True)
+    date_from = Column(Date, nullable=False)
+    date_to = Column(Date, nullable=False)
+    queued_at = Column(TIMESTAMP, server_default=func.now())
+
+STATS_QUEUE_FUNCTIONS = {
+    "bookings": "SELECT check_in_date AS first_day, check_out_date - 1 AS last_day FROM {rows}",
+    "payments": "SELECT CAST(payment_date AS date) AS first_day, CAST(payment_date AS date) AS last_day FROM {rows}",
+}
+
+def stats_queue_ddl(table: str) -> list:
+    days = STATS_QUEUE_FUNCTIONS[table]
+    queue = "INSERT INTO daily_room_type_stats_queue (date_from, date_to) SELECT min(first_day), max(last_day) FROM ({}) AS days HAVING min(first_day) IS NOT NULL"
+    function = f"""
+CREATE OR REPLACE FUNCTION {table}_queue_stats_refresh() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        {queue.format(days.format(rows="new_rows"))};
+    ELSIF TG_OP = 'DELETE' THEN
+        {queue.format(days.format(rows="old_rows"))};
+    ELSE
+        {queue.format(days.format(rows="new_rows") + " UNION ALL " + days.format(rows="old_rows"))};
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path FROM CURRENT
+"""
+    triggers = [
+        f"CREATE TRIGGER {table}_queue_stats_insert AFTER INSERT ON {table} "
+        f"REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION {table}_queue_stats_refresh()",
+        f"CREATE TRIGGER {table}_queue_stats_update AFTER UPDATE ON {table} "
+        f"REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION {table}_queue_stats_refresh()",
+        f"CREATE TRIGGER {table}_queue_stats_delete AFTER DELETE ON {table} "
+        f"REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION {table}_queue_stats_refresh()",
+    ]
+    return [function] + triggers
+
+# Функции ссылаются на очередь, поэтому создаются после всех таблиц
+for table in STATS_QUEUE_FUNCTIONS:
+    for statement in stats_queue_ddl(table):
+        event.listen(Base.metadata, "after_create", DDL(statement.replace("%", "%%")).execute_if(dialect="postgresql"))
+
 class User(Base):
     __tablename__ = "users"
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     username = Column(String(50), unique=True, nullable=False, index=True)
     email = Column(String(255), unique=True, nullable=False, index=True)
     password_hash = Column(String(255), nullable=False)
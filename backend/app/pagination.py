@@ -0,0 +1,89 @@
+import base64
+import binascii
+import json
+from datetime import date, datetime
+from typing import NamedTuple, Optional
+
+from fastapi import HTTPException
+from sqlalchemy import tuple_
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# Колонки сортировки NOT NULL (миграция c7e2a4f19b30): курсор хранит значение последней строки,
+# а NULL не сравнивается ни с одним значением
+SORTABLE_COLUMNS = {
+    "room_types": ("id", "created_at"),
+    "rooms": ("id", "created_at"),
+    "guests": ("id", "created_at"),
+    "bookings": ("id", "created_at", "check_in_date"),
+    "payments": ("id", "payment_date"),
+}
+
+
+class Keyset(NamedTuple):
+    sort: str
+    after: Optional[tuple] = None
+
+
+def _dump_value(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+def _load_value(model, sort, value):
+    python_type = model.__table__.c[sort].type.python_type
+    if python_type is datetime:
+        return datetime.fromisoformat(value)
+    if python_type is date:
+        return date.fromisoformat(value)
+    return python_type(value)
+
+def encode_cursor(sort: str, value, last_id: int) -> str:
+    payload = json.dumps([sort, _dump_value(value), last_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+def parse_keyset(model, sort: Optional[str], cursor: Optional[str]) -> Optional[Keyset]:
+    if sort is None and cursor is None:
+        return None
+    allowed = SORTABLE_COLUMNS[model.__tablename__]
+    if cursor is None:
+        if sort not in allowed:
+            raise ValueError(f"sort must be one of {allowed}")
+        return Keyset(sort)
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        cursor_sort, value, last_id = json.loads(base64.urlsafe_b64decode(padded))
+        if cursor_sort not in allowed or (sort is not None and sort != cursor_sort):
+            raise ValueError("cursor does not match sort")
+        if value is None or not isinstance(last_id, int):
+            raise ValueError("malformed cursor")
+        return Keyset(cursor_sort, (_load_value(model, cursor_sort, value), last_id))
+    except (binascii.Error, UnicodeDecodeError, TypeError):
+        raise ValueError("malformed cursor")
+
+def keyset_query(model):
+    def dependency(sort: Optional[str] = None, cursor: Optional[str] = None) -> Optional[Keyset]:
+        try:
+            return parse_keyset(model, sort, cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Некорректные параметры пагинации")
+    return dependency
+
+def paginate(statement, model, skip: int, limit: int, keyset: Optional[Keyset]):
+    if keyset is None:
+        return statement.offset(skip).limit(limit)
+    column = getattr(model, keyset.sort)
+    if keyset.after is not None:
+        value, last_id = keyset.after
+        if keyset.sort == "id":
+            statement = statement.filter(model.id > last_id)
+        else:
+            statement = statement.filter(column >= value, tuple_(column, model.id) > (value, last_id))
+    order_by = (model.id,) if keyset.sort == "id" else (column, model.id)
+    return statement.order_by(*order_by).limit(limit)
+
+def cursor_headers(keyset: Optional[Keyset], items, limit: int) -> dict:
+    if keyset is None or not items or len(items) < limit:
+        return {}
+    last = items[-1]
+    return {NEXT_CURSOR_HEADER: encode_cursor(keyset.sort, getattr(last, keyset.sort), last.id)}
@@ -0,0 +1,120 @@
+import logging
+import os
+import re
+from datetime import date
+
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+
+from . import models
+
+PARTITION_MONTHS_AHEAD = int(os.getenv("PARTITION_MONTHS_AHEAD", "12"))
+PARTITIONED_TABLES = {
+    models.Booking.__tablename__: models.Booking.check_in_date.name,
+    models.Payment.__tablename__: models.Payment.payment_date.name,
+}
+DETACH_ORDER = (models.Payment.__tablename__, models.Booking.__tablename__)
+MAINTENANCE_LOCK = "partition maintenance"
+
+logger = logging.getLogger(__name__)
+
+CHILDREN_SQL = text("""
+    SELECT child.relname
+    FROM pg_inherits
+    JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+    JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+    WHERE parent.relname = :table
+""")
+
+IS_PARTITIONED_SQL = text("""
+    SELECT EXISTS (
+        SELECT 1 FROM pg_partitioned_table JOIN pg_class ON pg_class.oid = pg_partitioned_table.partrelid
+        WHERE pg_class.relname = :table
+    )
+""")
+
+FOREIGN_KEYS_SQL = text("""
+    SELECT conname FROM pg_constraint
+    WHERE conrelid = CAST(:table AS regclass) AND contype = 'f'
+""")
+
+
+def month_start(day: date) -> date:
+    return date(day.year, day.month, 1)
+
+def add_months(month: date, count: int) -> date:
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_y{month.year}m{month.month:02d}"
+
+def is_partitioned(connection, table: str) -> bool:
+    return connection.execute(IS_PARTITIONED_SQL, {"table": table}).scalar()
+
+def attached_months(connection, table: str) -> list:
+    pattern = re.compile(rf"^{table}_y(\d{{4}})m(\d{{2}})$")
+    months = []
+    for (name,) in connection.execute(CHILDREN_SQL, {"table": table}):
+        match = pattern.match(name)
+        if match:
+            months.append(date(int(match.group(1)), int(match.group(2)), 1))
+    return sorted(months)
+
+def create_partition(connection, table: str, month: date) -> bool:
+    key = PARTITIONED_TABLES[table]
+    bounds = {"start": month, "end": add_months(month, 1)}
+    waiting = connection.execute(
+        text(f"SELECT count(*) FROM {table}_default WHERE {key} >= :start AND {key} < :end"), bounds
+    ).scalar()
+    if waiting:
+        logger.warning("Partition %s not created: %s rows for this month are in %s_default", partition_name(table, month), waiting, table)
+        return False
+    connection.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {partition_name(table, month)} PARTITION OF {table} "
+        f"FOR VALUES FROM ('{bounds['start']}') TO ('{bounds['end']}')"
+    ))
+    return True
+
+def ensure_partitions(connection, months_ahead: int = PARTITION_MONTHS_AHEAD, today: date = None) -> list:
+    current = month_start(today or date.today())
+    connection.execute(text("SELECT pg_advisory_xact_lock(hashtext(:lock))"), {"lock": MAINTENANCE_LOCK})
+    created = []
+    for table in PARTITIONED_TABLES:
+        if not is_partitioned(connection, table):
+            continue
+        existing = set(attached_months(connection, table))
+        for offset in range(months_ahead + 1):
+            month = add_months(current, offset)
+            if month not in existing and create_partition(connection, table, month):
+                created.append(partition_name(table, month))
+    return created
+
+def detach_partitions(connection, retention_months: int, drop: bool = False, today: date = None) -> tuple:
+    cutoff = add_months(month_start(today or date.today()), -retention_months)
+    connection.execute(text("SELECT pg_advisory_xact_lock(hashtext(:lock))"), {"lock": MAINTENANCE_LOCK})
+    detached = []
+    skipped = []
+    for table in DETACH_ORDER:
+        if not is_partitioned(connection, table):
+            continue
+        for month in attached_months(connection, table):
+            if month >= cutoff:
+                continue
+            name = partition_name(table, month)
+            try:
+                with connection.begin_nested():
+                    connection.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+                    for (constraint,) in connection.execute(FOREIGN_KEYS_SQL, {"table": name}).all():
+                        connection.execute(text(f'ALTER TABLE {name} DROP CONSTRAINT "{constraint}"'))
+                    if drop:
+                        if table == models.Payment.__tablename__:
+                            connection.execute(text(
+                                f"DELETE FROM {models.PaymentTransactionId.__tablename__} "
+                                f"WHERE transaction_id IN (SELECT transaction_id FROM {name})"
+                            ))
+                        connection.execute(text(f"DROP TABLE {name}"))
+                detached.append(name)
+            except IntegrityError as exc:
+                skipped.append((name, str(exc.orig).splitlines()[0]))
+    return detached, skipped
@@ -0,0 +1,123 @@
+import threading
+import time
+from bisect import bisect_left
+
+from sqlalchemy import event
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from sqlalchemy.util.queue import AsyncAdaptedQueue, Empty, Queue
+
+CHECKOUT_WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class PoolMetrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.invalidations = 0
+        self.timeouts = 0
+        self.wait_count = 0
+        self.wait_sum = 0.0
+        self.wait_max = 0.0
+        self.wait_buckets = [0] * (len(CHECKOUT_WAIT_BUCKETS) + 1)
+
+    def observe_wait(self, seconds: float, timed_out: bool):
+        with self.lock:
+            self.wait_count += 1
+            self.wait_sum += seconds
+            self.wait_max = max(self.wait_max, seconds)
+            self.wait_buckets[bisect_left(CHECKOUT_WAIT_BUCKETS, seconds)] += 1
+            if timed_out:
+                self.timeouts += 1
+
+    def increment(self, counter: str):
+        with self.lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def snapshot(self, pool) -> dict:
+        with self.lock:
+            cumulative = 0
+            histogram = {}
+            for bound, count in zip(CHECKOUT_WAIT_BUCKETS + ("+Inf",), self.wait_buckets):
+                cumulative += count
+                histogram[str(bound)] = cumulative
+            return {
+                "pool_size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "checked_in": pool.checkedin(),
+                "overflow": pool.overflow(),
+                "connects": self.connects,
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "invalidations": self.invalidations,
+                "timeouts": self.timeouts,
+                "checkout_wait_seconds": {
+                    "count": self.wait_count,
+                    "sum": round(self.wait_sum, 6),
+                    "max": round(self.wait_max, 6),
+                    "buckets": histogram,
+                },
+            }
+
+
+# Пул ждёт в очереди, только когда исчерпан max_overflow: тогда get() блокирующий. Без ожидания очередь
+# читают выдача при свободном overflow и dispose(), а открытие нового соединения и pre-ping идут уже
+# после очереди, поэтому в гистограмму попадает только само ожидание свободного соединения
+class TimedQueueMixin:
+    metrics = None
+
+    def get(self, block=True, timeout=None):
+        if not block:
+            return super().get(block, timeout)
+        started = time.perf_counter()
+        timed_out = False
+        try:
+            return super().get(block, timeout)
+        except Empty:
+            timed_out = True
+            raise
+        finally:
+            self.metrics.observe_wait(time.perf_counter() - started, timed_out)
+
+
+class TimedQueue(TimedQueueMixin, Queue):
+    pass
+
+
+class TimedAsyncAdaptedQueue(TimedQueueMixin, AsyncAdaptedQueue):
+    pass
+
+
+class InstrumentedPoolMixin:
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = self._pool.metrics = PoolMetrics()
+        # recreate() после dispose() копирует слушатели старого пула в новый (_dispatch), поэтому
+        # слушатели регистрируются только у первого пула, а recreate() переносит его метрики
+        if kwargs.get("_dispatch") is None:
+            metrics = self.metrics
+            event.listen(self, "connect", lambda *_: metrics.increment("connects"))
+            event.listen(self, "checkout", lambda *_: metrics.increment("checkouts"))
+            event.listen(self, "checkin", lambda *_: metrics.increment("checkins"))
+            event.listen(self, "invalidate", lambda *_: metrics.increment("invalidations"))
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.metrics = pool._pool.metrics = self.metrics
+        return pool
+
+
+class InstrumentedQueuePool(InstrumentedPoolMixin, QueuePool):
+    _queue_class = TimedQueue
+
+
+class InstrumentedAsyncAdaptedQueuePool(InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    _queue_class = TimedAsyncAdaptedQueue
+
+
+def engine_pool_metrics(engine) -> dict:
+    metrics = getattr(engine.pool, "metrics", None)
+    if metrics is None:
+        return {}
+    return metrics.snapshot(engine.pool)
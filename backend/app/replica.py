@@ -0,0 +1,79 @@
+import logging
+import threading
+import time
+
+from sqlalchemy import event, text
+from sqlalchemy.exc import SQLAlchemyError
+
+logger = logging.getLogger(__name__)
+
+REPLICA_LAG_SQL = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN NULL
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+""")
+
+
+class ReplicaRouter:
+    def __init__(self, engine, max_lag_seconds: float, check_interval: float):
+        self.engine = engine
+        self.max_lag_seconds = max_lag_seconds
+        self.check_interval = check_interval
+        self.lag_seconds = None
+        self.healthy = False
+        self.checked_at = None
+        self.lock = threading.Lock()
+        if engine is not None:
+            self.watch(engine)
+
+    def watch(self, engine):
+        # Обрыв соединения с репликой в любом из движков сразу переключает чтение на PRIMARY
+        event.listen(engine, "handle_error", self._on_error)
+
+    def check_due(self) -> bool:
+        return self.engine is not None and (self.checked_at is None or time.monotonic() - self.checked_at >= self.check_interval)
+
+    def use_replica(self) -> bool:
+        if self.engine is None:
+            return False
+        if self.check_due() and self.lock.acquire(blocking=False):
+            try:
+                self.checked_at = time.monotonic()
+                self._check()
+            finally:
+                self.lock.release()
+        return self.healthy
+
+    def status(self) -> dict:
+        return {
+            "configured": self.engine is not None,
+            "healthy": self.healthy,
+            "lag_seconds": self.lag_seconds,
+            "max_lag_seconds": self.max_lag_seconds,
+        }
+
+    def _check(self):
+        try:
+            with self.engine.connect() as conn:
+                lag = conn.execute(REPLICA_LAG_SQL).scalar()
+        except SQLAlchemyError as exc:
+            self._mark_unhealthy(f"standby unreachable: {exc}")
+            return
+        self.lag_seconds = float(lag) if lag is not None else None
+        if self.lag_seconds is None:
+            self._mark_unhealthy("standby is not in recovery")
+        elif self.lag_seconds > self.max_lag_seconds:
+            self._mark_unhealthy(f"replay lag {self.lag_seconds:.1f}s exceeds {self.max_lag_seconds}s")
+        else:
+            self.healthy = True
+
+    def _mark_unhealthy(self, reason: str):
+        if self.healthy:
+            logger.warning("Reads fall back to primary: %s", reason)
+        self.healthy = False
+
+    def _on_error(self, context):
+        if context.is_disconnect:
+            self._mark_unhealthy("connection to standby lost")
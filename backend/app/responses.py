@@ -0,0 +1,33 @@
+import os
+from functools import lru_cache
+
+from fastapi import Response
+from pydantic import TypeAdapter
+
+FAST_JSON_RESPONSES = os.getenv("FAST_JSON_RESPONSES", "false").lower() in ("1", "true", "yes")
+
+
+class PydanticJSONResponse(Response):
+    media_type = "application/json"
+
+    def __init__(self, schema, content, status_code: int = 200, headers: dict = None):
+        self.schema = schema
+        super().__init__(content, status_code=status_code, headers=headers)
+
+    def render(self, content) -> bytes:
+        return serialize(self.schema, content)
+
+
+@lru_cache(maxsize=None)
+def adapter_for(schema) -> TypeAdapter:
+    return TypeAdapter(schema)
+
+def serialize(schema, value) -> bytes:
+    adapter = adapter_for(schema)
+    return adapter.dump_json(adapter.validate_python(value, from_attributes=True))
+
+def respond(response: Response, schema, value, headers: dict):
+    if FAST_JSON_RESPONSES:
+        return PydanticJSONResponse(schema, value, headers=headers)
+    response.headers.update(headers)
+    return value
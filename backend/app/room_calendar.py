@@ -0,0 +1,59 @@
+import base64
+from datetime import date
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+
+from . import crud, schemas
+from .database import get_read_db
+
+CALENDAR_MAX_DAYS = 366
+BITMAP_ENCODING = "base64-lsb"
+
+router = APIRouter()
+
+
+def day_mask(start: int, end: int) -> int:
+    return ((1 << (end - start)) - 1) << start
+
+def encode_bitmap(bits: int, days: int) -> str:
+    return base64.b64encode(bits.to_bytes((days + 7) // 8, "little")).decode()
+
+def build_calendar(rows, date_from: date, date_to: date) -> list:
+    days = (date_to - date_from).days
+    rooms = {}
+    for room_id, room_number, room_type_id, floor, status, check_in, check_out in rows:
+        room = rooms.get(room_id)
+        if room is None:
+            room = rooms[room_id] = {
+                "id": room_id,
+                "room_number": room_number,
+                "room_type_id": room_type_id,
+                "floor": floor,
+                "status": status,
+                "bits": 0,
+            }
+        if check_in is not None:
+            start = max((check_in - date_from).days, 0)
+            end = min((check_out - date_from).days, days)
+            room["bits"] |= day_mask(start, end)
+    for room in rooms.values():
+        room["occupied"] = encode_bitmap(room.pop("bits"), days)
+    return list(rooms.values())
+
+
+@router.get("/rooms/calendar", response_model=schemas.RoomCalendar)
+def read_room_calendar(date_from: date = Query(..., alias="from"), date_to: date = Query(..., alias="to"), room_type_id: Optional[int] = None, floor: Optional[int] = None, db: Session = Depends(get_read_db)):
+    if date_from >= date_to:
+        raise HTTPException(status_code=400, detail="Дата окончания должна быть позже даты начала")
+    if (date_to - date_from).days > CALENDAR_MAX_DAYS:
+        raise HTTPException(status_code=400, detail=f"Календарь строится не более чем на {CALENDAR_MAX_DAYS} дней")
+    rows = crud.get_room_calendar_rows(db, date_from, date_to, room_type_id=room_type_id, floor=floor)
+    return {
+        "date_from": date_from,
+        "date_to": date_to,
+        "days": (date_to - date_from).days,
+        "encoding": BITMAP_ENCODING,
+        "rooms": build_calendar(rows, date_from, date_to),
+    }
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr, Field
-from typing import Optional
+from typing import Any, List, Optional
 from datetime import date, datetime
 from decimal import Decimal
 
@@ -64,6 +64,7 @@ class GuestUpdate(BaseModel):
 
 class Guest(GuestBase):
     id: int
+    email: str = Field(..., json_schema_extra={"format": "email"})
     created_at: datetime
     
     class Config:
@@ -132,3 +133,59 @@ class User(UserBase):
     
     class Config:
         from_attributes = True
+
+class BulkRowError(BaseModel):
+    index: int
+    detail: Any
+
+class BulkResult(BaseModel):
+    inserted: int
+    ids: List[int]
+    errors: List[BulkRowError]
+
+class GuestUpsertResult(BaseModel):
+    inserted: int
+    updated: int
+    ids: List[int]
+    errors: List[BulkRowError]
+
+class BookingPurge(BaseModel):
+    deleted: int
+    batches: int
+    cutoff: date
+
+class OccupancyStat(BaseModel):
+    period: date
+    room_type_id: int
+    rooms_total: int
+    room_nights_available: int
+    room_nights_sold: int
+    occupancy_rate: Optional[Decimal] = None
+    adr: Optional[Decimal] = None
+
+class RevenueStat(BaseModel):
+    period: date
+    room_type_id: int
+    room_revenue: Decimal
+    payments_total: Decimal
+    revpar: Optional[Decimal] = None
+
+class AnalyticsRefresh(BaseModel):
+    date_from: date
+    date_to: date
+    days: int
+
+class RoomCalendarRow(BaseModel):
+    id: int
+    room_number: str
+    room_type_id: int
+    floor: int
+    status: str
+    occupied: str
+
+class RoomCalendar(BaseModel):
+    date_from: date
+    date_to: date
+    days: int
+    encoding: str
+    rooms: List[RoomCalendarRow]
@@ -0,0 +1,55 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from passlib.context import CryptContext
+from starlette.concurrency import run_in_threadpool
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(os.cpu_count() or 1, 4))))
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+def executor():
+    global _executor
+    if PASSWORD_HASH_WORKERS <= 0:
+        return None
+    with _executor_lock:
+        if _executor is None:
+            # fork из многопоточного воркера может унаследовать захваченную блокировку и зависнуть
+            _executor = ProcessPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        return _executor
+
+def shutdown():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+def hash_password(password: str) -> str:
+    pool = executor()
+    if pool is None:
+        return _hash(password)
+    return pool.submit(_hash, password).result()
+
+def hash_passwords(passwords: list) -> list:
+    pool = executor()
+    if pool is None:
+        return [_hash(password) for password in passwords]
+    return list(pool.map(_hash, passwords))
+
+async def hash_password_async(password: str) -> str:
+    pool = executor()
+    if pool is None:
+        return await run_in_threadpool(_hash, password)
+    return await asyncio.wrap_future(pool.submit(_hash, password))
@@ -0,0 +1,52 @@
+import logging
+import os
+from pathlib import Path
+
+from sqlalchemy.exc import OperationalError
+
+from . import models
+
+SCHEMA_STARTUP = os.getenv("SCHEMA_STARTUP", "verify").lower()
+SCHEMA_STARTUP_MODES = ("create", "verify", "skip")
+ALEMBIC_DIR = Path(__file__).resolve().parent.parent / "alembic"
+
+logger = logging.getLogger(__name__)
+
+
+def script_directory():
+    from alembic.config import Config
+    from alembic.script import ScriptDirectory
+
+    config = Config()
+    config.set_main_option("script_location", str(ALEMBIC_DIR))
+    return ScriptDirectory.from_config(config)
+
+def current_revisions(engine) -> set:
+    from alembic.runtime.migration import MigrationContext
+
+    with engine.connect() as connection:
+        return set(MigrationContext.configure(connection).get_current_heads())
+
+def verify_schema(engine) -> bool:
+    scripts = script_directory()
+    heads = set(scripts.get_heads())
+    try:
+        current = current_revisions(engine)
+    except OperationalError as exc:
+        logger.warning("Schema revision not verified, database unavailable: %s", exc.orig)
+        return False
+    if current == heads:
+        return True
+    known = {revision.revision for revision in scripts.walk_revisions()}
+    if current <= known:
+        raise RuntimeError(f"Database schema is at {sorted(current) or 'base'}, expected {sorted(heads)}: run alembic upgrade head")
+    logger.warning("Database schema %s is newer than this build (%s)", sorted(current), sorted(heads))
+    return False
+
+def prepare_schema(engine, mode: str = SCHEMA_STARTUP):
+    if mode not in SCHEMA_STARTUP_MODES:
+        raise ValueError(f"SCHEMA_STARTUP must be one of {', '.join(SCHEMA_STARTUP_MODES)}, got {mode!r}")
+    if mode == "create":
+        models.Base.metadata.create_all(bind=engine)
+    elif mode == "verify":
+        verify_schema(engine)
@@ -0,0 +1,129 @@
+# Нагрузочная проверка создания бронирований при конкурентных запросах
+# Несколько потоков одновременно создают подтверждённые бронирования через crud.create_booking
+# на случайные номера и даты. Пересечения должны отклоняться триггером bookings_check_overlap
+# (BookingConflictError -> HTTP 409), а не попадать в базу
+#
+# Тестовые бронирования создаются с начала следующего месяца (--start) с пометкой в special_requests
+# и удаляются в конце прогона. Недостающие месячные секции на период теста создаются заранее, чтобы
+# бронирования шли в обычные секции, а не в bookings_default. Возвращает код выхода 1, если найдены
+# пересекающиеся бронирования
+
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from decimal import Decimal
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+OVERLAPS_SQL = """
+    SELECT count(*)
+    FROM bookings a
+    JOIN bookings b ON b.room_id = a.room_id AND b.id > a.id
+     AND daterange(a.check_in_date, a.check_out_date) && daterange(b.check_in_date, b.check_out_date)
+    WHERE a.special_requests = :marker AND b.special_requests = :marker
+"""
+
+def next_month() -> date:
+    return (date.today().replace(day=1) + timedelta(days=32)).replace(day=1)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Конкурентное создание бронирований")
+    parser.add_argument("--threads", type=int, default=32, help="число параллельных клиентов")
+    parser.add_argument("--attempts", type=int, default=5000, help="всего попыток бронирования")
+    parser.add_argument("--rooms", type=int, default=50, help="на скольких номерах соревнуются клиенты")
+    parser.add_argument("--days", type=int, default=60, help="горизонт дат заезда в днях")
+    parser.add_argument("--start", type=date.fromisoformat, default=next_month(), help="первая дата горизонта")
+    parser.add_argument("--keep", action="store_true", help="не удалять созданные бронирования")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    # Пул должен вмещать все потоки, иначе измеряется ожидание соединения, а не вставка
+    os.environ.setdefault("DB_POOL_SIZE", str(args.threads))
+
+    from sqlalchemy import text
+
+    from app import crud, models, partitions, schemas
+    from app.database import SessionLocal, engine
+
+    marker = f"booking-concurrency-{uuid.uuid4().hex[:8]}"
+
+    db = SessionLocal()
+    room_ids = [room_id for (room_id,) in db.query(models.Room.id).order_by(models.Room.id).limit(args.rooms)]
+    guest_id = db.query(models.Guest.id).order_by(models.Guest.id).limit(1).scalar()
+    db.close()
+    if not room_ids or guest_id is None:
+        print("✗ В базе нет номеров или гостей, загрузите тестовые данные")
+        return 1
+
+    last_day = args.start + timedelta(days=args.days)
+    with engine.begin() as connection:
+        existing = set(partitions.attached_months(connection, models.Booking.__tablename__))
+        month = partitions.month_start(args.start)
+        while month <= last_day:
+            if month not in existing and not partitions.create_partition(connection, models.Booking.__tablename__, month):
+                print(f"✗ Секция {partitions.partition_name(models.Booking.__tablename__, month)} не создана: строки этого месяца уже лежат в bookings_default")
+            month = partitions.add_months(month, 1)
+
+    counters = {"created": 0, "conflicts": 0, "errors": 0}
+    lock = threading.Lock()
+
+    def attempt(_):
+        check_in = args.start + timedelta(days=random.randrange(args.days))
+        booking = schemas.BookingCreate(
+            guest_id=guest_id,
+            room_id=random.choice(room_ids),
+            check_in_date=check_in,
+            check_out_date=check_in + timedelta(days=random.randint(1, 4)),
+            total_price=Decimal("100.00"),
+            status="подтверждено",
+            special_requests=marker,
+        )
+        session = SessionLocal()
+        try:
+            crud.create_booking(session, booking)
+            outcome = "created"
+        except crud.BookingConflictError:
+            outcome = "conflicts"
+        except Exception as exc:
+            print(f"  ошибка: {exc}")
+            outcome = "errors"
+        finally:
+            session.close()
+        with lock:
+            counters[outcome] += 1
+
+    print(f"Потоков: {args.threads}, попыток: {args.attempts}, номеров: {len(room_ids)}, горизонт: {args.days} дн.")
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        list(pool.map(attempt, range(args.attempts)))
+    elapsed = time.perf_counter() - started
+
+    db = SessionLocal()
+    overlaps = db.execute(text(OVERLAPS_SQL), {"marker": marker}).scalar()
+
+    print(f"\nВремя: {elapsed:.2f} с")
+    print(f"Создано: {counters['created']} ({counters['created'] / elapsed:.0f} бронирований/с)")
+    print(f"Отклонено как пересечение (409): {counters['conflicts']}")
+    print(f"Прочие ошибки: {counters['errors']}")
+    print(f"Всего попыток в секунду: {args.attempts / elapsed:.0f}")
+    print(f"Пересекающихся пар в базе: {overlaps}")
+
+    if not args.keep:
+        db.query(models.Booking).filter(models.Booking.special_requests == marker).delete(synchronize_session=False)
+        db.commit()
+    db.close()
+
+    ok = overlaps == 0 and counters["errors"] == 0
+    print("\nИТОГ: " + ("OK" if ok else "ПРОБЛЕМА"))
+    return 0 if ok else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,127 @@
+# Проверка отсечения секций (partition pruning) в запросах к bookings и payments
+# Вызывает функции crud и analytics так же, как это делают эндпоинты, перехватывает SQL, который они
+# отправляют в базу, и выполняет для него EXPLAIN (FORMAT JSON). Запрос проходит проверку, если план
+# читает только секции месяцев, которые могут содержать подходящие строки (и секцию _default).
+# Всё выполняется в транзакции, которая откатывается, поэтому пересчёт аналитики базу не меняет
+#
+# Возвращает код 1, если хотя бы один запрос читает лишние секции
+
+import argparse
+import sys
+from datetime import date, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app import analytics, availability, crud, models, partitions
+from app.database import engine
+
+def captured_statements(connection, call) -> list:
+    """
+    Выполняет call(session) и возвращает отправленные в базу запросы с параметрами
+    """
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if not statement.lstrip().upper().startswith(("SAVEPOINT", "RELEASE", "ROLLBACK")):
+            statements.append((statement, parameters))
+
+    session = Session(bind=connection, join_transaction_mode="create_savepoint")
+    event.listen(connection, "before_cursor_execute", capture)
+    try:
+        call(session)
+    finally:
+        event.remove(connection, "before_cursor_execute", capture)
+        session.close()
+    return statements
+
+def scanned_relations(plan: dict) -> set:
+    relations = set()
+    if "Relation Name" in plan:
+        relations.add(plan["Relation Name"])
+    for child in plan.get("Plans", []):
+        relations |= scanned_relations(child)
+    return relations
+
+def months(first: date, last: date) -> list:
+    month, result = partitions.month_start(first), []
+    while month <= last:
+        result.append(month)
+        month = partitions.add_months(month, 1)
+    return result
+
+def expected_partitions(table: str, first: date, last: date) -> set:
+    return {partitions.partition_name(table, month) for month in months(first, last)} | {f"{table}_default"}
+
+def check(connection, title: str, call, expected: dict) -> bool:
+    """
+    expected: {таблица: допустимые секции}; секции остальных секционированных таблиц только выводятся
+    """
+    ok = True
+    print(title)
+    for statement, parameters in captured_statements(connection, call):
+        plan = connection.exec_driver_sql("EXPLAIN (FORMAT JSON) " + statement, parameters).scalar()
+        relations = scanned_relations(plan[0]["Plan"])
+        for table in partitions.PARTITIONED_TABLES:
+            scanned = sorted(name for name in relations if name.startswith(f"{table}_"))
+            if not scanned:
+                continue
+            extra = sorted(set(scanned) - expected[table]) if table in expected else []
+            total = len(partitions.attached_months(connection, table)) + 1
+            mark = "✗" if extra else "✓"
+            print(f"  {mark} {table}: {len(scanned)} из {total} секций ({', '.join(scanned)})")
+            if extra:
+                print(f"    лишние: {', '.join(extra)}")
+                ok = False
+    return ok
+
+def main():
+    parser = argparse.ArgumentParser(description="Проверка отсечения секций в запросах к bookings и payments")
+    parser.add_argument("--date-from", type=date.fromisoformat, default=date.today())
+    parser.add_argument("--days", type=int, default=7, help="длина проверяемого периода")
+    args = parser.parse_args()
+    date_from = args.date_from
+    date_to = date_from + timedelta(days=args.days)
+    stay_from = date_from - timedelta(days=models.MAX_STAY_DAYS - 1)
+
+    with engine.connect() as connection:
+        partitioned = all(partitions.is_partitioned(connection, table) for table in partitions.PARTITIONED_TABLES)
+        connection.rollback()
+        if not partitioned:
+            print("✗ bookings и payments не секционированы: выполните alembic upgrade head")
+            return 1
+        # Поиск свободных номеров проверяется в варианте с SQL, без индекса в памяти
+        availability.index.ready = False
+        checks = [
+            ("Свободные номера (GET /rooms/available/)",
+             lambda db: crud.get_available_rooms(db, date_from, date_to, expand=()),
+             {"bookings": expected_partitions("bookings", stay_from, date_to - timedelta(days=1))}),
+            ("Календарь занятости (GET /rooms/calendar)",
+             lambda db: crud.get_room_calendar_rows(db, date_from, date_to),
+             {"bookings": expected_partitions("bookings", stay_from, date_to - timedelta(days=1))}),
+            ("Список бронирований с датами (GET /bookings/?date_from&date_to)",
+             lambda db: crud.get_bookings(db, date_from=date_from, date_to=date_to, expand=()),
+             {"bookings": expected_partitions("bookings", date_from, date_to)}),
+            ("Список платежей с датами (GET /payments/?date_from&date_to)",
+             lambda db: crud.get_payments(db, date_from=date_from, date_to=date_to),
+             {"payments": expected_partitions("payments", date_from, date_to)}),
+            # Бронирования к платежам присоединяются по ключу (id, check_in_date), их секции
+            # заранее не известны — для bookings выводится только число прочитанных секций
+            ("Пересчёт аналитики (analytics.refresh)",
+             lambda db: analytics.refresh(db, date_from, date_to),
+             {"payments": expected_partitions("payments", date_from, date_to)}),
+        ]
+        transaction = connection.begin()
+        try:
+            results = [check(connection, *item) for item in checks]
+        finally:
+            transaction.rollback()
+
+    print("\nИТОГ: " + ("OK" if all(results) else "есть запросы без отсечения секций"))
+    return 0 if all(results) else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,126 @@
+# Проверка количества SQL-запросов на один HTTP-запрос к API
+# Защищает от возврата N+1 ленивых загрузок во вложенных ответах (Booking.guest, Booking.room, Room.room_type)
+# и от возврата к SELECT + UPDATE + refresh в PUT-эндпоинтах (должен быть один UPDATE ... RETURNING)
+#
+# Запускается против базы из DATABASE_URL с тестовыми данными (database/04_seed_data.sql)
+# Считаются запросы ко всем движкам приложения, включая реплику из REPLICA_DATABASE_URL, куда уходят чтения
+# Возвращает код выхода 0, если все эндпоинты уложились в лимит, и 1 в противном случае
+
+import os
+import sys
+from pathlib import Path
+
+from sqlalchemy import event
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# Фоновый пересчёт аналитики выполнял бы свои запросы посреди измерения
+os.environ["ANALYTICS_REFRESH_INTERVAL"] = "0"
+
+from fastapi.testclient import TestClient
+
+from app import database
+from app.main import app
+from app.replica import REPLICA_LAG_SQL
+
+# Эндпоинт -> максимально допустимое количество SQL-запросов
+EXPECTED_STATEMENTS = {
+    "/room-types/": 1,
+    "/rooms/": 1,
+    "/rooms/?expand=": 1,
+    "/rooms/{room_id}": 1,
+    "/rooms/available/?check_in=2024-02-01&check_out=2024-02-05": 1,
+    "/guests/": 1,
+    "/bookings/": 1,
+    "/bookings/?expand=": 1,
+    "/bookings/?expand=guest": 1,
+    "/bookings/{booking_id}": 1,
+    "/payments/": 1,
+}
+
+# PUT-эндпоинт -> (поле, которое записывается обратно тем же значением, лимит SQL-запросов)
+EXPECTED_UPDATE_STATEMENTS = {
+    "/room-types/{room_type_id}": ("base_price", 1),
+    "/rooms/{room_id}": ("status", 1),
+    "/guests/{guest_id}": ("phone", 1),
+    "/bookings/{booking_id}": ("status", 1),
+    "/payments/{payment_id}": ("payment_status", 1),
+}
+
+statements = []
+
+def statement_counter(label: str):
+    def count_statement(conn, cursor, statement, parameters, context, executemany):
+        # Проверка отставания реплики выполняется раз в REPLICA_CHECK_INTERVAL и к эндпоинту не относится
+        if statement != REPLICA_LAG_SQL.text:
+            statements.append(f"[{label}] {statement}")
+    return count_statement
+
+def attach_counter():
+    """
+    Подписывается на выполнение SQL во всех движках приложения, в том числе в движке реплики
+    """
+    engines = {"primary": database.engine}
+    if database.replica_engine is not None:
+        engines["replica"] = database.replica_engine
+    if database.async_engine is not None:
+        engines["async"] = database.async_engine.sync_engine
+    if database.async_replica_engine is not None:
+        engines["async_replica"] = database.async_replica_engine.sync_engine
+    for label, engine in engines.items():
+        event.listen(engine, "before_cursor_execute", statement_counter(label))
+
+def main():
+    attach_counter()
+    failed = False
+
+    with TestClient(app) as client:
+        bookings = client.get("/bookings/", params={"limit": 1}).json()
+        rooms = client.get("/rooms/", params={"limit": 1}).json()
+        if not bookings or not rooms:
+            print("✗ В базе нет бронирований или номеров, загрузите тестовые данные")
+            return 1
+
+        ids = {"booking_id": bookings[0]["id"], "room_id": rooms[0]["id"], "room_type_id": rooms[0]["room_type_id"]}
+        guests = client.get("/guests/", params={"limit": 1}).json()
+        payments = client.get("/payments/", params={"limit": 1}).json()
+        if guests:
+            ids["guest_id"] = guests[0]["id"]
+        if payments:
+            ids["payment_id"] = payments[0]["id"]
+
+        for template, limit in EXPECTED_STATEMENTS.items():
+            url = template.format(**ids)
+            statements.clear()
+            response = client.get(url)
+            count = len(statements)
+            ok = response.status_code == 200 and count <= limit
+            failed = failed or not ok
+            mark = "✓" if ok else "✗"
+            print(f"  {mark} GET {url}: {count} SQL (лимит {limit}), HTTP {response.status_code}")
+            if not ok:
+                for statement in statements:
+                    print("      " + " ".join(statement.split())[:150])
+
+        for template, (field, limit) in EXPECTED_UPDATE_STATEMENTS.items():
+            try:
+                url = template.format(**ids)
+            except KeyError:
+                continue
+            body = {field: client.get(url).json()[field]}
+            statements.clear()
+            response = client.put(url, json=body)
+            count = len(statements)
+            ok = response.status_code == 200 and count <= limit
+            failed = failed or not ok
+            mark = "✓" if ok else "✗"
+            print(f"  {mark} PUT {url}: {count} SQL (лимит {limit}), HTTP {response.status_code}")
+            if not ok:
+                for statement in statements:
+                    print("      " + " ".join(statement.split())[:150])
+
+    print("\nИТОГ: " + ("ПРОБЛЕМА" if failed else "OK"))
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
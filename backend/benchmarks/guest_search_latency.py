@@ -0,0 +1,109 @@
+# Задержка поиска гостей (GET /guests/search)
+# Запросы строятся из случайных гостей базы: начало фамилии, фамилия с опечаткой, часть телефона, номер
+# паспорта без пробела, имя с фамилией и слово, которого нет ни у кого. Каждый запрос выполняется через
+# crud.search_guests, как в эндпоинте; печатаются p50/p95/p99 по видам запросов. Для первого запроса
+# каждого вида выводится план последнего SQL-запроса поиска, чтобы убедиться, что guests читается по
+# индексам, а не целиком
+#
+# Возвращает код 1, если p99 какого-либо вида превышает --p99-ms
+
+import argparse
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import event, func, select, text
+
+from app import crud, models
+from app.database import SessionLocal, engine
+
+def sample_guests(db, count: int) -> list:
+    return db.execute(
+        select(models.Guest.first_name, models.Guest.last_name, models.Guest.phone, models.Guest.passport_number)
+        .order_by(func.random())
+        .limit(count)
+    ).all()
+
+def fragment(value: str, length: int) -> str:
+    start = random.randint(0, max(len(value) - length, 0))
+    return value[start:start + length]
+
+def typo(value: str) -> str:
+    # Пропущенная буква в середине слова
+    if len(value) < 5:
+        return value
+    position = random.randint(1, len(value) - 2)
+    return value[:position] + value[position + 1:]
+
+def queries(guest) -> dict:
+    digits = "".join(ch for ch in guest.phone or "" if ch.isdigit())
+    return {
+        "фамилия": guest.last_name[:4],
+        "опечатка": typo(guest.last_name),
+        "имя и фамилия": f"{guest.first_name} {guest.last_name}",
+        "телефон": fragment(digits, 6) if len(digits) >= 6 else guest.last_name,
+        "паспорт": (guest.passport_number or guest.last_name).replace(" ", ""),
+        "нет совпадений": "ъъъщщщ",
+    }
+
+def percentile(samples: list, share: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(int(len(ordered) * share), len(ordered) - 1)]
+
+def explain(db, q: str, limit: int) -> str:
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    connection = db.connection()
+    event.listen(connection, "before_cursor_execute", capture)
+    try:
+        crud.search_guests(db, q, limit)
+    finally:
+        event.remove(connection, "before_cursor_execute", capture)
+    statement, parameters = statements[-1]
+    rows = connection.exec_driver_sql("EXPLAIN " + statement, parameters).all()
+    return "\n".join("    " + row[0] for row in rows)
+
+def main():
+    parser = argparse.ArgumentParser(description="Задержка поиска гостей")
+    parser.add_argument("--queries", type=int, default=200, help="запросов каждого вида")
+    parser.add_argument("--limit", type=int, default=20, help="параметр limit эндпоинта")
+    parser.add_argument("--p99-ms", type=float, default=10.0, help="допустимый p99, мс")
+    args = parser.parse_args()
+
+    with SessionLocal() as db:
+        guests = db.execute(text("SELECT count(*) FROM guests")).scalar()
+        if not guests:
+            print("✗ В базе нет гостей, загрузите тестовые данные")
+            return 1
+        samples = sample_guests(db, args.queries)
+        timings = {}
+        for index, guest in enumerate(samples):
+            for kind, q in queries(guest).items():
+                if index == 0:
+                    print(f"{kind}: {q!r}\n{explain(db, q, args.limit)}\n")
+                started = time.perf_counter()
+                crud.search_guests(db, q, args.limit)
+                timings.setdefault(kind, []).append((time.perf_counter() - started) * 1000)
+        db.rollback()
+
+    print(f"Гостей в базе: {guests}, запросов каждого вида: {len(samples)}\n")
+    print(f"{'запрос':<16} {'p50, мс':>9} {'p95, мс':>9} {'p99, мс':>9} {'среднее':>9}")
+    ok = True
+    for kind, values in timings.items():
+        p99 = percentile(values, 0.99)
+        ok = ok and p99 <= args.p99_ms
+        mark = "✓" if p99 <= args.p99_ms else "✗"
+        print(f"{kind:<16} {percentile(values, 0.5):>9.2f} {percentile(values, 0.95):>9.2f} {p99:>9.2f} {statistics.mean(values):>9.2f} {mark}")
+    engine.dispose()
+    print("\nИТОГ: " + ("OK" if ok else f"p99 выше {args.p99_ms} мс"))
+    return 0 if ok else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,161 @@
+# Скорость вставки в guests, bookings и payments с лишними индексами и без них
+# Лишние индексы определяет scripts/index_advisor.py. Если в базе они ещё есть, второй прогон
+# удаляет их; если миграция очистки уже применена, первый прогон создаёт их заново по определениям
+# из этой миграции. Каждый прогон выполняется в отдельной транзакции и откатывается, поэтому база
+# не меняется, но на время прогона таблицы блокируются — запускайте на тестовой базе
+#
+# Строки генерирует сам сервер (INSERT ... SELECT FROM generate_series), поэтому время клиента и сети
+# не маскирует стоимость обновления индексов
+
+import argparse
+import statistics
+import sys
+import time
+import uuid
+from datetime import date
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import text
+
+from app.database import engine
+from app.startup import script_directory
+from scripts import index_advisor
+
+# Миграция, которая удаляет лишние индексы (сгенерирована scripts/index_advisor.py --write-migration)
+CLEANUP_REVISION = "cdad7afd3fc6"
+TABLES = ("guests", "bookings", "payments")
+
+INDEX_COUNT_SQL = "SELECT count(*) FROM pg_indexes WHERE schemaname = 'public' AND tablename = :table"
+
+GUESTS_SQL = """
+    WITH inserted AS (
+        INSERT INTO guests (first_name, last_name, email, phone, passport_number)
+        SELECT 'Тест', 'Гость' || n, 'insert-' || :marker || '-' || n || '@example.com', '+79990000000', :marker || '-' || n
+        FROM generate_series(1, :rows) AS n
+        RETURNING id
+    )
+    SELECT min(id), max(id) FROM inserted
+"""
+
+# Бронирования не пересекаются: каждый номер получает подряд идущие двухдневные интервалы
+BOOKINGS_SQL = """
+    WITH room_ids AS (SELECT array_agg(id ORDER BY id) AS ids FROM rooms),
+    inserted AS (
+        INSERT INTO bookings (guest_id, room_id, check_in_date, check_out_date, total_price, status)
+        SELECT
+            g.id,
+            r.ids[(g.id - :first_guest) % cardinality(r.ids) + 1],
+            CAST(:start AS date) + (g.id - :first_guest) / cardinality(r.ids) * 2,
+            CAST(:start AS date) + (g.id - :first_guest) / cardinality(r.ids) * 2 + 2,
+            9000.00,
+            'подтверждено'
+        FROM guests g, room_ids r
+        WHERE g.id BETWEEN :first_guest AND :last_guest
+        RETURNING id
+    )
+    SELECT min(id), max(id) FROM inserted
+"""
+
+PAYMENTS_SQL = """
+    WITH inserted AS (
+        INSERT INTO payments (booking_id, amount, payment_method, payment_status, transaction_id)
+        SELECT id, 9000.00, 'онлайн', 'завершен', 'TX-' || :marker || '-' || id
+        FROM bookings
+        WHERE id BETWEEN :first_booking AND :last_booking
+        RETURNING id
+    )
+    SELECT count(*) FROM inserted
+"""
+
+def extra_indexes(connection):
+    """
+    Лишние индексы (имя, определение) и признак того, что они сейчас есть в базе
+    """
+    findings = index_advisor.advise(connection)
+    if findings:
+        return [(index["name"], index["definition"]) for index, _, _ in findings], True
+    module = script_directory().get_revision(CLEANUP_REVISION).module
+    return [(name, definition.replace(" CONCURRENTLY", "", 1)) for name, _, definition in module.INDEXES], False
+
+def timed(connection, sql: str, params: dict):
+    started = time.perf_counter()
+    row = connection.execute(text(sql), params).one()
+    return time.perf_counter() - started, row
+
+def run_round(connection, rows: int, start: date) -> dict:
+    """
+    Вставляет rows гостей, по бронированию на гостя и по платежу на бронирование; время в секундах по таблицам
+    """
+    params = {"marker": uuid.uuid4().hex[:8], "rows": rows, "start": start}
+    timings = {}
+    timings["guests"], (params["first_guest"], params["last_guest"]) = timed(connection, GUESTS_SQL, params)
+    timings["bookings"], (params["first_booking"], params["last_booking"]) = timed(connection, BOOKINGS_SQL, params)
+    timings["payments"], _ = timed(connection, PAYMENTS_SQL, params)
+    return timings
+
+def run_once(args, prepare, start: date) -> dict:
+    """
+    Один прогон в транзакции, которая откатывается; число индексов и строк в секунду по таблицам
+    """
+    with engine.connect() as connection:
+        transaction = connection.begin()
+        try:
+            prepare(connection)
+            counts = {table: connection.execute(text(INDEX_COUNT_SQL), {"table": table}).scalar() for table in TABLES}
+            timings = run_round(connection, args.rows, start)
+        finally:
+            transaction.rollback()
+    # Откаченные строки остаются в индексах до VACUUM и замедлили бы следующий прогон
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        connection.execute(text(f"VACUUM {', '.join(TABLES)}"))
+    return {table: (counts[table], args.rows / seconds) for table, seconds in timings.items()}
+
+def median_rates(samples: list) -> dict:
+    return {table: (samples[0][table][0], statistics.median(sample[table][1] for sample in samples)) for table in TABLES}
+
+def main():
+    parser = argparse.ArgumentParser(description="Скорость вставки с лишними индексами и без них")
+    parser.add_argument("--rows", type=int, default=50000, help="строк в каждую таблицу за прогон")
+    parser.add_argument("--repeat", type=int, default=3, help="прогонов на вариант")
+    parser.add_argument("--start", type=date.fromisoformat, default=date(2200, 1, 1), help="первая дата тестовых бронирований")
+    args = parser.parse_args()
+
+    with engine.connect() as connection:
+        rooms = connection.execute(text("SELECT count(*) FROM rooms")).scalar()
+        indexes, present = extra_indexes(connection)
+    if not rooms:
+        print("✗ В базе нет номеров, загрузите тестовые данные")
+        return 1
+
+    def create_indexes(connection):
+        if not present:
+            for _, definition in indexes:
+                connection.execute(text(definition))
+
+    def drop_indexes(connection):
+        if present:
+            for name, _ in indexes:
+                connection.execute(text(f'DROP INDEX "{name}"'))
+
+    print(f"Лишние индексы ({'есть в базе' if present else 'восстанавливаются из миграции ' + CLEANUP_REVISION}): {', '.join(name for name, _ in indexes)}")
+    print(f"Строк на таблицу: {args.rows}, прогонов на вариант: {args.repeat}\n")
+    # Прогон для прогрева кэша, затем варианты чередуются, чтобы порядок не влиял на результат
+    run_once(args, create_indexes, args.start)
+    before, after = [], []
+    for repeat in range(args.repeat):
+        phases = [(before, create_indexes), (after, drop_indexes)]
+        for samples, prepare in (phases if repeat % 2 == 0 else phases[::-1]):
+            samples.append(run_once(args, prepare, args.start))
+    before, after = median_rates(before), median_rates(after)
+
+    print(f"{'таблица':<10} {'индексов':>9} {'строк/с':>10} {'индексов':>9} {'строк/с':>10} {'ускорение':>10}")
+    print(f"{'':<10} {'до':>20} {'после':>20}")
+    for table in TABLES:
+        (count_before, rate_before), (count_after, rate_after) = before[table], after[table]
+        print(f"{table:<10} {count_before:>9} {rate_before:>10.0f} {count_after:>9} {rate_after:>10.0f} {rate_after / rate_before:>9.2f}x")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
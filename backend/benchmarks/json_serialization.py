@@ -0,0 +1,112 @@
+# Микробенчмарк сериализации списков для каждого списочного эндпоинта
+# Сравнивает текущий путь FastAPI (валидация ORM-объектов в Pydantic-модели, перевод в dict
+# и json.dumps в JSONResponse) с быстрым путём app.responses (TypeAdapter.dump_json прямо в байты,
+# включается FAST_JSON_RESPONSES=1)
+#
+# База данных не нужна: ORM-объекты создаются в памяти со всеми вложенными связями.
+# Проверяет, что оба пути дают одинаковые байты, иначе возвращает код выхода 1
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from pathlib import Path
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from app import models, responses, schemas
+
+def build_rows(count: int) -> dict:
+    """
+    Создаёт ORM-объекты для каждого списочного эндпоинта
+    """
+    created_at = datetime(2025, 1, 1, 12, 0, 0)
+    room_types = [
+        models.RoomType(id=i, name=f"Тип {i}", description="Номер с видом на море", base_price=Decimal("4500.00"), capacity=2, created_at=created_at)
+        for i in range(1, 6)
+    ]
+    rooms = [
+        models.Room(id=i, room_number=str(100 + i), room_type_id=room_types[i % 5].id, room_type=room_types[i % 5], floor=i % 10 + 1, status="свободно", created_at=created_at)
+        for i in range(1, count + 1)
+    ]
+    guests = [
+        models.Guest(id=i, first_name="Иван", last_name=f"Петров{i}", email=f"guest{i}@example.com", phone="+79990000000", passport_number=f"4510 {i:06d}", date_of_birth=date(1990, 1, 1), created_at=created_at)
+        for i in range(1, count + 1)
+    ]
+    bookings = [
+        models.Booking(
+            id=i, guest_id=guests[i - 1].id, room_id=rooms[i - 1].id, guest=guests[i - 1], room=rooms[i - 1],
+            check_in_date=date(2025, 3, 1) + timedelta(days=i), check_out_date=date(2025, 3, 4) + timedelta(days=i),
+            total_price=Decimal("13500.00"), status="подтверждено", special_requests=None, created_at=created_at,
+        )
+        for i in range(1, count + 1)
+    ]
+    payments = [
+        models.Payment(id=i, booking_id=i, amount=Decimal("13500.00"), payment_method="онлайн", payment_status="завершен", transaction_id=f"TX{i:08d}", payment_date=created_at)
+        for i in range(1, count + 1)
+    ]
+    return {
+        "/room-types/": (List[schemas.RoomType], room_types),
+        "/rooms/": (List[schemas.Room], rooms),
+        "/rooms/available/": (List[schemas.Room], rooms),
+        "/guests/": (List[schemas.Guest], guests),
+        "/bookings/": (List[schemas.Booking], bookings),
+        "/payments/": (List[schemas.Payment], payments),
+    }
+
+LOOP = asyncio.new_event_loop()
+
+def current_path(field, rows) -> bytes:
+    # is_coroutine=True: валидация в том же потоке, без перехода в пул потоков, как у async-эндпоинтов
+    content = LOOP.run_until_complete(serialize_response(field=field, response_content=rows, is_coroutine=True))
+    return JSONResponse(content).body
+
+def fast_path(schema, rows) -> bytes:
+    return responses.PydanticJSONResponse(schema, rows).body
+
+def measure(function, *args, repeat: int) -> float:
+    """
+    Медиана времени одного вызова в миллисекундах
+    """
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function(*args)
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+def main():
+    parser = argparse.ArgumentParser(description="Сериализация списочных ответов")
+    parser.add_argument("--rows", type=int, default=100, help="элементов в ответе (limit)")
+    parser.add_argument("--repeat", type=int, default=200, help="повторов на эндпоинт")
+    args = parser.parse_args()
+
+    mismatches = []
+    print(f"Элементов в ответе: {args.rows}, повторов: {args.repeat}\n")
+    print(f"{'эндпоинт':<20} {'текущий, мс':>12} {'быстрый, мс':>12} {'ускорение':>10} {'размер, КБ':>11}")
+    for path, (schema, rows) in build_rows(args.rows).items():
+        field = create_response_field(name=f"Response_{path.strip('/')}", type_=schema, mode="serialization")
+        current_body = current_path(field, rows)
+        fast_body = fast_path(schema, rows)
+        if current_body != fast_body:
+            mismatches.append(path)
+        current = measure(current_path, field, rows, repeat=args.repeat)
+        fast = measure(fast_path, schema, rows, repeat=args.repeat)
+        print(f"{path:<20} {current:>12.3f} {fast:>12.3f} {current / fast:>9.1f}x {len(fast_body) / 1024:>11.1f}")
+
+    if mismatches:
+        print(f"\n✗ Тела ответов различаются: {', '.join(mismatches)}")
+        return 1
+    print("\n✓ Оба пути дают одинаковые байты")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,336 @@
+# Нагрузочное тестирование API бронирования по HTTP
+# --concurrency виртуальных пользователей в цикле выполняют действия из сценария (--mix) против запущенного
+# сервера (uvicorn). Действие «journey» — полный путь гостя: поиск свободных номеров, создание бронирования,
+# оплата, заселение и выселение; остальные действия — отдельные запросы (поиск номеров, страницы списков).
+# Для каждого эндпоинта печатаются число запросов, ошибки, запросы в секунду и p50/p95/p99, с --json
+# результаты сохраняются в файл, а --compare сравнивает их с предыдущим прогоном (например, другого коммита)
+#
+# Тестовые гости и их бронирования создаются с пометкой прогона на датах после --start (по умолчанию — с начала
+# следующего месяца, внутри заранее созданных месячных секций, а не в bookings_default) и удаляются в конце
+# (--keep оставляет их). 409 при создании бронирования — ожидаемый исход гонки за номер, а не ошибка
+#
+# Требует httpx: pip install httpx
+
+import argparse
+import asyncio
+import json
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+import uuid
+from datetime import date, datetime, timedelta, timezone
+
+import httpx
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# Веса действий в сценариях; свой сценарий задаётся строкой вида "journey=1,search=4"
+MIXES = {
+    "booking": {"journey": 1},
+    "browse": {"search": 4, "list_bookings": 2, "list_guests": 2, "list_payments": 1, "list_rooms": 1},
+    "mixed": {"journey": 2, "search": 4, "list_bookings": 2, "list_guests": 1, "list_payments": 1, "list_rooms": 1},
+}
+EXPECTED_STATUSES = {
+    "POST /bookings/": {201, 409},
+}
+
+def next_month() -> date:
+    return (date.today().replace(day=1) + timedelta(days=32)).replace(day=1)
+
+def parse_mix(value: str) -> dict:
+    if value in MIXES:
+        return MIXES[value]
+    mix = {}
+    for item in value.split(","):
+        name, _, weight = item.partition("=")
+        if name.strip() not in ACTIONS:
+            raise argparse.ArgumentTypeError(f"неизвестное действие {name.strip()!r}, доступны: {', '.join(ACTIONS)}")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Нагрузочное тестирование API бронирования")
+    parser.add_argument("--base-url", default="http://localhost:8000", help="адрес запущенного сервера")
+    parser.add_argument("--mix", type=parse_mix, default="mixed", help=f"сценарий: {', '.join(MIXES)} или список action=вес")
+    parser.add_argument("--concurrency", type=int, default=20, help="число виртуальных пользователей")
+    parser.add_argument("--duration", type=float, default=30, help="длительность замера, секунд")
+    parser.add_argument("--warmup", type=float, default=5, help="прогрев перед замером, секунд (в статистику не входит)")
+    parser.add_argument("--seed", type=int, default=1, help="зерно генератора случайных чисел")
+    parser.add_argument("--start", type=date.fromisoformat, default=next_month(), help="первая дата заезда тестовых бронирований")
+    parser.add_argument("--days", type=int, default=300, help="горизонт дат заезда в днях")
+    parser.add_argument("--page-size", type=int, default=50, help="limit страниц списков")
+    parser.add_argument("--pages", type=int, default=3, help="сколько страниц списка пролистывает одно действие")
+    parser.add_argument("--timeout", type=float, default=30, help="таймаут запроса, секунд")
+    parser.add_argument("--json", metavar="PATH", help="сохранить результаты в JSON")
+    parser.add_argument("--compare", metavar="PATH", help="сравнить с результатами предыдущего прогона (JSON)")
+    parser.add_argument("--keep", action="store_true", help="не удалять тестовых гостей и бронирования")
+    return parser.parse_args()
+
+class Recorder:
+    """
+    Задержки запросов по эндпоинтам; до вызова start() запросы считаются прогревом и не записываются
+    """
+
+    def __init__(self):
+        self.recording = False
+        self.latencies = {}
+        self.statuses = {}
+        self.errors = {}
+        self.started = self.finished = None
+
+    def start(self):
+        self.recording = True
+        self.started = time.perf_counter()
+
+    def stop(self):
+        self.recording = False
+        self.finished = time.perf_counter()
+
+    def add(self, endpoint: str, seconds: float, status: int):
+        if not self.recording:
+            return
+        self.latencies.setdefault(endpoint, []).append(seconds * 1000)
+        statuses = self.statuses.setdefault(endpoint, {})
+        statuses[status] = statuses.get(status, 0) + 1
+        if status not in EXPECTED_STATUSES.get(endpoint, range(200, 300)):
+            self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+
+class User:
+    """
+    Виртуальный пользователь: свой гость, свой генератор случайных чисел и общий клиент
+    """
+
+    def __init__(self, client: httpx.AsyncClient, recorder: Recorder, args, rng: random.Random, guest_id: int, marker: str):
+        self.client = client
+        self.recorder = recorder
+        self.args = args
+        self.rng = rng
+        self.guest_id = guest_id
+        self.marker = marker
+
+    async def request(self, method: str, endpoint: str, url: str = None, **kwargs) -> httpx.Response:
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(method, url or endpoint.split(" ", 1)[1], **kwargs)
+        except httpx.HTTPError:
+            self.recorder.add(endpoint, time.perf_counter() - started, 0)
+            return None
+        self.recorder.add(endpoint, time.perf_counter() - started, response.status_code)
+        return response
+
+    def stay(self):
+        check_in = self.args.start + timedelta(days=self.rng.randrange(self.args.days))
+        return check_in, check_in + timedelta(days=self.rng.randint(1, 5))
+
+    async def search(self, check_in: date = None, check_out: date = None):
+        if check_in is None:
+            check_in, check_out = self.stay()
+        params = {"check_in": check_in.isoformat(), "check_out": check_out.isoformat()}
+        return await self.request("GET", "GET /rooms/available/", params=params)
+
+    async def journey(self):
+        check_in, check_out = self.stay()
+        response = await self.search(check_in, check_out)
+        if response is None or response.status_code != 200 or not response.json():
+            return
+        room = self.rng.choice(response.json())
+        nights = (check_out - check_in).days
+        response = await self.request("POST", "POST /bookings/", json={
+            "guest_id": self.guest_id,
+            "room_id": room["id"],
+            "check_in_date": check_in.isoformat(),
+            "check_out_date": check_out.isoformat(),
+            "total_price": str(nights * 5000),
+            "status": "подтверждено",
+            "special_requests": self.marker,
+        })
+        if response is None or response.status_code != 201:
+            return
+        booking_id = response.json()["id"]
+        await self.request("POST", "POST /payments/", json={
+            "booking_id": booking_id,
+            "amount": str(nights * 5000),
+            "payment_method": self.rng.choice(["наличные", "кредитная карта", "дебетовая карта", "онлайн"]),
+            "payment_status": "завершен",
+            "transaction_id": f"{self.marker}-{uuid.uuid4().hex}",
+        })
+        for status in ("заселен", "выселен"):
+            await self.request("PUT", "PUT /bookings/{id}", f"/bookings/{booking_id}", json={"status": status})
+
+    async def list_pages(self, path: str):
+        params = {"sort": "id", "limit": self.args.page_size}
+        for _ in range(self.args.pages):
+            response = await self.request("GET", f"GET {path}", params=params)
+            cursor = response.headers.get(NEXT_CURSOR_HEADER) if response is not None else None
+            if not cursor:
+                return
+            params = {"sort": "id", "limit": self.args.page_size, "cursor": cursor}
+
+    async def list_bookings(self):
+        await self.list_pages("/bookings/")
+
+    async def list_guests(self):
+        await self.list_pages("/guests/")
+
+    async def list_payments(self):
+        await self.list_pages("/payments/")
+
+    async def list_rooms(self):
+        await self.request("GET", "GET /rooms/")
+
+    async def guest_search(self):
+        await self.request("GET", "GET /guests/search", params={"q": self.rng.choice(["Иван", "Петров", "916", "Смирнова", "4517"])})
+
+ACTIONS = {
+    "journey": User.journey,
+    "search": User.search,
+    "list_bookings": User.list_bookings,
+    "list_guests": User.list_guests,
+    "list_payments": User.list_payments,
+    "list_rooms": User.list_rooms,
+    "guest_search": User.guest_search,
+}
+
+async def run_user(user: User, mix: dict, deadline: float):
+    actions = [ACTIONS[name] for name in mix]
+    weights = list(mix.values())
+    while time.perf_counter() < deadline:
+        await user.rng.choices(actions, weights)[0](user)
+
+async def create_guests(client: httpx.AsyncClient, count: int, marker: str) -> list:
+    guest_ids = []
+    for index in range(count):
+        response = await client.post("/guests/", json={
+            "first_name": "Нагрузка",
+            "last_name": f"Тест{index}",
+            "email": f"{marker}-{index}@example.com",
+            "phone": f"+7999{index:07d}",
+            "passport_number": f"{marker[-8:]}-{index}",
+        })
+        response.raise_for_status()
+        guest_ids.append(response.json()["id"])
+    return guest_ids
+
+async def delete_guests(client: httpx.AsyncClient, guest_ids: list):
+    # Удаление гостя удаляет и его бронирования с платежами
+    semaphore = asyncio.Semaphore(8)
+
+    async def delete(guest_id: int):
+        async with semaphore:
+            await client.delete(f"/guests/{guest_id}")
+
+    await asyncio.gather(*(delete(guest_id) for guest_id in guest_ids))
+
+def percentile(values: list, share: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * share), len(ordered) - 1)]
+
+def summarize(recorder: Recorder) -> dict:
+    elapsed = recorder.finished - recorder.started
+    endpoints = {}
+    for endpoint, values in sorted(recorder.latencies.items()):
+        endpoints[endpoint] = {
+            "requests": len(values),
+            "errors": recorder.errors.get(endpoint, 0),
+            "statuses": {str(status): count for status, count in sorted(recorder.statuses[endpoint].items())},
+            "rps": round(len(values) / elapsed, 2),
+            "p50_ms": round(percentile(values, 0.5), 2),
+            "p95_ms": round(percentile(values, 0.95), 2),
+            "p99_ms": round(percentile(values, 0.99), 2),
+            "mean_ms": round(statistics.mean(values), 2),
+            "max_ms": round(max(values), 2),
+        }
+    requests = sum(item["requests"] for item in endpoints.values())
+    return {
+        "elapsed_s": round(elapsed, 2),
+        "requests": requests,
+        "errors": sum(item["errors"] for item in endpoints.values()),
+        "rps": round(requests / elapsed, 2) if elapsed else 0,
+        "endpoints": endpoints,
+    }
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def print_summary(summary: dict):
+    print(f"{'эндпоинт':<24} {'запросов':>9} {'ошибок':>7} {'запр/с':>8} {'p50, мс':>9} {'p95, мс':>9} {'p99, мс':>9}")
+    for endpoint, item in summary["endpoints"].items():
+        print(f"{endpoint:<24} {item['requests']:>9} {item['errors']:>7} {item['rps']:>8.1f} {item['p50_ms']:>9.2f} {item['p95_ms']:>9.2f} {item['p99_ms']:>9.2f}")
+    print(f"\nВсего: {summary['requests']} запросов за {summary['elapsed_s']} с ({summary['rps']:.1f} запр/с), ошибок: {summary['errors']}")
+
+def print_comparison(summary: dict, baseline: dict):
+    print(f"\nСравнение с {baseline['meta'].get('commit') or 'предыдущим прогоном'} ({baseline['meta']['started_at']})")
+    print(f"{'эндпоинт':<24} {'было запр/с':>12} {'изм.':>8} {'было p99, мс':>13} {'изм.':>8}")
+    for endpoint, item in summary["endpoints"].items():
+        before = baseline["summary"]["endpoints"].get(endpoint)
+        if before is None:
+            print(f"{endpoint:<24} {'нет в базовом прогоне':>43}")
+            continue
+        rps_change = (item["rps"] / before["rps"] - 1) * 100 if before["rps"] else 0
+        p99_change = (item["p99_ms"] / before["p99_ms"] - 1) * 100 if before["p99_ms"] else 0
+        print(f"{endpoint:<24} {before['rps']:>12.1f} {rps_change:>+7.1f}% {before['p99_ms']:>13.2f} {p99_change:>+7.1f}%")
+
+async def run(args) -> dict:
+    marker = f"loadtest-{uuid.uuid4().hex[:12]}"
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+        guest_ids = await create_guests(client, args.concurrency, marker)
+        recorder = Recorder()
+        users = [
+            User(client, recorder, args, random.Random(args.seed * 1000003 + index), guest_id, marker)
+            for index, guest_id in enumerate(guest_ids)
+        ]
+        deadline = time.perf_counter() + args.warmup + args.duration
+        loop = asyncio.get_running_loop()
+        loop.call_later(args.warmup, recorder.start)
+        try:
+            await asyncio.gather(*(run_user(user, args.mix, deadline) for user in users))
+        finally:
+            recorder.stop()
+            if not args.keep:
+                await delete_guests(client, guest_ids)
+    return summarize(recorder)
+
+def main():
+    args = parse_args()
+    started_at = datetime.now(timezone.utc)
+    print(f"Сервер: {args.base_url}, сценарий: {args.mix}, пользователей: {args.concurrency}, "
+          f"замер: {args.duration} с после прогрева {args.warmup} с\n")
+    try:
+        summary = asyncio.run(run(args))
+    except httpx.HTTPError as exc:
+        print(f"✗ Сервер недоступен или отклонил подготовку данных: {exc}")
+        return 1
+    print_summary(summary)
+
+    result = {
+        "meta": {
+            "started_at": started_at.isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "base_url": args.base_url,
+            "mix": args.mix,
+            "concurrency": args.concurrency,
+            "duration_s": args.duration,
+            "warmup_s": args.warmup,
+            "seed": args.seed,
+            "python": platform.python_version(),
+        },
+        "summary": summary,
+    }
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as file:
+            json.dump(result, file, ensure_ascii=False, indent=2)
+        print(f"Результаты сохранены в {args.json}")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as file:
+            print_comparison(summary, json.load(file))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,75 @@
+# Замер времени импорта и запуска API в разных режимах SCHEMA_STARTUP
+# Каждый прогон — отдельный процесс Python, как при старте воркера uvicorn:
+# измеряется импорт app.main и выполнение обработчиков startup
+#
+# create — прежнее поведение (create_all, запрос к каталогу по каждой таблице)
+# verify — только сверка ревизии Alembic с head миграций
+# skip   — без обращения к базе при старте
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+CHILD = """
+import asyncio, json, time
+started = time.perf_counter()
+from app.main import app
+imported = time.perf_counter()
+error = None
+try:
+    asyncio.run(app.router.startup())
+except Exception as exc:
+    error = f"{type(exc).__name__}: {str(exc).splitlines()[0]}"
+booted = time.perf_counter()
+print(json.dumps({"import": imported - started, "startup": booted - imported, "error": error}))
+"""
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Время импорта и запуска API")
+    parser.add_argument("--modes", default="create,verify,skip", help="режимы SCHEMA_STARTUP через запятую")
+    parser.add_argument("--repeat", type=int, default=5, help="прогонов на режим")
+    parser.add_argument("--database-url", help="переопределить DATABASE_URL, например адресом недоступной базы")
+    return parser.parse_args()
+
+def run_once(mode: str, database_url: str = None) -> dict:
+    """
+    Запускает приложение в отдельном процессе и возвращает замеры
+    """
+    env = {**os.environ, "SCHEMA_STARTUP": mode, "PYTHONDONTWRITEBYTECODE": "1"}
+    if database_url:
+        env["DATABASE_URL"] = database_url
+    completed = subprocess.run(
+        [sys.executable, "-c", CHILD], cwd=BACKEND_DIR, env=env, capture_output=True, text=True
+    )
+    if completed.returncode != 0:
+        return {"import": 0.0, "startup": 0.0, "error": completed.stderr.strip().splitlines()[-1]}
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+def main():
+    args = parse_args()
+    failed = False
+
+    print(f"{'режим':<8} {'импорт, мс':>14} {'startup, мс':>14} {'всего, мс':>12}  ошибки")
+    for mode in args.modes.split(","):
+        runs = [run_once(mode, args.database_url) for _ in range(args.repeat)]
+        imports = [run["import"] * 1000 for run in runs]
+        startups = [run["startup"] * 1000 for run in runs]
+        totals = [first + second for first, second in zip(imports, startups)]
+        errors = sorted({run["error"] for run in runs if run["error"]})
+        failed = failed or bool(errors)
+        print(
+            f"{mode:<8} {statistics.median(imports):>14.1f} {statistics.median(startups):>14.1f} "
+            f"{statistics.median(totals):>12.1f}  {'; '.join(errors) or '-'}"
+        )
+
+    print("\nМедиана по", args.repeat, "прогонам; первый прогон включает прогрев файлового кэша ОС")
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,364 @@
+# Генератор синтетических данных для проверки производительности на больших объёмах
+# --scale 1 — 1 000 номеров, 100 000 гостей, 1 000 000 бронирований за --years лет (плюс полгода вперёд)
+# и платежи к ним; --scale 10 — 10 000 номеров, 1 000 000 гостей и 10 000 000 бронирований. Объёмы можно
+# задать и явно (--rooms, --guests, --bookings)
+#
+# Время каждого номера делится на равные слоты, по одному бронированию на слот, поэтому бронирования
+# одного номера не пересекаются, а диапазон дат известен заранее: секции bookings и payments создаются до
+# загрузки, и строки не попадают в секции _default. Статусы зависят от дат: прошедшие — «выселен»,
+# текущие — «заселен», будущие — «подтверждено» или «ожидает», часть любых — «отменено»
+#
+# Строки загружаются через COPY в --workers процессах: гости — диапазонами id, бронирования и платежи —
+# группами номеров. Генерация детерминирована: одинаковые --seed и объёмы дают одинаковые данные.
+# Скрипт рассчитан на пустую базу; --truncate очищает номера, гостей, бронирования и платежи
+#
+# Пример:
+#   python scripts/generate_data.py --scale 10 --workers 8 --truncate
+
+import argparse
+import io
+import multiprocessing
+import os
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import text
+
+from app import models, partitions
+from app.database import engine
+
+ROOMS_PER_SCALE = 1000
+GUESTS_PER_SCALE = 100000
+BOOKINGS_PER_SCALE = 1000000
+FUTURE_DAYS = 183
+MAX_LEAD_DAYS = 90
+ROOMS_PER_FLOOR = 50
+GUESTS_PER_TASK = 50000
+COPY_BATCH_ROWS = 100000
+
+# Типы номеров из database/04_seed_data.sql и их доля среди номеров
+ROOM_TYPES = (
+    ("Стандарт", "Стандартный номер с одной двуспальной кроватью", 3000, 2, 40),
+    ("Комфорт", "Комфортный номер с улучшенной мебелью", 4500, 2, 30),
+    ("Люкс", "Роскошный номер с отдельной гостиной", 8000, 3, 12),
+    ("Семейный", "Просторный номер для семьи с детьми", 6000, 4, 15),
+    ("Президентский", "Элитный номер с панорамным видом", 15000, 4, 3),
+)
+ROOM_STATUSES = (("свободно", 85), ("занято", 8), ("зарезервировано", 5), ("на тех. обслуживании", 2))
+STAY_NIGHTS = ((1, 20), (2, 25), (3, 20), (4, 12), (5, 8), (6, 5), (7, 10))
+CANCELLED_SHARE = 0.08
+PENDING_SHARE = 0.2
+PAYMENT_METHODS = (("кредитная карта", 45), ("дебетовая карта", 25), ("онлайн", 20), ("наличные", 10))
+DECLINED_SHARE = 0.02
+REFUNDED_SHARE = 0.5
+
+MALE_FIRST_NAMES = ("Александр", "Алексей", "Андрей", "Артём", "Дмитрий", "Евгений", "Иван", "Игорь", "Кирилл", "Максим",
+                    "Михаил", "Никита", "Николай", "Павел", "Роман", "Сергей", "Владимир", "Юрий")
+FEMALE_FIRST_NAMES = ("Анна", "Анастасия", "Дарья", "Екатерина", "Елена", "Ирина", "Мария", "Наталья", "Ольга",
+                      "Полина", "Светлана", "Софья", "Татьяна", "Юлия", "Виктория", "Ксения")
+LAST_NAMES = ("Иванов", "Смирнов", "Кузнецов", "Попов", "Васильев", "Петров", "Соколов", "Михайлов", "Новиков",
+              "Фёдоров", "Морозов", "Волков", "Алексеев", "Лебедев", "Семёнов", "Егоров", "Павлов", "Козлов",
+              "Степанов", "Николаев", "Орлов", "Андреев", "Макаров", "Никитин", "Захаров", "Зайцев", "Соловьёв",
+              "Борисов", "Яковлев", "Григорьев", "Романов", "Воробьёв", "Сергеев", "Кузьмин", "Фролов",
+              "Александров", "Дмитриев", "Королёв", "Гусев", "Киселёв", "Ильин", "Максимов", "Поляков",
+              "Сорокин", "Виноградов", "Ковалёв", "Белов", "Медведев", "Антонов", "Тарасов", "Жуков",
+              "Баранов", "Филиппов", "Комаров", "Давыдов", "Беляев", "Герасимов", "Богданов", "Осипов",
+              "Сидоров", "Матвеев", "Титов", "Марков", "Миронов", "Крылов", "Куликов", "Карпов", "Власов",
+              "Мельников", "Денисов", "Гаврилов", "Тихонов", "Казаков", "Афанасьев", "Данилов", "Савельев",
+              "Тимофеев", "Фомин", "Чернов", "Абрамов", "Мартынов", "Ефимов", "Федотов", "Щербаков",
+              "Назаров", "Калинин", "Исаев", "Чернышёв", "Быков", "Маслов", "Родионов", "Коновалов",
+              "Лазарев", "Воронин", "Климов", "Филатов", "Пономарёв", "Голубев", "Кудрявцев", "Прохоров",
+              "Наумов", "Потапов", "Журавлёв", "Овчинников", "Трофимов", "Леонов", "Соболев", "Ермаков",
+              "Колесников", "Гончаров", "Емельянов", "Никифоров", "Грачёв", "Котов", "Гришин", "Ефремов",
+              "Архипов", "Громов", "Кириллов", "Малышев", "Панов", "Моисеев", "Румянцев", "Акимов",
+              "Кондратьев", "Бирюков", "Горбунов", "Анисимов", "Ерёмин", "Тихомиров", "Галкин", "Лукьянов",
+              "Михеев", "Скворцов", "Юдин", "Белоусов", "Нестеров", "Симонов", "Прокофьев", "Харитонов",
+              "Князев", "Цветков", "Левин", "Митрофанов", "Воронов", "Аксёнов", "Софронов", "Мальцев",
+              "Логинов", "Горшков", "Савин", "Краснов", "Майоров", "Демидов", "Елисеев", "Рыбаков",
+              "Сафонов", "Плотников", "Демин", "Хохлов", "Жданов", "Носов", "Ширяев", "Поздняков")
+
+GUEST_COLUMNS = ("id", "first_name", "last_name", "email", "phone", "passport_number", "date_of_birth", "created_at")
+BOOKING_COLUMNS = ("id", "guest_id", "room_id", "check_in_date", "check_out_date", "total_price", "status", "created_at")
+PAYMENT_COLUMNS = ("id", "booking_id", "booking_check_in_date", "amount", "payment_method", "payment_status",
+                   "transaction_id", "payment_date")
+TRUNCATED_TABLES = ("payments", "payment_transaction_ids", "bookings", "guests", "rooms", "room_types")
+SEQUENCE_TABLES = ("room_types", "rooms", "guests", "bookings", "payments")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Генерация синтетических данных через COPY")
+    parser.add_argument("--scale", type=float, default=1.0, help="масштаб: 1 — 1 000 номеров, 100 000 гостей, 1 000 000 бронирований")
+    parser.add_argument("--rooms", type=int, help="число номеров (по умолчанию по --scale)")
+    parser.add_argument("--guests", type=int, help="число гостей (по умолчанию по --scale)")
+    parser.add_argument("--bookings", type=int, help="число бронирований (по умолчанию по --scale)")
+    parser.add_argument("--years", type=float, default=10, help="сколько лет истории бронирований до сегодняшнего дня")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="число процессов загрузки")
+    parser.add_argument("--seed", type=int, default=1, help="зерно генератора случайных чисел")
+    parser.add_argument("--today", type=date.fromisoformat, default=date.today(), help="дата, от которой считаются статусы бронирований")
+    parser.add_argument("--truncate", action="store_true", help="очистить номера, гостей, бронирования и платежи перед загрузкой")
+    parser.add_argument("--no-triggers", action="store_true",
+                        help="загружать с session_replication_role = replica (нужен суперпользователь): без триггеров и проверок внешних ключей")
+    args = parser.parse_args()
+    args.rooms = args.rooms or round(ROOMS_PER_SCALE * args.scale)
+    args.guests = args.guests or round(GUESTS_PER_SCALE * args.scale)
+    args.bookings = args.bookings or round(BOOKINGS_PER_SCALE * args.scale)
+    if min(args.rooms, args.guests, args.bookings) < 1:
+        parser.error("число номеров, гостей и бронирований должно быть положительным")
+    return args
+
+class Plan:
+    """
+    Параметры генерации, одинаковые во всех процессах
+    """
+
+    def __init__(self, args):
+        self.seed = args.seed
+        self.today = args.today
+        self.now = datetime.combine(args.today, datetime.min.time()) + timedelta(hours=12)
+        self.rooms = args.rooms
+        self.guests = args.guests
+        self.bookings = args.bookings
+        self.no_triggers = args.no_triggers
+        self.last_day = args.today + timedelta(days=FUTURE_DAYS)
+        self.first_day = args.today - timedelta(days=round(args.years * 365.25))
+        self.first_moment = datetime.combine(self.first_day, datetime.min.time())
+        self.per_room, self.extra = divmod(args.bookings, args.rooms)
+        self.slot_days = (self.last_day - self.first_day).days / (self.per_room + (1 if self.extra else 0))
+        self.room_type_prices = []
+
+    def room_bookings(self, room_index: int) -> tuple:
+        """
+        Первый id и число бронирований номера; id бронирований одного номера идут подряд
+        """
+        count = self.per_room + (1 if room_index < self.extra else 0)
+        return room_index * self.per_room + min(room_index, self.extra) + 1, count
+
+def weighted(rng: random.Random, choices: tuple):
+    values, weights = zip(*choices)
+    return rng.choices(values, weights)[0]
+
+def copy_rows(connection, table: str, columns: tuple, rows: list):
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write("\t".join("\\N" if value is None else str(value) for value in row))
+        buffer.write("\n")
+    buffer.seek(0)
+    with connection.cursor() as cursor:
+        cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN", buffer)
+
+def open_connection(plan: Plan):
+    connection = engine.raw_connection()
+    if plan.no_triggers:
+        with connection.cursor() as cursor:
+            cursor.execute("SET session_replication_role = replica")
+    return connection
+
+def generate_guest(rng: random.Random, guest_id: int, plan: Plan) -> tuple:
+    last_name = rng.choice(LAST_NAMES)
+    if rng.random() < 0.5:
+        first_name = rng.choice(MALE_FIRST_NAMES)
+    else:
+        first_name = rng.choice(FEMALE_FIRST_NAMES)
+        last_name += "а"
+    birth = date(1950, 1, 1) + timedelta(days=rng.randrange(55 * 365))
+    created = plan.first_moment + timedelta(seconds=rng.randrange(int((plan.now - plan.first_moment).total_seconds())))
+    return (
+        guest_id,
+        first_name,
+        last_name,
+        f"guest{guest_id}@example.com",
+        f"+79{rng.randrange(10 ** 9):09d}",
+        f"{4500 + guest_id // 1000000:04d} {guest_id % 1000000:06d}",
+        birth,
+        created,
+    )
+
+def load_guests(task: tuple) -> int:
+    plan, first, last = task
+    rng = random.Random(plan.seed * 1000003 + first)
+    connection = open_connection(plan)
+    try:
+        copy_rows(connection, "guests", GUEST_COLUMNS, [generate_guest(rng, guest_id, plan) for guest_id in range(first, last + 1)])
+        connection.commit()
+    finally:
+        connection.close()
+    return last - first + 1
+
+def booking_status(rng: random.Random, check_in: date, check_out: date, today: date) -> str:
+    if rng.random() < CANCELLED_SHARE:
+        return "отменено"
+    if check_out <= today:
+        return "выселен"
+    if check_in <= today:
+        return "заселен"
+    return "ожидает" if rng.random() < PENDING_SHARE else "подтверждено"
+
+def generate_payment(rng: random.Random, booking: tuple, plan: Plan):
+    booking_id, _, _, check_in, _, total_price, status, created = booking
+    if status == "ожидает":
+        return None
+    if status == "отменено":
+        if rng.random() >= REFUNDED_SHARE:
+            return None
+        payment_status = "возврат"
+    else:
+        payment_status = "отклонен" if rng.random() < DECLINED_SHARE else "завершен"
+    method = weighted(rng, PAYMENT_METHODS)
+    payment_date = min(created + timedelta(minutes=rng.randint(1, 120)), plan.now)
+    transaction_id = None if method == "наличные" else f"TX{plan.seed}-{booking_id:010d}"
+    # Платёж получает id своего бронирования, booking_check_in_date заполнен, и триггер не ищет бронирование
+    return booking_id, booking_id, check_in, total_price, method, payment_status, transaction_id, payment_date
+
+def generate_room_bookings(rng: random.Random, room_index: int, plan: Plan) -> list:
+    room_id, price = room_index + 1, plan.room_type_prices[room_index]
+    first_id, count = plan.room_bookings(room_index)
+    bookings = []
+    for slot in range(count):
+        slot_start = plan.first_day + timedelta(days=int(slot * plan.slot_days))
+        slot_days = max(int((slot + 1) * plan.slot_days) - int(slot * plan.slot_days), 1)
+        nights = min(weighted(rng, STAY_NIGHTS), slot_days)
+        check_in = slot_start + timedelta(days=rng.randint(0, slot_days - nights))
+        check_out = check_in + timedelta(days=nights)
+        status = booking_status(rng, check_in, check_out, plan.today)
+        created = datetime.combine(check_in, datetime.min.time()) - timedelta(days=rng.randint(1, MAX_LEAD_DAYS), seconds=rng.randrange(86400))
+        if created > plan.now:
+            created = plan.now - timedelta(seconds=rng.randrange(30 * 86400))
+        bookings.append((first_id + slot, rng.randint(1, plan.guests), room_id, check_in, check_out, f"{price * nights}.00", status, created))
+    return bookings
+
+def load_bookings(task: tuple) -> tuple:
+    plan, first_room, last_room = task
+    connection = open_connection(plan)
+    booked = paid = 0
+    try:
+        bookings, payments = [], []
+        for room_index in range(first_room, last_room + 1):
+            rng = random.Random(plan.seed * 1000003 + plan.guests + room_index)
+            for booking in generate_room_bookings(rng, room_index, plan):
+                bookings.append(booking)
+                payment = generate_payment(rng, booking, plan)
+                if payment is not None:
+                    payments.append(payment)
+            if len(bookings) >= COPY_BATCH_ROWS or room_index == last_room:
+                copy_rows(connection, "bookings", BOOKING_COLUMNS, bookings)
+                copy_rows(connection, "payments", PAYMENT_COLUMNS, payments)
+                booked, paid = booked + len(bookings), paid + len(payments)
+                bookings, payments = [], []
+        connection.commit()
+    finally:
+        connection.close()
+    return booked, paid
+
+def prepare_tables(connection, args) -> bool:
+    if not all(partitions.is_partitioned(connection, table) for table in partitions.PARTITIONED_TABLES):
+        print("✗ bookings и payments не секционированы: выполните alembic upgrade head")
+        return False
+    if args.truncate:
+        connection.execute(text(f"TRUNCATE {', '.join(TRUNCATED_TABLES)} RESTART IDENTITY CASCADE"))
+        return True
+    filled = [table for table in ("room_types", "rooms", "guests", "bookings") if connection.execute(text(f"SELECT EXISTS (SELECT 1 FROM {table})")).scalar()]
+    if filled:
+        print(f"✗ Таблицы не пусты ({', '.join(filled)}): запустите с --truncate")
+        return False
+    return True
+
+def create_rooms(connection, args) -> list:
+    """
+    Создаёт типы номеров и номера; возвращает базовую цену типа каждого номера
+    """
+    rng = random.Random(args.seed)
+    type_ids = []
+    for name, description, price, capacity, _ in ROOM_TYPES:
+        type_ids.append(connection.execute(
+            text("INSERT INTO room_types (name, description, base_price, capacity) VALUES (:name, :description, :price, :capacity) RETURNING id"),
+            {"name": name, "description": description, "price": price, "capacity": capacity},
+        ).scalar())
+    shares = [(index, share) for index, (*_, share) in enumerate(ROOM_TYPES)]
+    rooms, prices = [], []
+    for room_index in range(args.rooms):
+        floor, number = divmod(room_index, ROOMS_PER_FLOOR)
+        type_index = weighted(rng, shares)
+        rooms.append((room_index + 1, f"{floor + 1}{number + 1:02d}", type_ids[type_index], floor + 1, weighted(rng, ROOM_STATUSES)))
+        prices.append(ROOM_TYPES[type_index][2])
+    copy_rows(connection.connection, "rooms", ("id", "room_number", "room_type_id", "floor", "status"), rooms)
+    return prices
+
+def create_partitions(connection, plan: Plan) -> int:
+    """
+    Секции на весь диапазон дат до загрузки, чтобы строки не попали в секции _default
+    """
+    created = 0
+    ranges = {
+        "bookings": (plan.first_day, plan.last_day + timedelta(days=7)),
+        "payments": (plan.first_day - timedelta(days=MAX_LEAD_DAYS + 1), plan.today),
+    }
+    for table, (first, last) in ranges.items():
+        existing = set(partitions.attached_months(connection, table))
+        month = partitions.month_start(first)
+        while month <= last:
+            if month not in existing and partitions.create_partition(connection, table, month):
+                created += 1
+            month = partitions.add_months(month, 1)
+    return created + len(partitions.ensure_partitions(connection, today=plan.today))
+
+def chunks(first: int, last: int, size: int) -> list:
+    return [(start, min(start + size - 1, last)) for start in range(first, last + 1, size)]
+
+def run_tasks(pool, function, tasks: list, title: str, unit: str):
+    started = time.perf_counter()
+    totals = None
+    for done, result in enumerate(pool.imap_unordered(function, tasks), start=1):
+        result = result if isinstance(result, tuple) else (result,)
+        totals = result if totals is None else tuple(a + b for a, b in zip(totals, result))
+        elapsed = time.perf_counter() - started
+        print(f"\r  {title}: {done}/{len(tasks)} заданий, {totals[0]} {unit} ({totals[0] / elapsed:.0f}/с)", end="", flush=True)
+    print()
+    return totals
+
+def finish(connection, plan: Plan):
+    for table in SEQUENCE_TABLES:
+        connection.execute(text(f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), coalesce(max(id), 0) + 1, false) FROM {table}"))
+    if plan.no_triggers:
+        # Без триггера реестр transaction_id не заполнялся
+        connection.execute(text(
+            f"INSERT INTO {models.PaymentTransactionId.__tablename__} (transaction_id) "
+            "SELECT transaction_id FROM payments WHERE transaction_id IS NOT NULL ON CONFLICT DO NOTHING"
+        ))
+
+def main():
+    args = parse_args()
+    plan = Plan(args)
+    if plan.slot_days < 1:
+        print(f"✗ {args.bookings} бронирований не помещаются в {args.rooms} номеров за {args.years} лет: увеличьте --rooms или --years")
+        return 1
+    with engine.begin() as connection:
+        if not prepare_tables(connection, args):
+            return 1
+        plan.room_type_prices = create_rooms(connection, args)
+        created = create_partitions(connection, plan)
+
+    print(f"Номеров: {args.rooms}, гостей: {args.guests}, бронирований: {args.bookings}, процессов: {args.workers}")
+    print(f"Даты заезда: {plan.first_day} — {plan.last_day}, в среднем {plan.slot_days:.1f} дн. на бронирование номера")
+    print(f"Создано секций: {created}")
+    started = time.perf_counter()
+    engine.dispose()
+    with multiprocessing.Pool(args.workers, initializer=engine.dispose, initargs=(False,)) as pool:
+        run_tasks(pool, load_guests, [(plan, *chunk) for chunk in chunks(1, args.guests, GUESTS_PER_TASK)], "гости", "строк")
+        rooms_per_task = max(1, min(args.rooms // (args.workers * 4), COPY_BATCH_ROWS // max(plan.per_room, 1)))
+        tasks = [(plan, *chunk) for chunk in chunks(0, args.rooms - 1, rooms_per_task)]
+        _, payments = run_tasks(pool, load_bookings, tasks, "бронирования", "строк")
+
+    with engine.begin() as connection:
+        finish(connection, plan)
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        connection.execute(text(f"ANALYZE {', '.join(TRUNCATED_TABLES)}"))
+    print(f"Платежей: {payments}")
+    print(f"Готово за {time.perf_counter() - started:.0f} с. Аналитику пересчитайте через POST /analytics/refresh")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
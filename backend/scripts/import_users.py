@@ -0,0 +1,58 @@
+# Пакетный импорт сотрудников (таблица users) из CSV или NDJSON
+# Пароли хэшируются bcrypt параллельно в пуле процессов (PASSWORD_HASH_WORKERS),
+# пользователи вставляются пакетами по --batch-size через INSERT ... RETURNING
+#
+# CSV: заголовок username,email,full_name,role,password
+# NDJSON: по одному JSON-объекту с теми же полями на строку
+
+import argparse
+import csv
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app import bulk, crud, schemas, security
+from app.database import SessionLocal
+
+def read_rows(path: Path, file_format: str) -> list:
+    """
+    Читает строки файла в список словарей
+    """
+    with path.open(encoding="utf-8") as file:
+        if file_format == "csv":
+            return list(csv.DictReader(file))
+        return [json.loads(line) for line in file if line.strip()]
+
+def main():
+    parser = argparse.ArgumentParser(description="Импорт пользователей из CSV/NDJSON")
+    parser.add_argument("path", type=Path)
+    parser.add_argument("--format", choices=("csv", "ndjson"), help="по умолчанию определяется по расширению файла")
+    parser.add_argument("--batch-size", type=int, default=bulk.BULK_BATCH_SIZE)
+    args = parser.parse_args()
+
+    file_format = args.format or ("csv" if args.path.suffix.lower() == ".csv" else "ndjson")
+    rows = read_rows(args.path, file_format)
+    valid, errors = bulk.validate_rows(schemas.UserCreate, rows)
+    print(f"Строк в файле: {len(rows)}, прошли проверку: {len(valid)}")
+    print(f"Хэширование: bcrypt, cost {security.BCRYPT_ROUNDS}, процессов {security.PASSWORD_HASH_WORKERS}")
+
+    started = time.perf_counter()
+    db = SessionLocal()
+    try:
+        inserted, db_errors = crud.bulk_create_users(db, valid, args.batch_size)
+    finally:
+        db.close()
+        security.shutdown()
+    elapsed = time.perf_counter() - started
+
+    result = bulk.bulk_result(inserted, errors + db_errors)
+    print(f"Создано пользователей: {result['inserted']} за {elapsed:.1f} с")
+    for error in result["errors"]:
+        print(f"  ✗ строка {error['index'] + 1}: {error['detail']}")
+    return 1 if result["errors"] else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,269 @@
+# Советник по индексам PostgreSQL
+# Читает pg_index и pg_stat_user_indexes и находит индексы, которые можно удалить:
+#   - дубликаты: тот же метод доступа, те же колонки, классы операторов, выражения и условие WHERE
+#     (например, ix_bookings_id поверх первичного ключа bookings_pkey)
+#   - избыточные: неуникальный btree-индекс, колонки которого — начало другого btree-индекса
+#     с тем же условием (ix_bookings_check_in_date при idx_bookings_dates)
+#   - неиспользуемые: idx_scan = 0 с момента сброса статистики (только с --include-unused)
+# Индексы первичных ключей, уникальных ограничений и ограничений исключения не трогаются никогда,
+# как и единственный индекс, начинающийся с колонки внешнего ключа. Индексы секционированных таблиц
+# рассматриваются целиком: размер и idx_scan суммируются по секциям, индексы самих секций не выводятся
+#
+# С --write-migration создаёт миграцию Alembic, которая удаляет найденные индексы через
+# DROP INDEX CONCURRENTLY, а при откате создаёт их заново тем же определением (CREATE INDEX CONCURRENTLY)
+
+import argparse
+import sys
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import text
+
+INDEXES_SQL = """
+    SELECT
+        c.relname AS name,
+        t.relname AS table,
+        am.amname AS method,
+        i.indkey::text AS columns,
+        i.indclass::text AS opclasses,
+        i.indcollation::text AS collations,
+        pg_get_expr(i.indexprs, i.indrelid) AS expressions,
+        pg_get_expr(i.indpred, i.indrelid) AS predicate,
+        i.indisunique AS is_unique,
+        con.contype AS constraint_type,
+        c.relkind = 'I' AS partitioned,
+        CAST(coalesce(tree.idx_scan, s.idx_scan, 0) AS bigint) AS scans,
+        CAST(coalesce(tree.size, pg_relation_size(i.indexrelid)) AS bigint) AS size,
+        pg_get_indexdef(i.indexrelid) AS definition
+    FROM pg_index i
+    JOIN pg_class c ON c.oid = i.indexrelid
+    JOIN pg_class t ON t.oid = i.indrelid
+    JOIN pg_namespace n ON n.oid = t.relnamespace
+    JOIN pg_am am ON am.oid = c.relam
+    LEFT JOIN pg_constraint con ON con.conindid = i.indexrelid AND con.contype IN ('p', 'u', 'x')
+    LEFT JOIN pg_stat_user_indexes s ON s.indexrelid = i.indexrelid
+    CROSS JOIN LATERAL (
+        SELECT sum(pg_relation_size(part.relid)) AS size, sum(stat.idx_scan) AS idx_scan
+        FROM pg_partition_tree(i.indexrelid) AS part
+        LEFT JOIN pg_stat_user_indexes stat ON stat.indexrelid = part.relid
+    ) tree
+    WHERE n.nspname = :schema AND i.indisvalid AND NOT c.relispartition AND t.relname <> 'alembic_version'
+    ORDER BY t.relname, c.relname
+"""
+
+FOREIGN_KEYS_SQL = """
+    SELECT t.relname AS table, con.conkey[1] AS column
+    FROM pg_constraint con
+    JOIN pg_class t ON t.oid = con.conrelid
+    JOIN pg_namespace n ON n.oid = t.relnamespace
+    WHERE con.contype = 'f' AND n.nspname = :schema
+"""
+
+STATS_RESET_SQL = "SELECT stats_reset FROM pg_stat_database WHERE datname = current_database()"
+
+MIGRATION_TEMPLATE = '''"""{message}
+
+Revision ID: {revision}
+Revises: {down_revision}
+Create Date: {create_date}
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '{revision}'
+down_revision: Union[str, None] = '{down_revision}'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Сгенерировано scripts/index_advisor.py
+# (индекс, таблица, определение для отката)
+INDEXES = (
+{indexes}
+)
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, definition in INDEXES:
+            op.drop_index(name, table_name=table, postgresql_concurrently=" CONCURRENTLY " in definition)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for _, _, definition in INDEXES:
+            op.execute(definition)
+'''
+
+def load_indexes(connection, schema: str) -> list:
+    """
+    Читает индексы схемы вместе со статистикой использования
+    """
+    indexes = []
+    for row in connection.execute(text(INDEXES_SQL), {"schema": schema}).mappings():
+        index = dict(row)
+        index["columns"] = tuple(int(column) for column in index["columns"].split())
+        indexes.append(index)
+    return indexes
+
+def load_foreign_keys(connection, schema: str) -> set:
+    """
+    Пары (таблица, номер первой колонки) для внешних ключей схемы
+    """
+    return {(row.table, row.column) for row in connection.execute(text(FOREIGN_KEYS_SQL), {"schema": schema})}
+
+def signature(index: dict) -> tuple:
+    return (index["table"], index["method"], index["columns"], index["opclasses"], index["collations"], index["expressions"], index["predicate"])
+
+def preference(index: dict) -> tuple:
+    """
+    Какой из одинаковых индексов оставить: поддерживающий ограничение, затем уникальный, затем самый используемый
+    """
+    return (index["constraint_type"] is not None, index["is_unique"], index["scans"], index["name"])
+
+def is_droppable(index: dict) -> bool:
+    return index["constraint_type"] is None
+
+def find_duplicates(indexes: list, kept: set) -> list:
+    groups = defaultdict(list)
+    for index in indexes:
+        groups[signature(index)].append(index)
+    findings = []
+    for group in groups.values():
+        if len(group) < 2:
+            continue
+        keep = max(group, key=preference)
+        kept.add(keep["name"])
+        for index in group:
+            if index is not keep and is_droppable(index):
+                findings.append((index, "дубликат", f"повторяет {keep['name']}"))
+    return findings
+
+def covers_prefix(index: dict, other: dict) -> bool:
+    size = len(index["columns"])
+    return (
+        other is not index
+        and other["table"] == index["table"]
+        and other["method"] == "btree"
+        and other["expressions"] is None
+        and other["predicate"] == index["predicate"]
+        and len(other["columns"]) > size
+        and other["columns"][:size] == index["columns"]
+        and other["opclasses"].split()[:size] == index["opclasses"].split()
+    )
+
+def find_redundant(indexes: list, excluded: set, kept: set) -> list:
+    findings = []
+    for index in indexes:
+        if index["name"] in excluded or not is_droppable(index) or index["is_unique"]:
+            continue
+        if index["method"] != "btree" or index["expressions"] is not None:
+            continue
+        cover = next((other for other in indexes if other["name"] not in excluded and covers_prefix(index, other)), None)
+        if cover is not None:
+            findings.append((index, "избыточный", f"колонки — начало {cover['name']}"))
+            excluded.add(index["name"])
+            kept.add(cover["name"])
+    return findings
+
+def find_unused(indexes: list, excluded: set, kept: set, foreign_keys: set) -> list:
+    findings = []
+    for index in indexes:
+        if index["name"] in excluded or index["name"] in kept or not is_droppable(index) or index["is_unique"] or index["scans"] > 0:
+            continue
+        leading = (index["table"], index["columns"][0])
+        if leading in foreign_keys and not any(
+            other["name"] not in excluded and other is not index and other["predicate"] is None
+            and (other["table"], other["columns"][0]) == leading
+            for other in indexes
+        ):
+            continue
+        findings.append((index, "не используется", "idx_scan = 0"))
+        excluded.add(index["name"])
+    return findings
+
+def advise(connection, schema: str = "public", include_unused: bool = False) -> list:
+    """
+    Список (индекс, категория, причина) для удаления
+    """
+    indexes = load_indexes(connection, schema)
+    # Индексы, которые заменяют удаляемые дубликаты и избыточные индексы, не удаляются как неиспользуемые
+    kept = set()
+    findings = find_duplicates(indexes, kept)
+    excluded = {index["name"] for index, _, _ in findings}
+    findings += find_redundant(indexes, excluded, kept)
+    if include_unused:
+        findings += find_unused(indexes, excluded, kept, load_foreign_keys(connection, schema))
+    return findings
+
+def concurrent_definition(index: dict) -> str:
+    # На секционированных таблицах CONCURRENTLY не поддерживается
+    if index["partitioned"]:
+        return index["definition"]
+    return index["definition"].replace(" INDEX ", " INDEX CONCURRENTLY ", 1)
+
+def write_migration(findings: list, message: str) -> Path:
+    """
+    Создаёт файл миграции в alembic/versions поверх текущей головной ревизии
+    """
+    from alembic.util import rev_id
+
+    from app.startup import script_directory
+
+    scripts = script_directory()
+    revision = rev_id()
+    slug = "_".join(message.lower().split())[:40]
+    lines = "\n".join(
+        f"    ({index['name']!r}, {index['table']!r}, {concurrent_definition(index)!r}),"
+        for index, _, _ in sorted(findings, key=lambda finding: (finding[0]["table"], finding[0]["name"]))
+    )
+    path = Path(scripts.versions) / f"{revision}_{slug}.py"
+    path.write_text(MIGRATION_TEMPLATE.format(
+        message=message,
+        revision=revision,
+        down_revision=scripts.get_current_head(),
+        create_date=datetime.now(),
+        indexes=lines,
+    ), encoding="utf-8")
+    return path
+
+def main():
+    parser = argparse.ArgumentParser(description="Поиск дублирующихся, избыточных и неиспользуемых индексов")
+    parser.add_argument("--schema", default="public")
+    parser.add_argument("--include-unused", action="store_true", help="предлагать удалить индексы с idx_scan = 0")
+    parser.add_argument("--write-migration", action="store_true", help="создать миграцию Alembic с DROP INDEX CONCURRENTLY")
+    parser.add_argument("--message", default="Drop redundant indexes", help="заголовок миграции")
+    args = parser.parse_args()
+
+    from app.database import engine
+
+    with engine.connect() as connection:
+        findings = advise(connection, args.schema, args.include_unused)
+        stats_reset = connection.execute(text(STATS_RESET_SQL)).scalar()
+
+    if not findings:
+        print("✓ Лишних индексов не найдено")
+        return 0
+
+    print(f"{'таблица':<22} {'индекс':<32} {'категория':<16} {'размер, КБ':>10} {'idx_scan':>9}  причина")
+    for index, category, reason in findings:
+        print(f"{index['table']:<22} {index['name']:<32} {category:<16} {index['size'] / 1024:>10.0f} {index['scans']:>9}  {reason}")
+    total = sum(index["size"] for index, _, _ in findings)
+    print(f"\nК удалению: {len(findings)} индексов, {total / 1024 / 1024:.1f} МБ")
+    if args.include_unused:
+        print(f"Статистика использования собирается с {stats_reset or 'запуска сервера'}; на репликах счётчики свои")
+
+    if args.write_migration:
+        path = write_migration(findings, args.message)
+        print(f"Миграция: {path}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,44 @@
+# Обслуживание помесячных секций bookings и payments
+# Создаёт секции на --months-ahead месяцев вперёд (приложение делает это при старте только с SCHEMA_STARTUP=create) и с
+# --detach-older-than N отсоединяет секции старше N месяцев: сначала payments, затем bookings.
+# Отсоединённые секции остаются обычными таблицами-архивами без внешних ключей; с --drop удаляются.
+# Секцию bookings, на которую ещё ссылаются платежи из присоединённых секций, отсоединить нельзя —
+# она пропускается и попадает в отчёт
+#
+# Запускайте из cron раз в сутки, например:
+#   python scripts/maintain_partitions.py --detach-older-than 36
+
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app import partitions
+from app.database import engine
+
+def main():
+    parser = argparse.ArgumentParser(description="Создание и отсоединение помесячных секций bookings и payments")
+    parser.add_argument("--months-ahead", type=int, default=partitions.PARTITION_MONTHS_AHEAD, help="на сколько месяцев вперёд создавать секции")
+    parser.add_argument("--detach-older-than", type=int, metavar="MONTHS", help="отсоединить секции старше MONTHS месяцев")
+    parser.add_argument("--drop", action="store_true", help="удалить отсоединённые секции вместо хранения архивом")
+    args = parser.parse_args()
+
+    if args.drop and args.detach_older_than is None:
+        parser.error("--drop используется только вместе с --detach-older-than")
+
+    with engine.begin() as connection:
+        created = partitions.ensure_partitions(connection, args.months_ahead)
+    print(f"Создано секций: {len(created)}" + (f" ({', '.join(created)})" if created else ""))
+
+    if args.detach_older_than is None:
+        return 0
+    with engine.begin() as connection:
+        detached, skipped = partitions.detach_partitions(connection, args.detach_older_than, drop=args.drop)
+    print(f"{'Удалено' if args.drop else 'Отсоединено'} секций: {len(detached)}" + (f" ({', '.join(detached)})" if detached else ""))
+    for name, reason in skipped:
+        print(f"✗ {name} пропущена: {reason}")
+    return 1 if skipped else 0
+
+if __name__ == '__main__':
+    sys.exit(main())